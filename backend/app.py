@@ -1,19 +1,34 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 import os
+import json
 import time
 import random
 import threading
 import uuid
 import datetime
-import requests
+import hashlib
 from functools import wraps
 from dotenv import load_dotenv
 from supabase import create_client, Client
 from competitive_engine import analyze_competitive_pressure, get_predatory_margin, ApexLegendGenerator, ApexHybridEngine
-from support_engine import simulate_chat_interaction, CustomSourcingEngine
+from support_engine import simulate_chat_interaction, stream_chat_interaction, CustomSourcingEngine
 from sourcing_engine import LiveSourcingEngine
 from supplier import Autopilot
+from catalog_cache import ProductCatalogCache
+from cache_backends import create_cache_backend
+from product_record import ProductRecord
+from pricing_engine import BatchPricingEngine
+from change_feed import PostgresChangeFeedConsumer
+from bulk_writer import SupabaseBulkWriter
+from leader_election import create_leader_elector
+from http_client import http_client
+from coalescing_cache import CoalescingCache
+from page_cache import normalize_query
+from job_queue import BackgroundJobQueue, QueueFullError
+from name_index import ProductNameIndex
+from supplier_adapters import create_supplier_registry, QuoteAggregator
+from conversation_store import ConversationStore
 
 load_dotenv()
 
@@ -32,7 +47,38 @@ supabase_key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
 MP_TOKEN = os.environ.get("MERCADO_PAGO_ACCESS_TOKEN") or os.environ.get("MP_ACCESS_TOKEN")
 PAG_TOKEN = os.environ.get("PAGSEGURO_TOKEN")
 FULFILLMENT_URL = os.environ.get("FULFILLMENT_WEBHOOK_URL")
+FULFILLMENT_ATTEMPTS = int(os.environ.get("FULFILLMENT_ATTEMPTS", 4))
+FULFILLMENT_BACKOFF = float(os.environ.get("FULFILLMENT_BACKOFF", 2.0))
 ADMIN_SECRET = os.environ.get("ADMIN_SECRET", "quantum-2026")
+PRODUCTS_CACHE_SOFT_TTL = int(os.environ.get("PRODUCTS_CACHE_SOFT_TTL", 900))
+PRODUCTS_CACHE_HARD_TTL = int(os.environ.get("PRODUCTS_CACHE_HARD_TTL", 3600))
+PRODUCTS_CACHE_REFRESH_MODE = os.environ.get("PRODUCTS_CACHE_REFRESH_MODE", "background")
+CATALOG_CHANGE_FEED_URL = os.environ.get("CATALOG_CHANGE_FEED_URL")
+CACHE_BACKEND_URL = os.environ.get("CACHE_BACKEND_URL", "memory://")
+PIVOT_PRICE_CHANGE_THRESHOLD = float(os.environ.get("PIVOT_PRICE_CHANGE_THRESHOLD", 0.03))
+PIVOT_DEMAND_SCORE_THRESHOLD = int(os.environ.get("PIVOT_DEMAND_SCORE_THRESHOLD", 10))
+PIVOT_MARGIN_SMOOTHING = float(os.environ.get("PIVOT_MARGIN_SMOOTHING", 0.05))
+BULK_WRITE_CHUNK_SIZE = int(os.environ.get("BULK_WRITE_CHUNK_SIZE", 500))
+BULK_WRITE_MAX_WORKERS = int(os.environ.get("BULK_WRITE_MAX_WORKERS", 4))
+BULK_WRITE_MAX_RETRIES = int(os.environ.get("BULK_WRITE_MAX_RETRIES", 4))
+SOURCING_DEADLINE = float(os.environ.get("SOURCING_DEADLINE", 8.0))
+ACTIVE_SEARCH_PAGES = int(os.environ.get("ACTIVE_SEARCH_PAGES", 2))
+# Similaridade de trigramas a partir da qual dois títulos são o mesmo produto
+CATALOG_DEDUPE_THRESHOLD = float(os.environ.get("CATALOG_DEDUPE_THRESHOLD", 0.85))
+# Variantes guardadas já serializadas além de 'full' (ex.: "full,recommend"): troca memória por um join a menos por request
+CATALOG_MATERIALIZED_VARIANTS = [v.strip() for v in os.environ.get("CATALOG_MATERIALIZED_VARIANTS", "full").split(",") if v.strip()]
+ACTIVE_SEARCH_WORKERS = int(os.environ.get("ACTIVE_SEARCH_WORKERS", 2))
+ACTIVE_SEARCH_MAX_PENDING = int(os.environ.get("ACTIVE_SEARCH_MAX_PENDING", 16))
+SUPPLIER_ADAPTERS = os.environ.get("SUPPLIER_ADAPTERS", "mercadolivre")
+SUPPLIER_QUOTE_DEADLINE = float(os.environ.get("SUPPLIER_QUOTE_DEADLINE", 6.0))
+SUPPORT_CHAT_DELAY_MODE = os.environ.get("SUPPORT_CHAT_DELAY_MODE", "hint")
+SUPPORT_CHAT_DELAY_MS = (1200, 2800)
+SUPPORT_CHAT_STREAM_PACING = os.environ.get("SUPPORT_CHAT_STREAM_PACING", "auto")
+SUPPORT_SESSION_MAX = int(os.environ.get("SUPPORT_SESSION_MAX", 10000))
+SUPPORT_SESSION_TTL = int(os.environ.get("SUPPORT_SESSION_TTL", 1800))
+SUPPORT_SESSION_HISTORY = int(os.environ.get("SUPPORT_SESSION_HISTORY", 10))
+SUPPORT_SESSION_MAX_MB = float(os.environ.get("SUPPORT_SESSION_MAX_MB", 16))
+LEADER_ELECTION_URL = os.environ.get("LEADER_ELECTION_URL", "file:///tmp/dropmasters-maintainer.lock")
 
 supabase: Client = None
 if supabase_url and supabase_key:
@@ -50,7 +96,9 @@ AUTONOMY_STATE = {
 }
 
 autonomy_lock = threading.Lock()
-cache = {"products": {"data": None, "expiry": 0}}
+pricing_engine = BatchPricingEngine(smoothing=PIVOT_MARGIN_SMOOTHING)
+# Backend de cache compartilhado entre workers (memory:// | shm:// | redis://)
+cache_backend = create_cache_backend(CACHE_BACKEND_URL)
 
 def add_log(message, log_type='info'):
     """Logging Assíncrono para Não Bloquear Performance."""
@@ -61,6 +109,15 @@ def add_log(message, log_type='info'):
         except: pass
     threading.Thread(target=_save, daemon=True).start()
 
+# Escritas em lote no Supabase: chunks limitados, paralelos e com retry em erros transitórios
+bulk_writer = SupabaseBulkWriter(
+    lambda: supabase,
+    chunk_size=BULK_WRITE_CHUNK_SIZE,
+    max_workers=BULK_WRITE_MAX_WORKERS,
+    max_retries=BULK_WRITE_MAX_RETRIES,
+    log_callback=add_log
+)
+
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -97,6 +154,9 @@ WINNER_POOL = [
     }
 ]
 
+# Colunas lidas pelo pivot: também servem de "último snapshot gravado" para o diff delta-only
+PIVOT_COLUMNS = "id, name, base_price, price, stock, description, is_featured, category, metadata"
+
 def living_ai_pivot(force=False):
     now = time.time()
     with autonomy_lock:
@@ -120,10 +180,10 @@ def living_ai_pivot(force=False):
         sup_pressure = logistics.get("supply_chain_pressure", 0.0)
         
         # Mood Adjustment
-        if rel < 0.85: AUTONOMY_STATE["ai_mood"] = "Safety"
-        elif sup_pressure > 0.8: AUTONOMY_STATE["ai_mood"] = "Throttled"
-        elif AUTONOMY_STATE["dissatisfaction_score"] > 3: AUTONOMY_STATE["ai_mood"] = "Empathy"
-        else: AUTONOMY_STATE["ai_mood"] = "Apex"
+        if rel < 0.85: set_ai_mood("Safety")
+        elif sup_pressure > 0.8: set_ai_mood("Throttled")
+        elif AUTONOMY_STATE["dissatisfaction_score"] > 3: set_ai_mood("Empathy")
+        else: set_ai_mood("Apex")
 
         # 3. Precificação Dinâmica Regionalizada (Agressividade Zero Cost)
         # SP/SC recebem desconto de logística no preço final para aumentar conversão local
@@ -131,11 +191,8 @@ def living_ai_pivot(force=False):
         if AUTONOMY_STATE["ai_mood"] == "Safety": price_adj = 1.15
         elif AUTONOMY_STATE["ai_mood"] == "Empathy": price_adj = 0.85
 
-        # Multiplicador Base Apex - Garante 40% de margem mínima
-        multiplier = max(1.4, get_predatory_margin(1.0, m_pressure) * price_adj)
-        
         # 4. Atualização de Inventário
-        res = supabase.table('products').select("id, name, base_price, metadata").eq('is_active', True).execute()
+        res = supabase.table('products').select(PIVOT_COLUMNS).eq('is_active', True).execute()
         
         # Se banco vazio, semeia (Bootstrap Zero Cost)
         if not res.data:
@@ -152,60 +209,43 @@ def living_ai_pivot(force=False):
                     "is_active": True,
                     "metadata": {"location": wp['loc'], "benefits": wp['benefits']}
                 })
-            supabase.table('products').insert(seed).execute()
-            res = supabase.table('products').select("id, name, base_price, metadata").eq('is_active', True).execute()
-
-        batch = []
-        for p in (res.data or []):
-            base = float(p.get('base_price') or 0)
-            if base <= 0: continue
-            
-            # Priorização Local: SP/SC têm custos menores
-            loc = (p.get('metadata') or {}).get('location', 'Global')
-            loc_adj = 0.95 if loc in ['SP', 'SC'] else 1.0
-            
-            # Seletor de Modelo Híbrido Apex
-            model_info = ApexHybridEngine.select_best_model(p, m_pressure)
-            
-            # Legenda Agressiva Neural Baseada no Modelo
-            legend = ApexLegendGenerator.generate_aggressive_copy(p['name'], model_info)
-            
-            # Cálculo de Preço Final (Apex Yield Optimization)
-            # Regiões SP/SC (Hubs) têm prioridade de margem
-            final_price = round(base * multiplier * loc_adj, 2) + 0.90
+            written = bulk_writer.insert('products', seed).written
+            product_cache.apply_changes(upserts=written)
+            res = supabase.table('products').select(PIVOT_COLUMNS).eq('is_active', True).execute()
 
-            # Motor de Pressão Apex (v15.0)
-            d_score = int(random.uniform(85, 99)) if sup_pressure > 0.6 else int(random.uniform(40, 80))
-            is_viral = d_score > 90
-
-            # Update critical fields + Model Info + Pressure
-            update_payload = {
-                "id": p['id'],
-                "price": final_price,
-                "description": legend,
-                "stock": random.randint(2, 5) if is_viral else random.randint(10, 20),
-                "is_featured": is_viral,
-                "is_active": True,
-                "updated_at": datetime.datetime.now().isoformat(),
-                "metadata": {
-                    **(p.get('metadata') or {}),
-                    "business_model": model_info['model'],
-                    "model_tag": model_info['tag'],
-                    "strategy": model_info['strategy'],
-                    "demand_score": d_score,
-                    "is_viral": is_viral
-                }
-            }
-            batch.append(update_payload)
-            
-            # Regional Metric Snapshot
+        # Multiplicador Base Apex - Garante 40% de margem mínima
+        # Margem/pressão sorteadas suavizadas (EMA) antes do ajuste de humor: preço e modelo não oscilam a cada ciclo
+        margin, model_pressure = pricing_engine.smooth(get_predatory_margin(1.0, m_pressure), m_pressure, res.data, price_adj)
+        multiplier = max(1.4, margin * price_adj)
+
+        # Reprecificação vetorizada (NumPy) de todo o catálogo em um único passo
+        pricing = pricing_engine.reprice(res.data or [], multiplier, model_pressure, sup_pressure)
+        # Delta-only: compara com a última versão gravada e envia só linhas/colunas alteradas
+        changes = pricing_engine.diff(pricing, PIVOT_PRICE_CHANGE_THRESHOLD, PIVOT_DEMAND_SCORE_THRESHOLD)
+        batch = pricing_engine.build_payloads(pricing, datetime.datetime.now().isoformat(), changes)
+        changed_rows, changed_columns = BatchPricingEngine.count_changes(changes)
+
+        # Regional Metric Snapshot
+        for loc, count in BatchPricingEngine.location_counts(pricing).items():
             if loc in AUTONOMY_STATE["regional_metrics"]:
-                AUTONOMY_STATE["regional_metrics"][loc] += 1
+                AUTONOMY_STATE["regional_metrics"][loc] += count
             else:
-                AUTONOMY_STATE["regional_metrics"]["OTHER"] += 1
+                AUTONOMY_STATE["regional_metrics"]["OTHER"] += count
             
+        # Fencing: renova/confirma a liderança logo antes da escrita em massa; um líder que perdeu o
+        # lease durante o ciclo (pausa, partição) não sobrescreve o catálogo do novo líder
+        if batch and not maintainer_leader.heartbeat():
+            add_log("🔻 APEX CYCLE: liderança perdida antes da escrita; ciclo abortado", "system")
+            return
+
         if batch and supabase:
-            supabase.table('products').upsert(batch).execute()
+            # Agrupamento por conjunto de colunas + chunks/retry ficam no bulk writer
+            write = bulk_writer.upsert('products', batch)
+            product_cache.apply_changes(upserts=write.written)
+            stats = write.summary()
+            add_log(f"🧮 APEX DELTA: {stats['written']}/{len(pricing['products'])} produtos alterados | "
+                    f"{changed_columns} colunas em {changed_rows} linhas | {stats['chunks']} chunks, "
+                    f"{stats['retries']} retries, {stats['duration_ms']}ms", "system")
         
         # 5. EXPANSÃO AUTOMÁTICA DE CATÁLOGO (Apex Discovery Mode)
         # Se algum nicho estiver vazio ou a cada X ciclos, buscamos coisa nova na rede
@@ -217,25 +257,31 @@ def living_ai_pivot(force=False):
         missing_cats = [c for c in categories if c not in existing_cats]
 
         if product_count < 40 or missing_cats or random.random() < 0.35:
-            keyword = random.choice(missing_cats) if missing_cats else random.choice(LiveSourcingEngine.get_trending_keywords())
-            add_log(f"🔎 APEX DISCOVERY: Explorando nicho '{keyword}' para expansão", "system")
-            new_items = LiveSourcingEngine.search_mercadolivre(keyword, limit=4)
+            # Todas as categorias faltantes no mesmo ciclo (fan-out com prazo)
+            keywords = missing_cats or [random.choice(LiveSourcingEngine.get_trending_keywords())]
+            add_log(f"🔎 APEX DISCOVERY: Explorando nichos {', '.join(keywords)} para expansão", "system")
+            new_items = LiveSourcingEngine.search_many(keywords, limit=4, deadline=SOURCING_DEADLINE)
             
             if new_items:
                 discovered = []
+                # Dedupe por título normalizado/similar (inclui os recém-descobertos deste ciclo)
+                name_index = ProductNameIndex.from_rows(res.data or [], CATALOG_DEDUPE_THRESHOLD)
                 for item in new_items:
-                    if any(p['name'] == item['name'] for p in res.data or []): continue
+                    if name_index.match(item['name']): continue
                     
                     # Filtro de Qualidade Neural
                     if item['vibe_score'] < 75: continue 
 
                     base = item['price']
                     # Geração de Copy Agressiva via Motor Apex
-                    model_info = ApexHybridEngine.select_best_model({"name": item['name']}, m_pressure)
+                    model_info = ApexHybridEngine.select_best_model({"name": item['name'], "price": round(base * multiplier, 2) + 0.99, "base_price": base}, m_pressure)
                     legend = ApexLegendGenerator.generate_aggressive_copy(item['name'], model_info)
                     
+                    keyword = item['query']
+                    new_id = str(uuid.uuid4())
+                    name_index.add(new_id, item['name'])
                     discovered.append({
-                        "id": str(uuid.uuid4()),
+                        "id": new_id,
                         "name": item['name'],
                         "description": legend,
                         "base_price": base,
@@ -254,8 +300,9 @@ def living_ai_pivot(force=False):
                         }
                     })
                 if discovered:
-                    supabase.table('products').insert(discovered).execute()
-                    add_log(f"✨ EVOLUÇÃO: {len(discovered)} produtos de alta conversão integrados.", "system")
+                    written = bulk_writer.insert('products', discovered).written
+                    product_cache.apply_changes(upserts=written)
+                    add_log(f"✨ EVOLUÇÃO: {len(written)} produtos de alta conversão integrados.", "system")
 
         # 6. ROTAÇÃO DE CATÁLOGO (Apex Selection)
         # Mantém apenas a elite produtiva no catálogo ativo
@@ -266,6 +313,7 @@ def living_ai_pivot(force=False):
             to_retire = [p['id'] for p in sorted_by_worst[:10]]
             if to_retire:
                 supabase.table('products').update({"is_active": False}).in_('id', to_retire).execute()
+                product_cache.apply_changes(deactivate_ids=to_retire)
                 add_log(f"♻️ APEX SELECTION: {len(to_retire)} itens de baixa tração arquivados.", "system")
 
         add_log(f"🧠 APEX CYCLE: {AUTONOMY_STATE['ai_mood']} | Catalog {product_count} | Pressure {int(m_pressure*100)}%", "system")
@@ -275,7 +323,6 @@ def living_ai_pivot(force=False):
     finally:
         with autonomy_lock:
             AUTONOMY_STATE["is_syncing"] = False
-            cache["products"]["data"] = None
 
 @app.route('/health', methods=['GET'])
 def health():
@@ -292,80 +339,161 @@ def health():
 # 🫂 INTERFACES CLIENTE (VICE-VERSA)
 # ==========================================
 
+def load_catalog():
+    """Carga completa do catálogo ativo (executada em single-flight pelo cache)."""
+    res = supabase.table('products').select("*").eq('is_active', True).order('is_featured', desc=True).execute()
+    return res.data
+
+def build_product_record(p):
+    """Registro compacto de um produto do catálogo (aplicado linha a linha pelo cache)."""
+    return ProductRecord.from_row(p, ai_mood=AUTONOMY_STATE["ai_mood"])
+
+def set_ai_mood(mood):
+    """ai_mood vai nos bytes de cada produto em cache: trocar de humor re-serializa o catálogo inteiro."""
+    with autonomy_lock:
+        changed = AUTONOMY_STATE["ai_mood"] != mood
+        AUTONOMY_STATE["ai_mood"] = mood
+    if changed:
+        product_cache.reencode()
+
+product_cache = ProductCatalogCache(
+    load_catalog,
+    build_product_record,
+    soft_ttl=PRODUCTS_CACHE_SOFT_TTL,
+    hard_ttl=PRODUCTS_CACHE_HARD_TTL,
+    refresh_mode=PRODUCTS_CACHE_REFRESH_MODE,
+    log_callback=add_log,
+    backend=cache_backend,
+    dedupe_threshold=CATALOG_DEDUPE_THRESHOLD,
+    materialized_variants=CATALOG_MATERIALIZED_VARIANTS
+)
+
+# Consumidor opcional do change feed (Realtime -> NDJSON ou stand-in local)
+catalog_feed = PostgresChangeFeedConsumer(product_cache, url=CATALOG_CHANGE_FEED_URL, log_callback=add_log)
+catalog_feed.start()
+
+PRODUCT_QUERY_PARAMS = ('limit', 'cursor', 'fields', 'sort', 'category', 'location', 'min_price', 'max_price', 'is_viral')
+
+def build_product_filter(args):
+    """Monta o predicado de filtros server-side (category, location, faixa de preço, is_viral, recommend)."""
+    checks = []
+    if args.get('recommend') == 'true':
+        checks.append(ProductCatalogCache.VARIANTS["recommend"])
+    if args.get('category'):
+        checks.append(lambda p, v=args['category'].lower(): (p.category or '').lower() == v)
+    if args.get('location'):
+        checks.append(lambda p, v=args['location'].lower(): (p.location or '').lower() == v)
+    if args.get('min_price'):
+        checks.append(lambda p, v=float(args['min_price']): p.price >= v)
+    if args.get('max_price'):
+        checks.append(lambda p, v=float(args['max_price']): p.price <= v)
+    if args.get('is_viral') in ('true', 'false'):
+        checks.append(lambda p, v=args['is_viral'] == 'true': bool(p.is_viral) == v)
+    if not checks: return None
+    return lambda p: all(check(p) for check in checks)
+
 @app.route('/api/v2/products', methods=['GET'])
 def get_products():
-    """Performance: Unified Endpoint (900s Cache) com Filtro de Recomendação."""
-    now = time.time()
-    recommend = request.args.get('recommend') == 'true'
+    """
+    Performance: Unified Endpoint (Cache SWR pré-serializado + ETag) com Filtro de Recomendação.
+    Parâmetros opcionais: limit/cursor (envelope paginado), fields, sort, category, location,
+    min_price, max_price, is_viral — todos respondidos do cache em memória.
+    """
+    args = request.args
     
-    # 1. Tenta Cache Global
-    data_source = cache["products"]["data"]
-    if not data_source or now >= cache["products"]["expiry"]:
+    # 1. Tenta Cache Global (bytes JSON prontos, revalidação single-flight)
+    try:
+        snapshot = product_cache.get()
+    except: 
+        return jsonify([])
+
+    if not any(k in args for k in PRODUCT_QUERY_PARAMS):
+        # Fast path: variante inteira já serializada
+        body, etag = product_cache.variant(snapshot, "recommend" if args.get('recommend') == 'true' else "full")
+    else:
         try:
-            res = supabase.table('products').select("*").eq('is_active', True).order('is_featured', desc=True).execute()
-            data_source = []
-            for p in res.data:
-                price = float(p.get('price', 0))
-                base_price = float(p.get('base_price') or (price * 0.65))
-                meta = p.get('metadata') or {}
-                data_source.append({
-                    "id": p['id'], 
-                    "name": p['name'], 
-                    "price": price,
-                    "base_price": base_price,
-                    "description": p.get('description', ''),
-                    "image_url": p['image_url'], 
-                    "stock": p.get('stock', 10),
-                    "original_price": float(price * 2.1),
-                    "location": meta.get('location', 'SP'),
-                    "is_viral": meta.get('is_viral', False),
-                    "demand_score": meta.get('demand_score', 0),
-                    "metadata": meta,
-                    "ai_mood": AUTONOMY_STATE["ai_mood"],
-                    "is_featured": p.get('is_featured', False),
-                    "business_model": meta.get('business_model', 'DROPSHIPPING')
-                })
-            with autonomy_lock:
-                cache["products"]["data"] = data_source
-                cache["products"]["expiry"] = now + 900
-        except: 
-            return jsonify([])
-
-    # 2. Filtra se necessário (Economia de banda + processamento)
-    if recommend:
-        data_source = [p for p in data_source if p.get('is_featured') or p.get('price') > 150]
-        
-    return jsonify(data_source)
-
-# Cache de Sourcing (Economia de CPU/Scrape)
-SOURCING_CACHE = {}
-
-@app.route('/api/v2/sourcing/estimate', methods=['POST'])
-def estimate_sourcing():
-    """Apex Sourcing: Estima preço com cache de 24h para queries idênticas."""
+            # limit presente (mesmo vazio) tem que ser inteiro positivo; ausente = sem limite
+            limit = None
+            if 'limit' in args:
+                if not args['limit'].isdigit() or int(args['limit']) <= 0:
+                    raise ValueError(f"limit inválido: {args['limit']!r}")
+                limit = int(args['limit'])
+            fields = [f.strip() for f in args['fields'].split(',') if f.strip()] if args.get('fields') else None
+            items, next_cursor = product_cache.page(
+                snapshot,
+                sort=args.get('sort', 'featured'),
+                predicate=build_product_filter(args),
+                fields=fields,
+                limit=limit,
+                cursor=args.get('cursor')
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if limit is not None or args.get('cursor'):
+            body = b'{"items":' + items + b',"next_cursor":' + ProductCatalogCache.encode(next_cursor) + b'}'
+        else:
+            body = items
+        etag = hashlib.sha1(body).hexdigest()
+
+    # 2. Resposta condicional (If-None-Match / If-Modified-Since -> 304 sem corpo)
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.last_modified = snapshot["last_modified"]
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+# Cache de Sourcing (Economia de CPU/Scrape): LRU + TTL em processo, cache_backend compartilhado
+# como segundo nível e single-flight para estimativas idênticas em andamento
+SOURCING_CACHE_TTL = 86400
+SOURCING_CACHE_MAX_ENTRIES = int(os.environ.get("SOURCING_CACHE_MAX_ENTRIES", 1024))
+sourcing_estimates = CoalescingCache(
+    max_entries=SOURCING_CACHE_MAX_ENTRIES,
+    ttl=SOURCING_CACHE_TTL,
+    backend=cache_backend if cache_backend.shared else None
+)
+
+def find_existing_products(names):
+    """
+    name -> {"id", "metadata", "is_active", "row"} dos produtos já cadastrados.
+    Ativos respondidos pelo índice em memória do catálogo (título normalizado ou similar), com
+    row=None: o cache já tem a linha e aceita update parcial.
+    O restante (inativos, cache frio) em um único select com in_() em vez de um select por nome;
+    "row" traz a linha inteira, para quem atualiza/reativa entregar ao cache uma linha materializável.
+    Com ativo e inativo de mesmo nome, vale o ativo.
+    """
+    names = list(dict.fromkeys(n for n in names if n))
+    found = product_cache.lookup_names(names)
+    for match in found.values():
+        match.update(is_active=True, row=None)
+    missing = [n for n in names if n not in found]
+    if missing and supabase:
+        res = supabase.table('products').select("*").in_('name', missing).execute()
+        for row in sorted(res.data or [], key=lambda r: not r.get('is_active', True)):
+            found.setdefault(row['name'], {"id": row['id'], "metadata": row.get('metadata') or {},
+                                           "is_active": row.get('is_active', True), "row": row})
+    return found
+
+def sourcing_cache_key(query, link):
+    return f"sourcing:{normalize_query(query)}|{(link or '').strip()}"
+
+def compute_sourcing_estimate(query, link):
+    """Estimativa + injeção no catálogo (executada uma vez por chave, mesmo com chamadas concorrentes)."""
     from support_engine import CustomSourcingEngine
-    data = request.json
-    query = data.get('query', '').lower().strip()
-    link = data.get('link', '')
-    
-    if not query:
-        return jsonify({"error": "Query is required"}), 400
-
-    cache_key = f"{query}_{link}"
-    if cache_key in SOURCING_CACHE:
-        expiry, result = SOURCING_CACHE[cache_key]
-        if time.time() < expiry:
-            return jsonify(result)
-            
     result = CustomSourcingEngine.estimate_custom_price(query, link)
-    
+
     # ESTRATÉGIA OFF-CATALOG: Se o item é viável, já injetamos no banco como 'Sourcing' 
     # para que futuros visitantes o achem no catálogo principal.
     if result.get('status') == 'feasible' and supabase:
         try:
-            # Verifica se já existe
-            check = supabase.table('products').select("id").eq("name", result['name']).execute()
-            if not check.data:
+            # Verifica se já existe; arquivado volta ao catálogo (cliente pediu)
+            existing = find_existing_products([result['name']]).get(result['name'])
+            if existing and not existing['is_active']:
+                supabase.table('products').update({"is_active": True}).eq('id', existing['id']).execute()
+                product_cache.apply_changes(upserts=[{**existing['row'], "is_active": True}])
+                add_log(f"📥 SOURCING TO CATALOG: '{result['name']}' reativado no catálogo global.", "system")
+            elif not existing:
                 new_p = {
                     "id": str(uuid.uuid4()),
                     "name": result['name'],
@@ -382,54 +510,108 @@ def estimate_sourcing():
                         "demand_score": 100 # Máxima prioridade (alguém pediu)
                     }
                 }
-                supabase.table('products').insert(new_p).execute()
-                add_log(f"📥 SOURCING TO CATALOG: '{result['name']}' adicionado ao catálogo global.", "system")
+                if bulk_writer.insert('products', [new_p]).ok:
+                    product_cache.apply_changes(upserts=[new_p])
+                    add_log(f"📥 SOURCING TO CATALOG: '{result['name']}' adicionado ao catálogo global.", "system")
         except: pass
+    return result
 
-    SOURCING_CACHE[cache_key] = (time.time() + 86400, result) # Cache de 1 dia
+@app.route('/api/v2/sourcing/estimate', methods=['POST'])
+def estimate_sourcing():
+    """Apex Sourcing: Estima preço com cache de 24h para queries idênticas."""
+    data = request.json
+    query = data.get('query', '').lower().strip()
+    link = data.get('link', '')
+    
+    if not query:
+        return jsonify({"error": "Query is required"}), 400
+
+    result = sourcing_estimates.get_or_load(
+        sourcing_cache_key(query, link),
+        lambda: compute_sourcing_estimate(query, link)
+    ) # Cache de 1 dia
     return jsonify(result)
 
-@app.route('/api/v2/sourcing/active-search', methods=['GET'])
-def active_sourcing_search():
+@app.route('/api/v2/admin/upstreams', methods=['GET'])
+@admin_required
+def upstream_status():
+    """Rate limiter e circuit breaker por host upstream (estado deste worker)."""
+    return jsonify({
+        "worker": os.getpid(),
+        "hosts": http_client.guard.snapshot() if http_client.guard else {},
+        "http": http_client.stats
+    })
+
+@app.route('/api/v2/admin/cache-stats', methods=['GET'])
+@admin_required
+def cache_stats():
+    """Hit/miss/eviction dos caches em processo deste worker."""
+    page_cache = LiveSourcingEngine.page_cache
+    return jsonify({
+        "worker": os.getpid(),
+        "catalog": product_cache.stats,
+        "sourcing_estimates": sourcing_estimates.snapshot_stats(),
+        "sourcing_pages": page_cache.stats if page_cache else None,
+        "bulk_writer": bulk_writer.stats,
+        "active_search_jobs": {**active_search_jobs.stats, "pending": active_search_jobs.pending()},
+        "support_sessions": support_sessions.snapshot_stats()
+    })
+
+# Pool limitado para o modo job do active-search (estado visível a todos os workers se o backend for compartilhado)
+active_search_jobs = BackgroundJobQueue(
+    max_workers=ACTIVE_SEARCH_WORKERS,
+    max_pending=ACTIVE_SEARCH_MAX_PENDING,
+    backend=cache_backend if cache_backend.shared else None,
+    name="active-search"
+)
+
+def run_active_search(query):
     """
     Pesquisa ativa de fornecedores (Scraping) Ultra-Agressiva.
     Filtra pela Elite de Fornecedores e gera copy para conversão imediata.
+    Executada direto pelo GET ou em background pelo modo job.
     """
-    query = request.args.get('q', '').strip()
-    if not query:
-        return jsonify({"products": [], "message": "O que você busca hoje?"})
-
     add_log(f"🕵️ APEX SOURCING: Localizando fornecedores elite para '{query}'", "system")
-    found_items = LiveSourcingEngine.search_mercadolivre(query, limit=6)
+    # Várias páginas em paralelo, latência limitada ao prazo (resultados parciais se estourar)
+    found_items = LiveSourcingEngine.search_many([query], limit=6, pages=ACTIVE_SEARCH_PAGES, deadline=SOURCING_DEADLINE)[:6]
     
     if not found_items:
-        return jsonify({"products": [], "message": "Busca global refinada. Tente termos mais genéricos."})
+        return {"products": [], "message": "Busca global refinada. Tente termos mais genéricos."}
 
     batch_products = []
     registered_products = []
+    # id -> linha que o cache consegue materializar (nova, update de linha em cache ou linha inteira do banco)
+    cache_rows = {}
     m_pressure = analyze_competitive_pressure()
     multiplier = max(1.4, get_predatory_margin(1.0, m_pressure))
 
+    found_items = [item for item in found_items if item['vibe_score'] >= 70]
+    # Checagem de existência em lote (índice do catálogo + no máximo um in_() no banco)
+    existing_products = find_existing_products([item['name'] for item in found_items])
+
     for item in found_items:
         try:
-            if item['vibe_score'] < 70: continue
-
-            check = supabase.table('products').select("id, metadata").eq("name", item['name']).execute()
+            existing = existing_products.get(item['name'])
             final_price = round(item['price'] * multiplier, 2) + 0.99
             
             p_id = None
-            if check.data:
-                p_id = check.data[0]['id']
+            if existing:
+                p_id = existing['id']
                 # Se mudou muito o preço, atualiza no batch (Otimização Apex)
                 update_p = {
                     "id": p_id,
                     "price": final_price,
-                    "metadata": {**check.data[0]['metadata'], "vibe_score": item['vibe_score']}
+                    "metadata": {**(existing.get('metadata') or {}), "vibe_score": item['vibe_score']}
                 }
+                if not existing['is_active']:
+                    # Arquivado e reencontrado em fornecedor elite: reativado explicitamente
+                    update_p["is_active"] = True
                 batch_products.append(update_p)
+                # Fora do cache (inativo, cache frio): update parcial não materializa; vai a linha inteira
+                cache_rows[p_id] = update_p if existing['row'] is None else {**existing['row'], **update_p}
             else:
                 p_id = str(uuid.uuid4())
-                model_info = ApexHybridEngine.select_best_model({"name": item['name']}, m_pressure)
+                model_info = ApexHybridEngine.select_best_model({"name": item['name'], "price": final_price, "base_price": item['price']}, m_pressure)
                 legend = ApexLegendGenerator.generate_aggressive_copy(item['name'], model_info)
 
                 new_p = {
@@ -452,6 +634,7 @@ def active_sourcing_search():
                     }
                 }
                 batch_products.append(new_p)
+                cache_rows[p_id] = new_p
             
             registered_products.append({
                 "id": p_id,
@@ -465,13 +648,94 @@ def active_sourcing_search():
         except: continue
 
     if batch_products:
-        supabase.table('products').upsert(batch_products).execute()
+        written = bulk_writer.upsert('products', batch_products).written
+        product_cache.apply_changes(upserts=[cache_rows[p['id']] for p in written])
 
-    return jsonify({
+    return {
         "products": registered_products,
         "message": f"🎯 SUCESSO: Encontramos {len(registered_products)} itens de alta confiança para você!",
         "source": "apex_active_provider"
-    })
+    }
+
+@app.route('/api/v2/sourcing/active-search', methods=['GET'])
+def active_sourcing_search():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"products": [], "message": "O que você busca hoje?"})
+    return jsonify(run_active_search(query))
+
+@app.route('/api/v2/sourcing/active-search/jobs', methods=['POST'])
+def submit_active_search_job():
+    """Modo assíncrono: devolve o job id na hora; o scrape roda no pool de background."""
+    query = ((request.json or {}).get('q') or request.args.get('q', '')).strip()
+    if not query:
+        return jsonify({"error": "Query is required"}), 400
+    try:
+        job = active_search_jobs.submit(run_active_search, query, dedupe_key=normalize_query(query))
+    except QueueFullError:
+        response = jsonify({"error": "Sourcing queue is full. Please retry.", "status": 429})
+        response.headers["Retry-After"] = "5"
+        return response, 429
+    return jsonify({
+        "job_id": job["id"],
+        "status": job["status"],
+        "poll_url": f"/api/v2/sourcing/active-search/jobs/{job['id']}"
+    }), 202
+
+@app.route('/api/v2/sourcing/active-search/jobs/<job_id>', methods=['GET'])
+def get_active_search_job(job_id):
+    job = active_search_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    job.pop("key", None)
+    response = jsonify(job)
+    if job["status"] in ("queued", "running"):
+        response.headers["Retry-After"] = "1"
+    return response
+
+# Cotação multi-fornecedor (Mercado Livre, Dropi, AliExpress...) sob um único prazo
+quote_aggregator = QuoteAggregator(create_supplier_registry(SUPPLIER_ADAPTERS), deadline=SUPPLIER_QUOTE_DEADLINE)
+
+@app.route('/api/v2/sourcing/quotes', methods=['GET'])
+def supplier_quotes():
+    """Melhor custo posto por produto e por origem, para entrega na UF `destination`."""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "Query is required"}), 400
+    destination = request.args.get('destination', 'SP').strip().upper()
+    limit = min(max(request.args.get('limit', 5, type=int), 1), 20)
+    return jsonify(quote_aggregator.aggregate(query, destination=destination, limit=limit))
+
+def forward_fulfillment(order, txn_id, payout, metadata):
+    """
+    Repasse do pedido pago ao webhook de fulfillment (host fora do UpstreamGuard).
+    Até FULFILLMENT_ATTEMPTS tentativas com backoff exponencial, cada falha no log; esgotadas,
+    o pedido fica marcado (metadata.fulfillment_pending) para reenvio em vez de se perder.
+    """
+    payload = {
+        "event": "order_paid",
+        "transaction_id": txn_id,
+        "payout": payout,
+        "items": order.get('items', [])
+    }
+    error = None
+    for attempt in range(FULFILLMENT_ATTEMPTS):
+        if attempt: time.sleep(FULFILLMENT_BACKOFF * 2 ** (attempt - 1))
+        try:
+            response = http_client.post(FULFILLMENT_URL, json=payload)
+            if response.ok: return True
+            error = f"HTTP {response.status_code}"
+        except Exception as e:
+            error = str(e)
+        add_log(f"Fulfillment Error: TX {txn_id} tentativa {attempt + 1}/{FULFILLMENT_ATTEMPTS}: {error}", "error")
+    try:
+        supabase.table('orders').update({
+            'metadata': {**metadata, "fulfillment_pending": True, "fulfillment_error": error}
+        }).eq('transaction_id', txn_id).execute()
+        add_log(f"📦 FULFILLMENT PENDENTE: TX {txn_id} marcado para reenvio", "error")
+    except Exception as e:
+        add_log(f"Fulfillment Error: TX {txn_id} não repassado nem marcado para reenvio: {e}", "error")
+    return False
 
 @app.route('/api/v2/payments/callback', methods=['POST'])
 def payment_callback():
@@ -525,14 +789,7 @@ def payment_callback():
                     Autopilot.submit_order(target_order)
                     
                     if FULFILLMENT_URL:
-                        try:
-                            requests.post(FULFILLMENT_URL, json={
-                                "event": "order_paid",
-                                "transaction_id": target_txn,
-                                "payout": target_split,
-                                "items": target_order.get('items', [])
-                            }, timeout=10)
-                        except: pass
+                        forward_fulfillment(target_order, target_txn, target_split, update_fields.get('metadata', metadata))
 
                     phone = target_order.get('phone')
                     if phone:
@@ -549,28 +806,140 @@ def payment_callback():
             add_log(f"Callback Error: {str(e)}", "error")
     return jsonify({"status": "ignored"}), 200
 
+# Conversas por sessão: humor e últimas mensagens de cada cliente, sem estado compartilhado entre eles
+support_sessions = ConversationStore(
+    max_sessions=SUPPORT_SESSION_MAX,
+    ttl=SUPPORT_SESSION_TTL,
+    history=SUPPORT_SESSION_HISTORY,
+    max_bytes=int(SUPPORT_SESSION_MAX_MB * 1024 * 1024)
+)
+
+def support_session_id(data):
+    """session_id do corpo ou do header X-Session-Id; ids ausentes/inválidos ganham um novo."""
+    session_id = str(data.get('session_id') or request.headers.get('X-Session-Id') or '')
+    if 8 <= len(session_id) <= 64 and session_id.replace('-', '').replace('_', '').isalnum():
+        return session_id
+    return uuid.uuid4().hex
+
 @app.route('/api/v2/support/chat', methods=['POST'])
 def support_chat():
-    data = request.json
+    data = request.json or {}
+    query = data.get('query', '')
     logistics = Autopilot.get_logistics_signals()
-    interaction = simulate_chat_interaction(data.get('query', ''), data.get('product_context'), logistics)
+    session_id = support_session_id(data)
+    with support_sessions.session(session_id) as session:
+        interaction = simulate_chat_interaction(query, data.get('product_context'), logistics, session=session)
+        if query:
+            support_sessions.remember(session, "user", query, interaction.get('intent'))
+            support_sessions.remember(session, "bot", interaction['response'])
+    interaction["session_id"] = session_id
     
     if interaction.get('sentiment') == "FRUSTRATED":
         with autonomy_lock: AUTONOMY_STATE["dissatisfaction_score"] += 1.0
     
-    # Neural Synthesis Delay (To feel more human/alive)
-    time.sleep(random.uniform(1.2, 2.8))
+    # Neural Synthesis Delay (To feel more human/alive): o cliente segura a resposta por
+    # `deliver_after_ms` com o indicador de digitação; o worker fica livre na hora
+    delay_ms = random.randint(*SUPPORT_CHAT_DELAY_MS)
+    if SUPPORT_CHAT_DELAY_MODE == "blocking":
+        time.sleep(delay_ms / 1000) # Legado: clientes antigos que não conhecem o hint
+        delay_ms = 0
+    interaction["deliver_after_ms"] = delay_ms
     
     return jsonify(interaction)
 
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def cooperative_sleep():
+    """
+    True só com gevent em monkey patch (time.sleep vira troca de greenlet) ou PACING=on.
+    O deploy usa o worker sync: lá o ritmo fica com o cliente e o stream não segura o worker.
+    """
+    if SUPPORT_CHAT_STREAM_PACING != "auto":
+        return SUPPORT_CHAT_STREAM_PACING == "on"
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("time")
+
+@app.route('/api/v2/support/chat/stream', methods=['GET', 'POST'])
+def support_chat_stream():
+    """
+    Variante SSE do chat: `meta` (session_id, sentimento, intenção) e o opener saem na hora;
+    core e action vêm como eventos `chunk` e `done` fecha com a resposta inteira.
+    No worker sync (deploy padrão) tudo é enviado de uma vez e `deliver_after_ms` no meta deixa o
+    ritmo com o cliente; só com sleep cooperativo (gevent) ou PACING=on as partes são espaçadas no servidor.
+    GET (?query=&session_id=) para EventSource, POST (JSON) para fetch.
+    """
+    data = request.args.to_dict() if request.method == 'GET' else (request.get_json(silent=True) or {})
+    query = data.get('query', '')
+    logistics = Autopilot.get_logistics_signals()
+    session_id = support_session_id(data)
+    with support_sessions.session(session_id) as session:
+        meta, parts = stream_chat_interaction(query, data.get('product_context'), logistics, session=session)
+        # Partes geradas sob o lock da sessão (microssegundos); o envio/espera acontece fora dele
+        parts = list(parts)
+        if query:
+            support_sessions.remember(session, "user", query, meta.get('intent'))
+            support_sessions.remember(session, "bot", " ".join(text for _, text in parts))
+
+    if meta.get('sentiment') == "FRUSTRATED":
+        with autonomy_lock: AUTONOMY_STATE["dissatisfaction_score"] += 1.0
+
+    delay_ms = random.randint(*SUPPORT_CHAT_DELAY_MS) if query else 0
+    paced = cooperative_sleep()
+    gap = delay_ms / 1000 / max(1, len(parts) - 1) if paced else 0
+
+    def generate():
+        # Sem ritmo no servidor, `deliver_after_ms` deixa o cliente espaçar as partes (como no /chat)
+        yield sse_event("meta", {**meta, "session_id": session_id, "parts": len(parts),
+                                 "deliver_after_ms": 0 if paced else delay_ms})
+        for i, (part, text) in enumerate(parts):
+            if i and gap: time.sleep(gap)
+            yield sse_event("chunk", {"part": part, "text": text})
+        yield sse_event("done", {"response": " ".join(text for _, text in parts)})
+
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no" # proxies (nginx/render) não seguram os eventos em buffer
+    })
+
 # --- NEURAL PULSE ---
+# Só o worker líder roda o pivot/discovery; os demais recebem o catálogo pelo cache compartilhado
+# e o humor/métricas pelo snapshot publicado abaixo. Com CACHE_BACKEND_URL=memory:// não há como
+# compartilhar: create_leader_elector cai para solo:// e cada worker roda o próprio pivot.
+maintainer_leader = create_leader_elector(LEADER_ELECTION_URL, backend=cache_backend, log_callback=add_log)
+AUTONOMY_SNAPSHOT_KEY = "autonomy:state"
+AUTONOMY_SHARED_FIELDS = ("ai_mood", "last_sync", "regional_metrics")
+
+def publish_autonomy_state():
+    cache_backend.set_json(AUTONOMY_SNAPSHOT_KEY, {k: AUTONOMY_STATE[k] for k in AUTONOMY_SHARED_FIELDS})
+
+def adopt_autonomy_state():
+    snapshot = cache_backend.get_json(AUTONOMY_SNAPSHOT_KEY)
+    if snapshot:
+        with autonomy_lock:
+            AUTONOMY_STATE.update({k: snapshot[k] for k in AUTONOMY_SHARED_FIELDS if k in snapshot and k != "ai_mood"})
+        if snapshot.get("ai_mood"): set_ai_mood(snapshot["ai_mood"])
+
 def neural_maintainer():
     # Cold Start Bootstrap
     time.sleep(10)
+    maintainer_leader.start()
+    next_cycle = 0
     while True:
         try:
-            living_ai_pivot()
-            time.sleep(300) # Ciclo de 5 minutos para dinamismo comercial
+            if maintainer_leader.is_leader:
+                # Ciclo de 5 minutos para dinamismo comercial; um novo líder roda imediatamente (failover)
+                if time.time() >= next_cycle:
+                    living_ai_pivot()
+                    publish_autonomy_state()
+                    next_cycle = time.time() + 300
+            else:
+                next_cycle = 0
+                adopt_autonomy_state()
+            time.sleep(maintainer_leader.renew_interval)
         except: time.sleep(60)
 
 threading.Thread(target=neural_maintainer, daemon=True).start()
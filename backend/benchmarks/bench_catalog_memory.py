@@ -0,0 +1,114 @@
+"""
+CATALOG MEMORY BENCHMARK:
+Compara a memória residente do catálogo em cache por worker.
+- legacy: lista de dicts de 16 chaves + metadata (formato antigo do get_products, sem bytes em cache).
+- dicts+bytes: linhas cruas + dicts formatados + bytes por linha + corpos das variantes
+  (cache pré-serializado antes do ProductRecord).
+- compact+recommend: ProductCatalogCache com ProductRecord (slots), índice de nomes e os corpos
+  'full' e 'recommend' pré-serializados (CATALOG_MATERIALIZED_VARIANTS=full,recommend).
+- compact: o mesmo com só o corpo 'full' guardado (padrão); 'recommend' montado por request.
+
+A referência é o legacy: o cache pré-serializado guarda os bytes JSON (~1 cópia do catálogo) e o
+índice de nomes além dos registros, então fica ACIMA do legacy; a coluna vs legacy mostra quanto.
+O ganho dos registros compactos é sobre o dicts+bytes (mesma funcionalidade sem slots).
+
+Uso: python benchmarks/bench_catalog_memory.py [1000 10000 100000]
+"""
+import os
+import sys
+import random
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from catalog_cache import ProductCatalogCache
+from product_record import ProductRecord
+
+CATEGORIES = ["Eletrônicos", "Wearables", "Casa", "Ferramentas", "Áudio", "Intermediação Premium"]
+LOCATIONS = ["SP", "SC", "PR", "MG", "Global"]
+MODELS = ["DROPSHIPPING", "WHITE_LABEL", "MARKETPLACE", "AFFILIATE"]
+
+def synthetic_rows(n, seed=42):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        is_viral = rng.random() > 0.7
+        rows.append({
+            "id": f"{i:08d}-0000-4000-8000-{rng.getrandbits(48):012x}",
+            "name": f"Produto Apex {i} {rng.choice(CATEGORIES)}",
+            "price": round(rng.uniform(20, 900), 2),
+            "base_price": round(rng.uniform(10, 300), 2),
+            "description": f"🚀 Produto Apex {i} [📦 DESPACHO DIRETO]. Oferta Otimizada: ⚡ HUB PRIORITÁRIO | 💰 PREÇO DIRETO",
+            "image_url": f"https://images.unsplash.com/photo-{1500000000000 + i}?q=80&w=600",
+            "category": rng.choice(CATEGORIES),
+            "stock": rng.randint(2, 20),
+            "is_featured": is_viral,
+            "is_active": True,
+            "metadata": {
+                "location": rng.choice(LOCATIONS),
+                "business_model": rng.choice(MODELS),
+                "model_tag": "📦 DESPACHO DIRETO",
+                "strategy": "Giro Rápido",
+                "demand_score": rng.randint(40, 99),
+                "is_viral": is_viral,
+            },
+        })
+    return rows
+
+def legacy_shape(p):
+    price = float(p.get('price', 0))
+    meta = p.get('metadata') or {}
+    return {
+        "id": p['id'], "name": p['name'], "price": price,
+        "base_price": float(p.get('base_price') or (price * 0.65)),
+        "description": p.get('description', ''), "image_url": p['image_url'],
+        "stock": p.get('stock', 10), "original_price": float(price * 2.1),
+        "location": meta.get('location', 'SP'), "is_viral": meta.get('is_viral', False),
+        "demand_score": meta.get('demand_score', 0), "metadata": meta, "ai_mood": "Apex",
+        "is_featured": p.get('is_featured', False),
+        "business_model": meta.get('business_model', 'DROPSHIPPING')
+    }
+
+def measure(build, n):
+    # Linhas "do banco" alocadas dentro da medição: o que sobra depois de descartá-las é o custo retido
+    tracemalloc.start()
+    rows = synthetic_rows(n)
+    held = build(rows)
+    del rows
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return current
+
+def build_legacy(rows):
+    return [legacy_shape(p) for p in rows]
+
+def build_dicts_bytes(rows):
+    shaped = [legacy_shape(p) for p in rows]
+    encoded = [ProductCatalogCache.encode(p) for p in shaped]
+    recommend = [b for p, b in zip(shaped, encoded) if p["is_featured"] or p["price"] > 150]
+    return (list(rows), shaped, encoded, b"[" + b",".join(encoded) + b"]", b"[" + b",".join(recommend) + b"]")
+
+def build_compact(rows, materialized_variants=("full",)):
+    cache = ProductCatalogCache(lambda: rows, lambda r: ProductRecord.from_row(r, ai_mood="Apex"),
+                                materialized_variants=materialized_variants)
+    cache.get()
+    cache.loader = None
+    return cache
+
+def build_compact_recommend(rows):
+    return build_compact(rows, materialized_variants=("full", "recommend"))
+
+def main(sizes):
+    print(f"{'products':>10} | {'legacy (MB)':>12} | {'dicts+bytes (MB)':>16} | {'compact+rec (MB)':>16} | "
+          f"{'compact (MB)':>12} | {'compact vs legacy':>17} | {'compact vs dicts+bytes':>22}")
+    for n in sizes:
+        legacy = measure(build_legacy, n)
+        dicts_bytes = measure(build_dicts_bytes, n)
+        compact_recommend = measure(build_compact_recommend, n)
+        compact = measure(build_compact, n)
+        print(f"{n:>10} | {legacy / 1e6:>12.2f} | {dicts_bytes / 1e6:>16.2f} | {compact_recommend / 1e6:>16.2f} | "
+              f"{compact / 1e6:>12.2f} | {compact / legacy:>16.2f}x | {compact / dicts_bytes:>21.2f}x")
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,93 @@
+"""
+SUPPORT CLASSIFIER BENCHMARK:
+Confere que o MessageClassifier (regex compilada, passada única) devolve os mesmos rótulos de
+intenção/sentimento dos loops `any(w in message ...)` antigos e mede mensagens/s dos dois caminhos.
+O caminho antigo por mensagem = cadeia de intenção + analyze_sentiment duas vezes
+(synthesize_response e simulate_chat_interaction).
+
+Uso: python benchmarks/bench_classifier.py [--messages 50000]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from intent_classifier import classifier, INTENT_KEYWORDS, SENTIMENT_KEYWORDS
+
+def legacy_intent(message):
+    message_low = message.lower()
+    if any(w in message_low for w in ['estoque', 'zero', 'dropshipping', 'funciona', 'modelo']): return "ZERO_COST"
+    elif any(w in message_low for w in ['tem', 'acha', 'busca', 'encontrar', 'procura']): return "SOURCING"
+    elif any(w in message_low for w in ['prazo', 'entrega', 'chega', 'rastreio']): return "LOGISTICS"
+    elif any(w in message_low for w in ['compra', 'preço', 'valor', 'desconto', 'custa']): return "SALES"
+    return "UNKNOWN"
+
+def legacy_sentiment(text):
+    text = text.lower()
+    if any(word in text for word in ['atraso', 'não recebi', 'lento', 'ruim', 'erro', 'problema', 'demora']): return "FRUSTRATED"
+    if any(word in text for word in ['quero', 'comprar', 'desconto', 'valor', 'preço', 'custa']): return "WANT_TO_BUY"
+    if any(word in text for word in ['funciona', 'como', 'estoque', 'zero', 'dropshipping']): return "CURIOSITY"
+    return "NEUTRAL"
+
+def legacy_path(message):
+    intent = legacy_intent(message)
+    legacy_sentiment(message) # synthesize_response
+    return intent, legacy_sentiment(message) # simulate_chat_interaction
+
+EDGE_CASES = [
+    "", "oi", "OI, TUDO BEM?", "Não recebi meu pedido", "NÃO RECEBI", "nao recebi (sem acento)",
+    "Quero comprar", "comprar", "compra", "estoquero", "Sistema lento", "temporada", "modelo novo",
+    "Como funciona o estoque zero?", "Qual o preço e o prazo de entrega?", "Tem desconto?",
+    "O rastreio diz que chega amanhã, mas já houve atraso", "Vocês acham esse valor justo?",
+    "erro erro erro", "dropshippingzero", "encontrarquero", "PROCURA-SE PROJETOR 4K",
+]
+KEYWORDS = [w for table in (INTENT_KEYWORDS, SENTIMENT_KEYWORDS) for _, words in table for w in words]
+FILLER = ("oi olá bom dia boa tarde obrigado pedido produto projetor drone fone bluetooth smartwatch "
+          "sistema temporada meu minha para com sem quando onde hoje amanhã frete pix cartão loja "
+          "eu você vocês o a os as de do da no na um uma que se já ainda mais muito bem isso esse essa").split()
+
+def corpus(n, seed=7, keyword_share=0.5):
+    """Mensagens aleatórias; `keyword_share` = fração das palavras que são palavras-chave."""
+    rng = random.Random(seed)
+    messages = list(EDGE_CASES)
+    for _ in range(n):
+        words = [rng.choice(KEYWORDS if rng.random() < keyword_share else FILLER) for _ in range(rng.randint(1, 30))]
+        if rng.random() < 0.3: words = [w.upper() if rng.random() < 0.5 else w.title() for w in words]
+        glue = "" if rng.random() < 0.05 else " " # sem espaço: exercita ocorrências sobrepostas
+        messages.append(glue.join(words) + rng.choice(["", "?", "!", "..."]))
+    return messages
+
+def rate(fn, messages, rounds=3):
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for message in messages:
+            fn(message)
+        best = min(best, time.perf_counter() - t0)
+    return len(messages) / best
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    cli.add_argument("--messages", type=int, default=50000)
+    args = cli.parse_args()
+
+    messages = corpus(args.messages)
+    mismatches = [(m, legacy_path(m), tuple(classifier.classify(m))) for m in messages
+                  if legacy_path(m) != tuple(classifier.classify(m))]
+    print(f"paridade: {len(messages) - len(mismatches)}/{len(messages)} mensagens com os mesmos rótulos")
+    for message, old, new in mismatches[:10]:
+        print(f"  DIVERGE {message!r}: antigo={old} novo={new}")
+
+    print(f"{'corpus':>24} | {'any() + 2x analyze_sentiment':>28} | {'MessageClassifier':>17} | ganho")
+    for name, share in (("típico (~10% chave)", 0.1), ("denso (~50% chave)", 0.5)):
+        sample = [m for m in corpus(args.messages, seed=11, keyword_share=share) if len(m) < 160]
+        old_rate = rate(legacy_path, sample)
+        new_rate = rate(classifier.classify, sample)
+        print(f"{name:>24} | {old_rate:>22,.0f} msg/s | {new_rate:>11,.0f} msg/s | {new_rate / old_rate:.1f}x")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
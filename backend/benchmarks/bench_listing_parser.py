@@ -0,0 +1,71 @@
+"""
+LISTING PARSER BENCHMARK:
+Compara os backends do listing_parser (bs4 legado, bs4 com SoupStrainer, lxml, selectolax)
+em páginas de listagem salvas e confere que todos extraem os mesmos campos.
+
+Uso: python benchmarks/bench_listing_parser.py [pagina1.html pagina2.html ...]
+Sem argumentos, usa o corpus offline de benchmarks/fixtures/listings (ver bench_scraper.py).
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bs4 import BeautifulSoup
+from listing_parser import PARSER_BACKENDS
+
+def legacy_parse(html, limit=None):
+    """Caminho antigo do search_mercadolivre: documento inteiro + select_one por campo."""
+    soup = BeautifulSoup(html, 'html.parser')
+    results = soup.select('li.ui-search-layout__item') or soup.select('div.ui-search-result__wrapper')
+    items = []
+    for item in results[:limit]:
+        title_elem = item.select_one('.ui-search-item__title') or item.select_one('.poly-component__title')
+        price_elem = item.select_one('.ui-search-price__part .andes-money-amount__fraction') or item.select_one('.poly-price__current .andes-money-amount__fraction')
+        link_elem = item.select_one('a.ui-search-link') or item.select_one('a.poly-component__title')
+        seller_elem = item.select_one('.ui-search-item__group__element--seller') or item.select_one('.poly-component__seller')
+        img_elem = item.select_one('img.ui-search-result-image__element') or item.select_one('.poly-component__picture img')
+        loc_elem = item.select_one('.ui-search-item__location') or item.select_one('.poly-component__location')
+        items.append({
+            "title": title_elem.get_text().strip() if title_elem else None,
+            "price": price_elem.get_text().strip() if price_elem else None,
+            "link": link_elem.get('href') if link_elem else None,
+            "seller": seller_elem.get_text().strip() if seller_elem else None,
+            "image": (img_elem.get('src') or img_elem.get('data-src')) if img_elem else None,
+            "location": loc_elem.get_text().strip() if loc_elem else None,
+        })
+    return items
+
+def timed(parse, pages, rounds):
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for html in pages:
+            parse(html)
+    return (time.perf_counter() - t0) * 1000 / (rounds * len(pages))
+
+def main(paths):
+    if not paths:
+        corpus = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "listings")
+        paths = sorted(os.path.join(corpus, f) for f in os.listdir(corpus) if f.endswith(".html"))
+    pages = [open(p, encoding="utf-8").read() for p in paths]
+    rounds = 20
+
+    baseline = [legacy_parse(html) for html in pages]
+    backends = [("bs4 (legado)", legacy_parse)]
+    for name, cls in PARSER_BACKENDS.items():
+        try:
+            backends.append((name, cls().parse))
+        except ImportError:
+            print(f"{name}: não instalado, ignorado")
+
+    legacy_ms = None
+    print(f"{'backend':>14} | {'ms/página':>10} | {'speedup':>8} | mesmos campos")
+    for name, parse in backends:
+        ms = timed(parse, pages, rounds)
+        legacy_ms = legacy_ms or ms
+        same = all(parse(html) == expected for html, expected in zip(pages, baseline))
+        print(f"{name:>14} | {ms:>10.2f} | {legacy_ms / ms:>7.1f}x | {same}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,73 @@
+"""
+PRICING BENCHMARK:
+Compara o loop escalar antigo do living_ai_pivot com o BatchPricingEngine vetorizado.
+
+Uso: python benchmarks/bench_pricing.py [1000 10000 50000]
+"""
+import os
+import sys
+import time
+import random
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from competitive_engine import ApexHybridEngine, ApexLegendGenerator
+from pricing_engine import BatchPricingEngine
+
+def synthetic_rows(n, seed=7):
+    rng = random.Random(seed)
+    return [{
+        "id": f"p{i}",
+        "name": f"Produto {'Special ' if i % 17 == 0 else ''}{i}",
+        "base_price": round(rng.uniform(10, 300), 2),
+        "price": round(rng.uniform(20, 900), 2),
+        "metadata": {"location": rng.choice(["SP", "SC", "PR", "MG", "Global"])},
+    } for i in range(n)]
+
+def scalar_pivot(rows, multiplier, m_pressure, sup_pressure):
+    batch = []
+    for p in rows:
+        base = float(p.get('base_price') or 0)
+        if base <= 0: continue
+        loc = (p.get('metadata') or {}).get('location', 'Global')
+        loc_adj = 0.95 if loc in ['SP', 'SC'] else 1.0
+        # O loop original lia só id, name, base_price e metadata: price ausente na escolha do modelo
+        model_info = ApexHybridEngine.select_best_model({**p, "price": 0}, m_pressure)
+        legend = ApexLegendGenerator.generate_aggressive_copy(p['name'], model_info)
+        final_price = round(base * multiplier * loc_adj, 2) + 0.90
+        d_score = int(random.uniform(85, 99)) if sup_pressure > 0.6 else int(random.uniform(40, 80))
+        is_viral = d_score > 90
+        batch.append({
+            "id": p['id'], "price": final_price, "description": legend,
+            "stock": random.randint(2, 5) if is_viral else random.randint(10, 20),
+            "is_featured": is_viral, "is_active": True,
+            "updated_at": datetime.datetime.now().isoformat(),
+            "metadata": {**(p.get('metadata') or {}), "business_model": model_info['model'],
+                         "model_tag": model_info['tag'], "strategy": model_info['strategy'],
+                         "demand_score": d_score, "is_viral": is_viral}
+        })
+    return batch
+
+def main(sizes):
+    engine = BatchPricingEngine(seed=1)
+    multiplier, m_pressure, sup_pressure = 2.1, 0.93, 0.7
+    print(f"{'products':>10} | {'scalar (ms)':>12} | {'vector core (ms)':>16} | {'vector+payloads (ms)':>20} | models match")
+    for n in sizes:
+        rows = synthetic_rows(n)
+
+        t0 = time.perf_counter()
+        legacy = scalar_pivot(rows, multiplier, m_pressure, sup_pressure)
+        scalar_ms = (time.perf_counter() - t0) * 1000
+
+        t0 = time.perf_counter()
+        result = engine.reprice(rows, multiplier, m_pressure, sup_pressure)
+        core_ms = (time.perf_counter() - t0) * 1000
+        payloads = engine.build_payloads(result, datetime.datetime.now().isoformat())
+        total_ms = (time.perf_counter() - t0) * 1000
+
+        same_models = all(a["metadata"]["business_model"] == b["metadata"]["business_model"] for a, b in zip(legacy, payloads))
+        print(f"{n:>10} | {scalar_ms:>12.1f} | {core_ms:>16.1f} | {total_ms:>20.1f} | {same_models}")
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1000, 10000, 50000])
@@ -0,0 +1,70 @@
+"""
+QUOTE AGGREGATOR LOAD TEST (OFFLINE):
+Dispara cotações concorrentes no QuoteAggregator com fornecedores stub (sem rede) e mede
+latência (p50/p95/máx), cotações/s, fornecedores fora do prazo e produtos fundidos por cotação.
+
+Uso: python benchmarks/bench_quotes.py [--clients 32] [--requests 400] [--deadline 0.5] [--stubs 6]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from supplier_adapters import SupplierRegistry, StubSupplierAdapter, QuoteAggregator, STUB_ADAPTERS
+
+QUERIES = ["fone bluetooth", "smartwatch", "projetor 4k", "drone", "mochila antifurto", "aspirador robo"]
+DESTINATIONS = ["SP", "SC", "RJ", "BA", "DF"]
+
+def build_registry(stubs):
+    registry = SupplierRegistry(factory() for factory in STUB_ADAPTERS.values())
+    for i in range(max(0, stubs - len(STUB_ADAPTERS))):
+        # Fornecedores extras, um deles lento o bastante para estourar o prazo às vezes
+        latency = 900 if i == 0 else 60 + 40 * i
+        registry.register(StubSupplierAdapter(f"stub{i}", ["SP", "PR", "GO", "PE"], 0.7 + 0.1 * (i % 4), latency, 0.02))
+    return registry
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    cli.add_argument("--clients", type=int, default=32)
+    cli.add_argument("--requests", type=int, default=400)
+    cli.add_argument("--deadline", type=float, default=0.5)
+    cli.add_argument("--stubs", type=int, default=6)
+    cli.add_argument("--workers", type=int, default=None, help="threads do agregador (padrão: clientes x fornecedores)")
+    args = cli.parse_args()
+
+    registry = build_registry(args.stubs)
+    aggregator = QuoteAggregator(registry, deadline=args.deadline, max_workers=args.workers or args.clients * len(registry.names()))
+
+    def one(i):
+        t0 = time.perf_counter()
+        result = aggregator.aggregate(QUERIES[i % len(QUERIES)], destination=DESTINATIONS[i % len(DESTINATIONS)], limit=6)
+        return (time.perf_counter() - t0) * 1000, result
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as clients:
+        runs = list(clients.map(one, range(args.requests)))
+    wall = time.perf_counter() - t0
+
+    latencies = sorted(ms for ms, _ in runs)
+    outcomes = Counter()
+    for _, result in runs:
+        for name, status in result["suppliers"].items():
+            outcomes[(name, status.split(":")[0])] += 1
+    products = statistics.mean(len(result["products"]) for _, result in runs)
+    multi = statistics.mean(sum(1 for p in result["products"] if len(p["suppliers"]) > 1) for _, result in runs)
+
+    print(f"{args.requests} cotações, {args.clients} clientes, {len(registry.names())} fornecedores, prazo {args.deadline}s")
+    print(f"  {args.requests / wall:.1f} cotações/s | p50 {latencies[len(latencies) // 2]:.0f} ms | "
+          f"p95 {latencies[int(len(latencies) * 0.95)]:.0f} ms | máx {latencies[-1]:.0f} ms")
+    print(f"  produtos por cotação: {products:.1f} (com 2+ fornecedores: {multi:.1f})")
+    for name in registry.names():
+        row = {status: count for (n, status), count in outcomes.items() if n == name}
+        print(f"  {name:>12}: {row}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+SCRAPER BENCHMARK (OFFLINE):
+Mede o scraper contra o corpus de benchmarks/fixtures/listings, sem tocar o site real.
+
+1. Parse: para cada backend do listing_parser e cada página do corpus,
+   ms por página (mediana), itens/s e memória por parse (pico do heap Python via tracemalloc;
+   alocações internas em C do lxml/lexbor não entram na conta). Confere a contagem
+   de itens contra o manifest.
+2. Ponta a ponta: search_mercadolivre / search_many contra o stand-in local
+   (benchmarks/fixture_server.py), page cache desligado.
+
+Uso: python benchmarks/bench_scraper.py [--rounds 20] [--latency-ms 0] [--skip-e2e]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+
+from listing_parser import PARSER_BACKENDS
+from fixture_server import FIXTURES, serve_in_background
+
+def load_fixtures():
+    with open(os.path.join(FIXTURES, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    for entry in manifest:
+        with open(os.path.join(FIXTURES, entry["file"]), encoding="utf-8") as f:
+            entry["html"] = f.read()
+    return manifest
+
+def measure_parse(parse, html, rounds):
+    parse(html) # aquece (compilação de seletores, caches do parser)
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        items = parse(html)
+        samples.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    parse(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    ms = statistics.median(samples) * 1000
+    return ms, len(items), peak
+
+def bench_parsers(fixtures, rounds):
+    print(f"{'backend':>10} | {'página':<36} | {'layout':<9} | {'itens':>5} | {'ms/página':>9} | {'itens/s':>9} | {'KB/parse':>8} | ok")
+    totals = {}
+    for name, cls in PARSER_BACKENDS.items():
+        try:
+            parse = cls().parse
+        except ImportError:
+            print(f"{name:>10} | não instalado, ignorado")
+            continue
+        for entry in fixtures:
+            ms, count, peak = measure_parse(parse, entry["html"], rounds)
+            rate = count / (ms / 1000) if count else 0
+            ok = count == entry["items"]
+            total = totals.setdefault(name, {"ms": 0.0, "items": 0, "peak": 0, "ok": True})
+            total["ms"] += ms
+            total["items"] += count
+            total["peak"] = max(total["peak"], peak)
+            total["ok"] &= ok
+            print(f"{name:>10} | {entry['file']:<36} | {entry['layout']:<9} | {count:>5} | {ms:>9.2f} | {rate:>9.0f} | {peak / 1024:>8.0f} | {ok}")
+
+    print(f"\n{'backend':>10} | {'ms/página':>9} | {'itens/s':>9} | {'KB pico':>8} | contagens ok")
+    for name, total in totals.items():
+        pages = len(fixtures)
+        print(f"{name:>10} | {total['ms'] / pages:>9.2f} | {total['items'] / (total['ms'] / 1000):>9.0f} | {total['peak'] / 1024:>8.0f} | {total['ok']}")
+
+def bench_end_to_end(fixtures, latency_ms):
+    server, base_url = serve_in_background(latency_ms=latency_ms)
+    from http_client import http_client
+    from sourcing_engine import LiveSourcingEngine
+    LiveSourcingEngine.LISTING_BASE_URL = base_url
+    if http_client.guard: # o stand-in passa pelo guard como o upstream real, mas sem o rate limit dele
+        http_client.guard.host_limits["127.0.0.1"] = {"rate": 1000, "burst": 1000}
+        if http_client.guard.hosts is not None: http_client.guard.hosts.add("127.0.0.1")
+    LiveSourcingEngine.page_cache = None
+
+    queries = sorted({entry["query"] for entry in fixtures if entry["items"]})
+    t0 = time.perf_counter()
+    sequential = [LiveSourcingEngine.search_mercadolivre(q, limit=50) for q in queries]
+    seq_ms = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    fanout = LiveSourcingEngine.search_many(queries, limit=50, pages=2, deadline=30)
+    fan_ms = (time.perf_counter() - t0) * 1000
+    server.shutdown()
+
+    print(f"\nPonta a ponta via {base_url} (parser: {type(LiveSourcingEngine.parser).__name__}, latência {latency_ms} ms)")
+    print(f"  search_mercadolivre sequencial: {len(queries)} buscas, {sum(len(r or []) for r in sequential)} itens, {seq_ms:.1f} ms")
+    print(f"  search_many (2 páginas):        {len(queries) * 2} buscas, {len(fanout)} itens únicos, {fan_ms:.1f} ms")
+    print(f"  requisições servidas: {server.stats['requests']} ({server.stats['hits']} do corpus)")
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    cli.add_argument("--rounds", type=int, default=20)
+    cli.add_argument("--latency-ms", type=int, default=0, help="latência artificial do stand-in (ponta a ponta)")
+    cli.add_argument("--skip-e2e", action="store_true")
+    args = cli.parse_args()
+
+    fixtures = load_fixtures()
+    bench_parsers(fixtures, args.rounds)
+    if not args.skip_e2e:
+        bench_end_to_end(fixtures, args.latency_ms)
+
+if __name__ == "__main__":
+    main()
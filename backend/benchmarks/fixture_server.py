@@ -0,0 +1,89 @@
+"""
+FIXTURE SERVER:
+Stand-in HTTP local da lista.mercadolivre.com.br servindo o corpus de benchmarks/fixtures/listings.
+Mesmo formato de URL do scraper: /{query-com-hifens} e /{query}_Desde_{offset} (página 2+).
+Queries fora do manifest recebem a página sem resultados (200), como o site real.
+
+Uso:
+    python benchmarks/fixture_server.py [--port 8765] [--latency-ms 0]
+    SOURCING_LISTING_URL=http://127.0.0.1:8765 SOURCING_PAGE_CACHE_PATH= python app.py
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from urllib.parse import unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "listings")
+PAGE_SIZE = 50
+_OFFSET = re.compile(r"_Desde_(\d+)$")
+
+def load_corpus(directory=FIXTURES):
+    """{(query com hífens, página): html} + a página vazia usada como fallback."""
+    with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    pages, empty = {}, None
+    for entry in manifest:
+        with open(os.path.join(directory, entry["file"]), encoding="utf-8") as f:
+            html = f.read().encode("utf-8")
+        if entry["items"] == 0:
+            empty = html
+        pages[(entry["query"].replace(" ", "-"), entry["page"])] = html
+    return pages, empty
+
+def route(path):
+    """'/fone-bluetooth_Desde_51' -> ('fone-bluetooth', 2)"""
+    slug = unquote(path.split("?", 1)[0].split("#", 1)[0]).strip("/")
+    match = _OFFSET.search(slug)
+    if match:
+        return slug[:match.start()], (int(match.group(1)) - 1) // PAGE_SIZE + 1
+    return slug, 1
+
+def create_server(host="127.0.0.1", port=8765, latency_ms=0, directory=FIXTURES):
+    pages, empty = load_corpus(directory)
+    stats = {"requests": 0, "hits": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # keep-alive, como o upstream real
+
+        def do_GET(self):
+            stats["requests"] += 1
+            body = pages.get(route(self.path))
+            if body is not None: stats["hits"] += 1
+            body = body if body is not None else empty
+            if latency_ms: time.sleep(latency_ms / 1000)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.stats = stats
+    return server
+
+def serve_in_background(port=0, latency_ms=0):
+    """Sobe o servidor numa thread daemon; devolve (server, base_url). port=0 escolhe uma porta livre."""
+    server = create_server(port=port, latency_ms=latency_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    cli.add_argument("--port", type=int, default=8765)
+    cli.add_argument("--latency-ms", type=int, default=0, help="atraso artificial por resposta")
+    args = cli.parse_args()
+    server = create_server(port=args.port, latency_ms=args.latency_ms)
+    print(f"Servindo {FIXTURES} em http://127.0.0.1:{args.port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,118 @@
+"""
+FIXTURE CORPUS BUILDER:
+Gera o corpus offline de páginas de listagem do Mercado Livre usado pelos benchmarks
+e pelo stand-in HTTP (benchmarks/fixture_server.py).
+
+As páginas reproduzem a estrutura das listagens reais nos dois layouts suportados pelo scraper:
+- ui-search-*: li.ui-search-layout__item / .ui-search-item__title / .ui-search-price__part ...
+- poly-component__*: .poly-component__title / .poly-price__current / .poly-component__seller ...
+com o "ruído" de uma página real (menu, filtros, estado pré-carregado em <script>, anúncios,
+preço antigo riscado, itens sem vendedor/local/imagem). Conteúdo determinístico (seed fixa).
+
+Uso: python benchmarks/fixtures/build_corpus.py
+"""
+import os
+import json
+import random
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+OUT = os.path.join(HERE, "listings")
+
+PAGES = [
+    # arquivo, query, página, layout, contêiner de resultado, itens
+    ("ui_search_fone_bluetooth_p1.html", "fone bluetooth", 1, "ui-search", "li", 48),
+    ("ui_search_fone_bluetooth_p2.html", "fone bluetooth", 2, "ui-search", "li", 48),
+    ("ui_search_smartwatch_wrapper.html", "smartwatch", 1, "ui-search", "div", 36),
+    ("poly_projetor_4k_p1.html", "projetor 4k", 1, "poly", "li", 48),
+    ("poly_drone_wrapper.html", "drone", 1, "poly", "div", 40),
+    ("empty_results.html", "xyzzy inexistente", 1, "ui-search", "li", 0),
+]
+
+BRANDS = ["Lenovo", "Xiaomi", "JBL", "Samsung", "Magcubic", "DJI", "Haylou", "QCY", "Baseus", "Amazfit"]
+ADJECTIVES = ["Original", "Premium", "Pro", "Max", "Lite", "Ultra", "Oficial", "Plus"]
+LOCATIONS = ["São Paulo", "Santa Catarina", "Paraná", "Minas Gerais", "Rio de Janeiro", "Capital Federal"]
+
+def money(value):
+    return f"{int(value):,}".replace(",", "."), f"{int(round(value * 100)) % 100:02d}"
+
+def chrome(rng, query):
+    nav = "".join(f'<li class="nav-menu-categories-link"><a href="https://www.mercadolivre.com.br/c/{i}">Categoria {i}</a></li>' for i in range(96))
+    filters = "".join(
+        f'<li class="ui-search-filter-container"><a class="ui-search-link" href="/{query.replace(" ", "-")}_Filtro_{i}">'
+        f'<span class="ui-search-filter-name">Filtro {i}</span><span class="ui-search-filter-results">({rng.randint(10, 9000)})</span></a></li>'
+        for i in range(60))
+    state = json.dumps({"initialState": {"results": [{"id": f"MLB{rng.getrandbits(40)}", "k": "x" * 40} for _ in range(220)]}})
+    head = (f'<header class="nav-header"><ul class="nav-menu">{nav}</ul></header>'
+            f'<aside class="ui-search-sidebar"><h1 class="ui-search-breadcrumb__title">{query.title()}</h1><ul>{filters}</ul></aside>')
+    foot = f'<footer class="nav-footer">{nav}</footer><script id="__PRELOADED_STATE__" type="application/json">{state}</script>'
+    return head, foot
+
+def ui_search_item(rng, i, query, tag):
+    title = f"{query.title()} {rng.choice(BRANDS)} {rng.choice(ADJECTIVES)} {rng.randint(2, 900)}"
+    fraction, cents = money(rng.uniform(29, 4800))
+    old_fraction, _ = money(rng.uniform(4800, 6000))
+    parts = [f'<div class="ui-search-result__wrapper"><div class="ui-search-result__image">']
+    if rng.random() > 0.05:
+        lazy = rng.random() > 0.5
+        src = f'src="data:image/gif;base64,R0lGODlhAQABAAAAACH5BAEKAAEALAAAAAABAAEAAAICTAEAOw==" data-src' if lazy else "src"
+        parts.append(f'<img class="ui-search-result-image__element" {src}="https://http2.mlstatic.com/D_NQ_NP_{i:04d}-MLB.webp" alt="{title}">')
+    parts.append('</div><div class="ui-search-result__content">')
+    if rng.random() < 0.1:
+        parts.append('<span class="ui-search-item__ad-label">Patrocinado</span>')
+    parts.append(f'<a class="ui-search-item__group__element ui-search-link" href="https://produto.mercadolivre.com.br/MLB-{3000000000 + i}-{title.lower().replace(" ", "-")}-_JM">'
+                 f'<h2 class="ui-search-item__title">{title.replace("&", "&amp;")}</h2></a>')
+    if rng.random() < 0.4:
+        parts.append(f'<s class="andes-money-amount andes-money-amount--previous"><span class="andes-money-amount__fraction">{old_fraction}</span></s>')
+    parts.append(f'<div class="ui-search-price__part"><span class="andes-money-amount__currency-symbol">R$</span>'
+                 f'<span class="andes-money-amount__fraction">{fraction}</span><span class="andes-money-amount__cents">{cents}</span></div>')
+    if rng.random() > 0.2:
+        seller = f"Por {rng.choice(BRANDS)} Store" + (" MercadoLíder Platinum" if rng.random() < 0.3 else "")
+        parts.append(f'<p class="ui-search-item__group__element--seller">{seller}</p>')
+    if rng.random() > 0.25:
+        parts.append(f'<span class="ui-search-item__location">{rng.choice(LOCATIONS)}</span>')
+    parts.append("</div></div>")
+    body = "".join(parts)
+    return f'<li class="ui-search-layout__item">{body}</li>' if tag == "li" else body
+
+def poly_item(rng, i, query, tag):
+    title = f"{query.title()} {rng.choice(BRANDS)} {rng.choice(ADJECTIVES)} {rng.randint(2, 900)}"
+    fraction, cents = money(rng.uniform(29, 4800))
+    parts = ['<div class="poly-card poly-card--list"><div class="poly-card__portada">']
+    if rng.random() > 0.05:
+        parts.append(f'<div class="poly-component__picture"><img src="https://http2.mlstatic.com/D_Q_NP_{i:04d}-MLB.webp" alt="{title}"></div>')
+    parts.append('</div><div class="poly-card__content">')
+    parts.append(f'<h3 class="poly-component__title-wrapper"><a class="poly-component__title" href="https://www.mercadolivre.com.br/p/MLB{2000000 + i}">{title}</a></h3>')
+    if rng.random() > 0.2:
+        parts.append(f'<span class="poly-component__seller">Vendido por {rng.choice(BRANDS)}' + (" MercadoLíder" if rng.random() < 0.3 else "") + '</span>')
+    parts.append(f'<div class="poly-component__price"><div class="poly-price__current"><span class="andes-money-amount">'
+                 f'<span class="andes-money-amount__fraction">{fraction}</span><span class="andes-money-amount__cents">{cents}</span></span></div></div>')
+    if rng.random() > 0.3:
+        parts.append(f'<span class="poly-component__location">{rng.choice(LOCATIONS)}</span>')
+    parts.append("</div></div>")
+    body = "".join(parts)
+    return f'<li class="ui-search-layout__item">{body}</li>' if tag == "li" else f'<div class="ui-search-result__wrapper">{body}</div>'
+
+def build_page(query, page, layout, tag, count):
+    rng = random.Random(f"{query}|{page}|{layout}|{tag}")
+    make = ui_search_item if layout == "ui-search" else poly_item
+    items = "".join(make(rng, (page - 1) * 50 + i, query, tag) for i in range(count))
+    head, foot = chrome(rng, query)
+    results = f'<ol class="ui-search-layout ui-search-layout--stack">{items}</ol>' if count else \
+        '<div class="ui-search-rescue"><h3>Não há anúncios que correspondam à sua busca.</h3></div>'
+    return (f'<!DOCTYPE html><html lang="pt-BR"><head><meta charset="utf-8"><title>{query.title()} | MercadoLivre</title></head>'
+            f'<body>{head}<main class="ui-search-main"><section class="ui-search-results">{results}</section></main>{foot}</body></html>')
+
+def main():
+    os.makedirs(OUT, exist_ok=True)
+    manifest = []
+    for filename, query, page, layout, tag, count in PAGES:
+        html = build_page(query, page, layout, tag, count)
+        with open(os.path.join(OUT, filename), "w", encoding="utf-8") as f:
+            f.write(html)
+        manifest.append({"file": filename, "query": query, "page": page, "layout": layout, "items": count})
+    with open(os.path.join(OUT, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    print(f"{len(manifest)} páginas em {OUT}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class BulkWriteResult:
+    """Resultado agregado de uma escrita em lote (linhas gravadas/falhas + métricas por chunk)."""
+    __slots__ = ("operation", "table", "written", "failed", "chunks", "duration_ms")
+
+    def __init__(self, operation, table):
+        self.operation = operation
+        self.table = table
+        self.written = []
+        self.failed = []
+        self.chunks = []
+        self.duration_ms = 0.0
+
+    @property
+    def ok(self): return not self.failed
+
+    def summary(self):
+        return {
+            "operation": self.operation,
+            "table": self.table,
+            "written": len(self.written),
+            "failed": len(self.failed),
+            "chunks": len(self.chunks),
+            "retries": sum(c["attempts"] - 1 for c in self.chunks),
+            "duration_ms": round(self.duration_ms, 1)
+        }
+
+class SupabaseBulkWriter:
+    """
+    SUPABASE BULK WRITER v1.0 (CHUNKED + RETRY):
+    Divide upserts/inserts grandes em chunks limitados e envia em paralelo.
+    - Chunks de até `chunk_size` linhas; PostgREST exige as mesmas chaves em todas as linhas
+      de um lote, então as linhas são agrupadas por conjunto de colunas antes do corte.
+    - Até `max_workers` chunks simultâneos.
+    - Retry com backoff exponencial + jitter apenas em erros transitórios
+      (rede, timeout, 408/429/5xx, statement timeout, deadlock).
+    - Métricas por chunk (linhas, tentativas, duração, erro) e acumuladas em `stats`.
+    Um chunk que falha não derruba os demais: o resultado informa o que foi gravado.
+    """
+    TRANSIENT_STATUS = {408, 425, 429, 500, 502, 503, 504}
+    TRANSIENT_PG_CODES = {"40001", "40P01", "53300", "57014", "57P01"}
+    TRANSIENT_EXCEPTIONS = ("TimeoutException", "TransportError", "NetworkError", "RemoteProtocolError",
+                            "ConnectionError", "Timeout", "TimeoutError", "ConnectionResetError")
+
+    def __init__(self, client_getter, chunk_size=500, max_workers=4, max_retries=4,
+                 base_delay=0.5, max_delay=8.0, log_callback=None):
+        self.client_getter = client_getter # callable: o client pode ser (re)criado depois do import
+        self.chunk_size = max(1, chunk_size)
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.log_callback = log_callback
+        self._stats_lock = threading.Lock()
+        self.stats = {"writes": 0, "chunks": 0, "rows": 0, "retries": 0, "failed_chunks": 0, "failed_rows": 0}
+
+    def _log(self, message, log_type='system'):
+        if self.log_callback:
+            self.log_callback(message, log_type)
+
+    @classmethod
+    def is_transient(cls, exc):
+        status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+        if status in cls.TRANSIENT_STATUS:
+            return True
+        code = getattr(exc, "code", None)
+        if code is not None and str(code) in cls.TRANSIENT_PG_CODES | {str(s) for s in cls.TRANSIENT_STATUS}:
+            return True
+        return any(k.__name__ in cls.TRANSIENT_EXCEPTIONS for k in type(exc).__mro__)
+
+    def chunks(self, rows):
+        groups = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        for group in groups.values():
+            for start in range(0, len(group), self.chunk_size):
+                yield group[start:start + self.chunk_size]
+
+    def upsert(self, table, rows, **options):
+        return self.write("upsert", table, rows, **options)
+
+    def insert(self, table, rows, **options):
+        return self.write("insert", table, rows, **options)
+
+    def write(self, operation, table, rows, **options):
+        result = BulkWriteResult(operation, table)
+        client = self.client_getter()
+        if not rows or client is None:
+            return result
+
+        started = time.perf_counter()
+        chunks = list(self.chunks(rows))
+        if len(chunks) == 1 or self.max_workers == 1:
+            outcomes = [self._send(client, operation, table, i, chunk, options) for i, chunk in enumerate(chunks)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks)), thread_name_prefix="bulk-writer") as pool:
+                outcomes = list(pool.map(lambda args: self._send(client, operation, table, *args, options),
+                                         enumerate(chunks)))
+        result.duration_ms = (time.perf_counter() - started) * 1000
+
+        for chunk, metrics in zip(chunks, outcomes):
+            result.chunks.append(metrics)
+            (result.written if metrics["ok"] else result.failed).extend(chunk)
+
+        with self._stats_lock:
+            self.stats["writes"] += 1
+            self.stats["chunks"] += len(chunks)
+            self.stats["rows"] += len(result.written)
+            self.stats["retries"] += sum(m["attempts"] - 1 for m in outcomes)
+            self.stats["failed_chunks"] += sum(1 for m in outcomes if not m["ok"])
+            self.stats["failed_rows"] += len(result.failed)
+
+        if result.failed:
+            first_error = next(m["error"] for m in outcomes if not m["ok"])
+            self._log(f"⚠️ BULK {operation.upper()} {table}: {len(result.failed)}/{len(rows)} linhas falharam ({first_error})", "error")
+        return result
+
+    def _send(self, client, operation, table, index, chunk, options):
+        attempts = 0
+        error = None
+        started = time.perf_counter()
+        while True:
+            attempts += 1
+            try:
+                getattr(client.table(table), operation)(chunk, **options).execute()
+                error = None
+                break
+            except Exception as e:
+                error = e
+                if attempts > self.max_retries or not self.is_transient(e):
+                    break
+                delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+                time.sleep(delay * random.uniform(0.5, 1.0))
+        return {
+            "chunk": index,
+            "rows": len(chunk),
+            "attempts": attempts,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "ok": error is None,
+            "error": None if error is None else str(error)
+        }
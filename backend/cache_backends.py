@@ -0,0 +1,311 @@
+import os
+import json
+import time
+import struct
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import urlparse, parse_qs
+
+class CacheBackend:
+    """
+    CACHE BACKEND v1.0 (Interface):
+    Armazenamento chave -> bytes com TTL, compartilhável entre workers do gunicorn.
+    - get/set/delete: operações básicas.
+    - add: grava apenas se a chave não existir (base para locks/leases entre processos).
+    - compare_and_set/compare_and_delete: troca/remove só se o valor atual (não expirado) for o
+      esperado, de forma atômica (renovação e devolução de leases sem janela entre get e set).
+    """
+    shared = False # True quando o estado é visível para outros processos
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def add(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def compare_and_set(self, key, expected, value, ttl=None):
+        raise NotImplementedError
+
+    def compare_and_delete(self, key, expected):
+        raise NotImplementedError
+
+    def get_json(self, key):
+        raw = self.get(key)
+        if raw is None: return None
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    def set_json(self, key, value, ttl=None):
+        self.set(key, json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), ttl)
+
+class LocalLRUBackend(CacheBackend):
+    """LRU em processo (limitado por número de entradas) com TTL por chave."""
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None: return None
+            expiry, value = item
+            if expiry and now >= expiry:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (time.time() + ttl if ttl else 0, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item and (not item[0] or time.time() < item[0]):
+                return False
+            self._data[key] = (time.time() + ttl if ttl else 0, value)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def _current(self, key):
+        item = self._data.get(key)
+        if item is None or (item[0] and time.time() >= item[0]): return None
+        return item[1]
+
+    def compare_and_set(self, key, expected, value, ttl=None):
+        with self._lock:
+            if self._current(key) != expected: return False
+            self._data[key] = (time.time() + ttl if ttl else 0, value)
+            self._data.move_to_end(key)
+            return True
+
+    def compare_and_delete(self, key, expected):
+        with self._lock:
+            if self._current(key) != expected: return False
+            del self._data[key]
+            return True
+
+class SharedMemoryBackend(CacheBackend):
+    """
+    Store em memória compartilhada para workers do mesmo host:
+    um arquivo por chave em tmpfs (/dev/shm), escrito de forma atômica (os.replace).
+    Cabeçalho de 8 bytes com a expiração (epoch, 0 = sem TTL).
+    - add() e toda remoção de arquivo expirado rodam sob flock do diretório: dois processos nunca
+      "ganham" o mesmo add, mesmo disputando uma chave expirada. Leituras não apagam nada.
+    - A remoção de expirado é compare-and-delete: o arquivo é renomeado para um nome único e só é
+      apagado se ainda estiver expirado (senão volta para o lugar).
+    - Chaves de coordenação (`pinned_prefixes`: estado/log do catálogo, leases, autonomia) ficam em
+      pinned/ e nunca são despejadas por tamanho, só removidas depois de expirar; o limite de
+      `max_entries` vale para as demais (caches de página/estimativa, jobs).
+    """
+    shared = True
+    HEADER = struct.Struct("!d")
+    PINNED_PREFIXES = ("catalog:", "leader:", "autonomy:")
+
+    def __init__(self, path="/dev/shm/dropmasters-cache", max_entries=4096, pinned_prefixes=PINNED_PREFIXES):
+        self.path = path
+        self.max_entries = max_entries
+        self.pinned_prefixes = tuple(pinned_prefixes)
+        self.pinned_path = os.path.join(path, "pinned")
+        self._lock_path = os.path.join(path, ".lock")
+        self._writes = 0
+        os.makedirs(self.pinned_path, exist_ok=True)
+
+    def _file(self, key):
+        folder = self.pinned_path if key.startswith(self.pinned_prefixes) else self.path
+        return os.path.join(folder, hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+    @contextmanager
+    def _exclusive(self):
+        # flock entre processos (e entre threads: cada chamada abre sua própria descrição do arquivo)
+        import fcntl
+        with open(self._lock_path, "ab") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _load(self, path):
+        """(expiração, valor) do arquivo, ou None se não existe / está truncado."""
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return None
+        if len(raw) < self.HEADER.size: return None
+        return self.HEADER.unpack_from(raw)[0], raw[self.HEADER.size:]
+
+    @staticmethod
+    def _is_expired(expiry, now=None):
+        return bool(expiry) and (now or time.time()) >= expiry
+
+    def _read(self, path):
+        item = self._load(path)
+        if item is None or self._is_expired(item[0]): return None
+        return item[1]
+
+    def _remove_if_expired(self, path):
+        """Compare-and-delete (chamar sob _exclusive): só apaga se o arquivo no caminho ainda estiver expirado."""
+        grabbed = f"{path}.{os.getpid()}.{threading.get_ident()}.expired.tmp"
+        try:
+            os.rename(path, grabbed)
+        except FileNotFoundError:
+            return
+        item = self._load(grabbed)
+        if item is not None and not self._is_expired(item[0]):
+            # Regravado (set) entre a leitura e o rename: devolve; se já há uma versão mais nova, ela fica
+            try:
+                os.link(grabbed, path)
+            except FileExistsError: pass
+        os.unlink(grabbed)
+
+    def get(self, key):
+        return self._read(self._file(key))
+
+    def set(self, key, value, ttl=None):
+        path = self._file(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.HEADER.pack(time.time() + ttl if ttl else 0) + value)
+        os.replace(tmp, path)
+        self._maybe_evict()
+
+    def add(self, key, value, ttl=None):
+        path = self._file(key)
+        with self._exclusive():
+            item = self._load(path)
+            if item is not None:
+                if not self._is_expired(item[0]): return False
+                # Entrada expirada não bloqueia o add
+                self._remove_if_expired(path)
+            try:
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            except FileExistsError:
+                return False
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.HEADER.pack(time.time() + ttl if ttl else 0) + value)
+            return True
+
+    def delete(self, key):
+        try:
+            os.unlink(self._file(key))
+        except FileNotFoundError: pass
+
+    def compare_and_set(self, key, expected, value, ttl=None):
+        # Sob o mesmo flock do add: nenhum add/compare_* concorrente na mesma chave entre a leitura e a troca
+        path = self._file(key)
+        with self._exclusive():
+            if self._read(path) != expected: return False
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(self.HEADER.pack(time.time() + ttl if ttl else 0) + value)
+            os.replace(tmp, path)
+            return True
+
+    def compare_and_delete(self, key, expected):
+        path = self._file(key)
+        with self._exclusive():
+            if self._read(path) != expected: return False
+            try:
+                os.unlink(path)
+            except FileNotFoundError: pass
+            return True
+
+    def _maybe_evict(self):
+        # Varredura do diretório a cada 64 escritas (evita scandir em todo set)
+        self._writes += 1
+        if self._writes % 64: return
+        now = time.time()
+        with self._exclusive():
+            # Coordenação: só o que já expirou sai (entradas antigas do log de deltas, locks abandonados)
+            for entry in os.scandir(self.pinned_path):
+                if entry.name.endswith(".tmp"): continue
+                item = self._load(entry.path)
+                if item is not None and self._is_expired(item[0], now):
+                    self._remove_if_expired(entry.path)
+            entries = [e for e in os.scandir(self.path) if e.is_file() and not e.name.startswith(".") and not e.name.endswith(".tmp")]
+            if len(entries) <= self.max_entries: return
+            # Remove os arquivos de cache menos recentemente escritos
+            entries.sort(key=lambda e: e.stat().st_mtime)
+            for entry in entries[:len(entries) - self.max_entries]:
+                try:
+                    os.unlink(entry.path)
+                except FileNotFoundError: pass
+
+class RedisBackend(CacheBackend):
+    """Backend Redis-protocol (Redis, KeyDB, Valkey ou um stand-in local). compare_* rodam em Lua (atômicos no servidor)."""
+    shared = True
+    # ARGV: esperado, novo valor, TTL em ms (0 = sem TTL)
+    CAS_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then return 0 end
+if tonumber(ARGV[3]) > 0 then redis.call('SET', KEYS[1], ARGV[2], 'PX', ARGV[3])
+else redis.call('SET', KEYS[1], ARGV[2]) end
+return 1
+"""
+    CAD_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then return 0 end
+redis.call('DEL', KEYS[1])
+return 1
+"""
+
+    def __init__(self, url, prefix="dropmasters:"):
+        import redis
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+        self._cas = self.client.register_script(self.CAS_SCRIPT)
+        self._cad = self.client.register_script(self.CAD_SCRIPT)
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value, px=int(ttl * 1000) if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        return bool(self.client.set(self.prefix + key, value, nx=True, px=int(ttl * 1000) if ttl else None))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def compare_and_set(self, key, expected, value, ttl=None):
+        return bool(self._cas(keys=[self.prefix + key], args=[expected, value, int(ttl * 1000) if ttl else 0]))
+
+    def compare_and_delete(self, key, expected):
+        return bool(self._cad(keys=[self.prefix + key], args=[expected]))
+
+def create_cache_backend(url=None):
+    """
+    Seleciona o backend pela URL:
+    - memory://?max_entries=2048      (padrão, um cache por processo)
+    - shm:///dev/shm/dropmasters-cache (workers do mesmo host)
+    - redis://host:6379/0              (workers em qualquer host)
+    """
+    parsed = urlparse(url or "memory://")
+    params = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+    if parsed.scheme == "memory":
+        return LocalLRUBackend(max_entries=int(params.get("max_entries", 2048)))
+    if parsed.scheme == "shm":
+        return SharedMemoryBackend(path=parsed.path or "/dev/shm/dropmasters-cache", max_entries=int(params.get("max_entries", 4096)))
+    if parsed.scheme in ("redis", "rediss", "unix"):
+        return RedisBackend(url)
+    raise ValueError(f"CACHE_BACKEND_URL não suportada: {url}")
@@ -0,0 +1,555 @@
+import os
+import json
+import uuid
+import base64
+import hashlib
+import threading
+import time
+from array import array
+from name_index import ProductNameIndex
+
+class ProductCatalogCache:
+    """
+    CATALOG CACHE v4.0 (ZERO SERIALIZATION + SINGLE-FLIGHT + DELTAS + COMPACT):
+    Guarda o catálogo ativo já codificado em bytes JSON por variante (full / recommend),
+    com ETag forte e Last-Modified. Hits não pagam o custo de jsonify.
+
+    Stale-While-Revalidate:
+    - idade < soft_ttl: snapshot servido direto.
+    - soft_ttl <= idade < hard_ttl (ou invalidado): snapshot antigo servido enquanto
+      exatamente UM chamador (modo 'inline') ou uma thread (modo 'background') recarrega.
+    - sem snapshot ou idade >= hard_ttl: chamadores aguardam um único reload.
+
+    Deltas (insert/update/deactivate) vindos dos write paths ou do change feed são aplicados
+    linha a linha: só as linhas tocadas são re-serializadas, o resto do snapshot é reaproveitado.
+
+    Memória: cada produto é um registro compacto (ProductRecord via record_factory) e seus bytes
+    JSON existem uma única vez, dentro do corpo da variante 'full'; o snapshot guarda apenas os
+    offsets de cada item nesse corpo. As demais variantes só viram um corpo próprio se listadas em
+    `materialized_variants`; senão guardam as posições dos itens e o ETag, e o corpo é montado a
+    partir do 'full' em variant() (mesmos bytes e ETag, sem a segunda cópia em memória).
+
+    Consultas paginadas (cursor/limit, fields, filtros) são respondidas do próprio snapshot,
+    usando ordenações pré-calculadas e cada produto já codificado individualmente.
+
+    Com um CacheBackend compartilhado (shm/redis), as linhas cruas e a versão do catálogo ficam
+    no backend: só um worker por vez consulta o Supabase (lock via add) e os demais adotam o
+    estado publicado, checando a versão a cada sync_interval segundos.
+    Deltas locais não republicam o catálogo: cada um vira uma entrada do log da versão
+    (catalog:delta:<versão>:<seq>, posição reservada via add, então escritas concorrentes não se
+    sobrescrevem) e os demais workers aplicam as entradas novas em ordem, re-serializando só as
+    linhas tocadas. Com MAX_SHARED_DELTAS entradas o log é compactado por uma carga completa.
+
+    lookup_names() responde "esse título já existe?" pelo ProductNameIndex (chave normalizada +
+    trigramas), mantido junto com os registros.
+    """
+    VARIANTS = {
+        "full": lambda p: True,
+        "recommend": lambda p: p.is_featured or p.price > 150,
+    }
+    REFRESH_MODES = ("background", "inline")
+    SORT_ORDERS = {
+        "featured": lambda p: not p.is_featured, # Ordem do banco (is_featured desc)
+        "price_asc": lambda p: p.price or 0,
+        "price_desc": lambda p: -(p.price or 0),
+        "demand": lambda p: -(p.demand_score or 0),
+    }
+    # Colunas mínimas para materializar uma linha que ainda não está no cache
+    REQUIRED_COLUMNS = ("id", "name", "price")
+    MAX_PAGE_SIZE = 100
+    STATE_KEY = "catalog:state"
+    VERSION_KEY = "catalog:version"
+    LOCK_KEY = "catalog:refresh-lock"
+    LOCK_TTL = 30
+    MAX_SHARED_DELTAS = 256
+
+    def __init__(self, loader, record_factory, soft_ttl=900, hard_ttl=3600, refresh_mode="background", log_callback=None,
+                 backend=None, sync_interval=2.0, dedupe_threshold=0.85, materialized_variants=("full",)):
+        if refresh_mode not in self.REFRESH_MODES:
+            raise ValueError(f"refresh_mode inválido: {refresh_mode}")
+        unknown = set(materialized_variants) - set(self.VARIANTS)
+        if unknown:
+            raise ValueError(f"variantes inválidas: {', '.join(sorted(unknown))}")
+        # 'full' sempre materializada: é a fonte dos bytes de cada item
+        self.materialized_variants = frozenset(materialized_variants) | {"full"}
+        self.loader = loader
+        self.record_factory = record_factory
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = max(hard_ttl, soft_ttl)
+        self.refresh_mode = refresh_mode
+        self.log_callback = log_callback
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._snapshot = None
+        self._stale = False
+        self._generation = 0
+        # Estado linha a linha (id -> registro compacto) + bytes re-serializados desde o último publish
+        self._records = {}
+        self._pending = {}
+        # Índice de nomes (normalizado + trigramas) dos produtos ativos: dedupe sem ida ao banco
+        self.dedupe_threshold = dedupe_threshold
+        self._names = ProductNameIndex(dedupe_threshold)
+        # Deltas recebidos durante um reload completo são reaplicados sobre o resultado
+        self._loading = False
+        self._replay = []
+        # Coerência entre workers (apenas com backend compartilhado)
+        self.backend = backend if backend is not None and backend.shared else None
+        self.sync_interval = sync_interval
+        self._shared_version = None
+        self._shared_seq = 0 # última entrada do log de deltas da versão já aplicada
+        self._last_sync = 0
+        self.stats = {"full_loads": 0, "deltas_applied": 0, "rows_reencoded": 0, "shared_adoptions": 0,
+                      "shared_deltas": 0}
+
+    @staticmethod
+    def encode(payload):
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def get(self, now=None):
+        """Retorna o snapshot vigente, disparando revalidação single-flight quando necessário."""
+        now = now or time.time()
+        if self.backend and now - self._last_sync >= self.sync_interval:
+            self._sync_shared(now)
+        with self._lock:
+            snapshot, stale = self._snapshot, self._stale
+
+        if snapshot:
+            age = now - snapshot["loaded_at"]
+            if not stale and age < self.soft_ttl:
+                return snapshot
+            if age < self.hard_ttl:
+                self._revalidate()
+                return snapshot
+
+        return self._refresh_blocking(snapshot)
+
+    def _revalidate(self):
+        # Só quem pega o lock recarrega; os demais seguem com o snapshot antigo
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        if self.refresh_mode == "inline":
+            self._reload_and_release()
+        else:
+            threading.Thread(target=self._reload_and_release, daemon=True).start()
+
+    def _refresh_blocking(self, seen_snapshot):
+        with self._refresh_lock:
+            # Outro chamador pode ter recarregado enquanto esperávamos
+            with self._lock:
+                if self._snapshot is not seen_snapshot and not self._stale:
+                    return self._snapshot
+            return self._reload()
+
+    def _reload_and_release(self):
+        # Falha na revalidação mantém o snapshot antigo em serviço
+        try:
+            self._reload()
+        except Exception as e:
+            if self.log_callback: self.log_callback(f"Catalog Refresh Error: {e}", "error")
+        finally:
+            self._refresh_lock.release()
+
+    def _reload(self):
+        with self._lock:
+            generation = self._generation
+            self._loading = True
+            self._replay = []
+        lock_token = previous = None
+        try:
+            if self.backend:
+                adopted = self._adopt_shared(max_age=self.soft_ttl)
+                if adopted: return adopted
+                lock_token = uuid.uuid4().hex
+                if not self.backend.add(self.LOCK_KEY, lock_token.encode(), ttl=self.LOCK_TTL):
+                    lock_token = None
+                    # Outro worker já está consultando o Supabase: aguarda a publicação dele
+                    adopted = self._wait_for_shared()
+                    if adopted: return adopted
+                # Deltas publicados até aqui já estão no banco; os seguintes são levados para a versão nova
+                previous = self._delta_head()
+            snapshot = self.store(self.loader(), generation=generation)
+            self._publish_shared(previous)
+            return snapshot
+        finally:
+            # Só solta o lock se ainda for nosso (pode ter expirado e sido tomado durante uma carga lenta)
+            if lock_token: self.backend.compare_and_delete(self.LOCK_KEY, lock_token.encode())
+            with self._lock:
+                self._loading = False
+                self._replay = []
+
+    def store(self, rows, now=None, generation=None, loaded_at=None, shared_version=None):
+        """Substitui o catálogo inteiro (carga completa) e publica o novo snapshot."""
+        now = now or time.time()
+        with self._lock:
+            self._records, self._pending = {}, {}
+            self._names = ProductNameIndex(self.dedupe_threshold)
+            for row in rows:
+                if row.get('is_active', True):
+                    self._serialize_row(row['id'], row)
+
+            replay, self._replay, self._loading = self._replay, [], False
+            for upserts, deactivate_ids in replay:
+                self._merge_changes(upserts, deactivate_ids)
+
+            self.stats["full_loads"] += 1
+            self._shared_version, self._shared_seq = shared_version, 0
+            # Invalidação ocorrida durante a carga mantém o snapshot marcado como antigo
+            self._stale = generation is not None and generation != self._generation
+            return self._publish(now, loaded_at=loaded_at or now, reuse=False)
+
+    def _sync_shared(self, now):
+        """Checagem barata da versão publicada; adota o estado de outro worker se mudou."""
+        self._last_sync = now
+        try:
+            version = self.backend.get(self.VERSION_KEY)
+            if version and version.decode() != self._shared_version:
+                self._adopt_shared(max_age=self.hard_ttl)
+            elif version:
+                self._pull_deltas(now)
+        except Exception as e:
+            if self.log_callback: self.log_callback(f"Catalog Sync Error: {e}", "error")
+
+    def _adopt_shared(self, max_age):
+        state = self.backend.get_json(self.STATE_KEY)
+        if not state or time.time() - state["loaded_at"] >= max_age:
+            return None
+        if state["version"] == self._shared_version and self._snapshot:
+            return self._snapshot
+        self.stats["shared_adoptions"] += 1
+        self.store(state["rows"], loaded_at=state["loaded_at"], shared_version=state["version"])
+        self._pull_deltas()
+        return self._snapshot
+
+    def _wait_for_shared(self, timeout=None, poll=0.2):
+        deadline = time.time() + (timeout or self.LOCK_TTL)
+        while time.time() < deadline:
+            time.sleep(poll)
+            adopted = self._adopt_shared(max_age=self.soft_ttl)
+            if adopted: return adopted
+            if self.backend.get(self.LOCK_KEY) is None: break
+        return None
+
+    def _publish_shared(self, previous=None):
+        """
+        Publica as linhas cruas + nova versão (log de deltas vazio) para os demais workers.
+        previous=(versão, seq): entradas do log antigo depois de seq (escritas durante a carga)
+        são reaplicadas na versão nova.
+        """
+        if not self.backend: return
+        with self._lock:
+            if self._snapshot is None: return
+            rows = [record.to_row() for record in self._records.values()]
+            loaded_at = self._snapshot["loaded_at"]
+            version = f"{os.getpid()}-{time.time_ns()}"
+            self._shared_version, self._shared_seq = version, 0
+        try:
+            self.backend.set_json(self.STATE_KEY, {"version": version, "loaded_at": loaded_at, "rows": rows}, ttl=self.hard_ttl)
+            self.backend.set(self.VERSION_KEY, version.encode(), ttl=self.hard_ttl)
+            if previous and previous[0]:
+                # Reaplicados aqui pelo _pull_deltas, como em qualquer outro worker (não vieram desta carga)
+                for delta in self._read_deltas(*previous):
+                    self._push_delta(delta["rows"], delta["drop"], version, applied=False)
+                self._pull_deltas()
+        except Exception as e:
+            if self.log_callback: self.log_callback(f"Catalog Publish Error: {e}", "error")
+
+    def _delta_key(self, version, seq):
+        return f"catalog:delta:{version}:{seq}"
+
+    def _read_deltas(self, version, after):
+        """Entradas do log de `version` depois de `after`, em ordem, até a primeira ausente."""
+        deltas = []
+        while True:
+            delta = self.backend.get_json(self._delta_key(version, after + len(deltas) + 1))
+            if delta is None: return deltas
+            deltas.append(delta)
+
+    def _delta_head(self):
+        """(versão publicada, seq da última entrada do log) no backend."""
+        version = self.backend.get(self.VERSION_KEY)
+        if version is None: return None
+        version = version.decode()
+        after = self._shared_seq if version == self._shared_version else 0
+        return version, after + len(self._read_deltas(version, after))
+
+    def _pull_deltas(self, now=None):
+        """Aplica as entradas do log da versão adotada que este worker ainda não viu."""
+        version, seq = self._shared_version, self._shared_seq
+        if version is None: return
+        deltas = self._read_deltas(version, seq)
+        if not deltas: return
+        with self._lock:
+            if (self._shared_version, self._shared_seq) != (version, seq) or self._snapshot is None: return
+            for delta in deltas:
+                self._merge_changes(delta["rows"], delta["drop"])
+            self._shared_seq = seq + len(deltas)
+            self.stats["shared_deltas"] += len(deltas)
+            self._publish(now or time.time(), loaded_at=self._snapshot["loaded_at"])
+
+    def _push_delta(self, rows, drop, version=None, applied=True):
+        """
+        Acrescenta um delta ao log da versão publicada: a posição é reservada com add, então
+        workers escrevendo ao mesmo tempo ficam em entradas distintas.
+        applied=False: o delta ainda não está nos registros locais (fica para o _pull_deltas).
+        Retorna a versão em que o delta entrou (ou None sem estado compartilhado).
+        """
+        if version is None:
+            version = self.backend.get(self.VERSION_KEY)
+            if version is None: return None
+            version = version.decode()
+        payload = self.encode({"rows": rows, "drop": drop})
+        with self._lock:
+            seq = self._shared_seq if version == self._shared_version else 0
+        while True:
+            seq += 1
+            if self.backend.add(self._delta_key(version, seq), payload, ttl=self.hard_ttl): break
+        with self._lock:
+            # O próprio delta já está aplicado aqui; só avança se não pulou entradas de outros workers
+            if applied and version == self._shared_version and seq == self._shared_seq + 1:
+                self._shared_seq = seq
+        if seq >= self.MAX_SHARED_DELTAS:
+            # Log longo: a próxima leitura recarrega do banco e publica uma versão nova, com log vazio
+            self.invalidate()
+        return version
+
+    def _share_changes(self, rows, drop):
+        if not self.backend: return
+        try:
+            version = self._push_delta(rows, drop)
+            # Uma carga completa pode ter trocado a versão enquanto o delta era escrito
+            current = self.backend.get(self.VERSION_KEY)
+            if version and current and current.decode() != version:
+                self._push_delta(rows, drop, current.decode())
+        except Exception as e:
+            if self.log_callback: self.log_callback(f"Catalog Publish Error: {e}", "error")
+
+    def apply_changes(self, upserts=None, deactivate_ids=None, now=None, share=True):
+        """
+        Aplica deltas de linha (insert/update parcial/deactivate) sem recarregar a tabela.
+        Retorna False se o delta não pôde ser materializado (o snapshot fica marcado para revalidação).
+        share=False não leva o delta aos demais workers (ex.: change feed, que todos consomem).
+        """
+        upserts, deactivate_ids = list(upserts or []), list(deactivate_ids or [])
+        if not upserts and not deactivate_ids:
+            return True
+        now = now or time.time()
+        with self._lock:
+            if self._loading:
+                self._replay.append((upserts, deactivate_ids))
+            if self._snapshot is None:
+                # Cache frio: a próxima carga completa já trará o estado novo
+                return True
+            complete = self._merge_changes(upserts, deactivate_ids)
+            if not complete:
+                self._stale = True
+                self._generation += 1
+            self.stats["deltas_applied"] += 1
+            self._publish(now, loaded_at=self._snapshot["loaded_at"])
+            if share and self.backend:
+                # Linhas completas como ficaram aqui: quem aplica não precisa ter a versão anterior
+                drop = set(deactivate_ids) | {c.get('id') for c in upserts if c.get('is_active') is False}
+                touched = {c.get('id') for c in upserts} - drop
+                rows = [self._records[row_id].to_row() for row_id in touched if row_id in self._records]
+                drop = [row_id for row_id in drop if row_id]
+        if share and self.backend and (rows or drop):
+            self._share_changes(rows, drop)
+        return complete
+
+    def _merge_changes(self, upserts, deactivate_ids):
+        complete = True
+        for row_id in deactivate_ids:
+            self._drop_row(row_id)
+
+        for change in upserts:
+            row_id = change.get('id')
+            if not row_id: continue
+            if change.get('is_active') is False:
+                self._drop_row(row_id)
+                continue
+            current = self._records.get(row_id)
+            if current is None:
+                if not all(change.get(c) is not None for c in self.REQUIRED_COLUMNS):
+                    complete = False
+                    continue
+                row = change
+            else:
+                # Mesmo comportamento do upsert do PostgREST: colunas enviadas substituem as antigas
+                row = {**current.to_row(), **change}
+            self._serialize_row(row_id, row)
+        return complete
+
+    def _drop_row(self, row_id):
+        self._records.pop(row_id, None)
+        self._pending.pop(row_id, None)
+        self._names.remove(row_id)
+
+    def _serialize_row(self, row_id, row):
+        record = self.record_factory(row)
+        previous = self._records.get(row_id)
+        self._records[row_id] = record
+        if previous is None or previous.name != record.name:
+            self._names.add(row_id, record.name)
+        self._pending[row_id] = record.to_json_bytes()
+        self.stats["rows_reencoded"] += 1
+
+    def reencode(self, now=None):
+        """
+        Re-serializa todos os registros pelo record_factory e publica o snapshot.
+        Para valores globais que entram nos bytes de cada item (ex.: ai_mood): nenhuma resposta
+        mistura o valor antigo com o novo.
+        """
+        with self._lock:
+            if self._snapshot is None: return None
+            for row_id, record in list(self._records.items()):
+                self._serialize_row(row_id, record.to_row())
+            return self._publish(now or time.time(), loaded_at=self._snapshot["loaded_at"], reuse=False)
+
+    def lookup_names(self, names):
+        """
+        name -> {"id", "name", "metadata", "score"} do produto ativo equivalente em memória
+        (mesma chave normalizada ou similaridade de trigramas >= dedupe_threshold).
+        Com o cache frio devolve {}: quem chama completa os ausentes no banco.
+        """
+        found = {}
+        with self._lock:
+            for name in names:
+                match = self._names.match(name)
+                if match is not None:
+                    record = self._records[match[0]]
+                    found[name] = {"id": record.id, "name": record.name, "metadata": dict(record.metadata), "score": match[1]}
+        return found
+
+    def _publish(self, now, loaded_at, reuse=True):
+        # Chamado com self._lock adquirido
+        previous = self._snapshot
+        # Desempate por id: workers que aplicaram os mesmos deltas em outra ordem geram os mesmos bytes (mesmo ETag)
+        featured = self.SORT_ORDERS["featured"]
+        products = sorted(self._records.values(), key=lambda p: (featured(p), p.id))
+
+        # Bytes de cada item: recém-serializados ou recortados do corpo 'full' anterior
+        old_index = {p.id: i for i, p in enumerate(previous["products"])} if reuse and previous else {}
+        chunks = []
+        for record in products:
+            chunk = self._pending.get(record.id)
+            if chunk is None:
+                chunk = self.chunk(previous, old_index[record.id])
+            chunks.append(chunk)
+        self._pending = {}
+
+        bounds = array('Q', [1])
+        for chunk in chunks:
+            bounds.append(bounds[-1] + len(chunk) + 1)
+
+        variants = {}
+        for name, keep in self.VARIANTS.items():
+            positions = array('L', (i for i, p in enumerate(products) if keep(p)))
+            if name in self.materialized_variants:
+                body = b"[" + b",".join(chunks[i] for i in positions) + b"]"
+                variants[name] = {"body": body, "etag": hashlib.sha1(body).hexdigest()}
+                continue
+            # ETag dos mesmos bytes que variant() vai montar, sem guardar o corpo
+            digest = hashlib.sha1(b"[")
+            for n, i in enumerate(positions):
+                if n: digest.update(b",")
+                digest.update(chunks[i])
+            digest.update(b"]")
+            variants[name] = {"positions": positions, "etag": digest.hexdigest()}
+
+        positions = range(len(products))
+        orders = {
+            name: array('L', positions if name == "featured" else sorted(positions, key=lambda i: key(products[i])))
+            for name, key in self.SORT_ORDERS.items()
+        }
+
+        # Last-Modified só avança quando o conteúdo realmente muda
+        unchanged = previous and all(previous["variants"][n]["etag"] == v["etag"] for n, v in variants.items())
+        self._snapshot = {
+            "variants": variants,
+            "last_modified": previous["last_modified"] if unchanged else now,
+            "loaded_at": loaded_at,
+            "count": len(products),
+            "products": products,
+            "bounds": bounds,
+            "orders": orders,
+        }
+        return self._snapshot
+
+    def variant(self, snapshot, name):
+        """(corpo, etag) de uma variante inteira; as não materializadas são montadas do corpo 'full'."""
+        cached = snapshot["variants"][name]
+        if "body" in cached:
+            return cached["body"], cached["etag"]
+        return b"[" + b",".join(self.chunk(snapshot, i) for i in cached["positions"]) + b"]", cached["etag"]
+
+    @staticmethod
+    def chunk(snapshot, index):
+        """Bytes JSON do item `index`, recortados do corpo 'full' do snapshot."""
+        bounds = snapshot["bounds"]
+        return snapshot["variants"]["full"]["body"][bounds[index]:bounds[index + 1] - 1]
+
+    @staticmethod
+    def encode_cursor(position, product_id):
+        return base64.urlsafe_b64encode(f"{position}:{product_id}".encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            position, product_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split(":", 1)
+            return int(position), product_id
+        except Exception:
+            raise ValueError("cursor inválido")
+
+    def page(self, snapshot, sort="featured", predicate=None, fields=None, limit=None, cursor=None):
+        """
+        Consulta o snapshot sem tocar no banco.
+        Retorna (bytes da lista de itens, próximo cursor ou None).
+        ValueError para sort/cursor/fields desconhecidos ou limit não positivo.
+        """
+        if sort not in self.SORT_ORDERS:
+            raise ValueError(f"sort inválido: {sort}")
+        if limit is not None and limit <= 0:
+            raise ValueError(f"limit inválido: {limit}")
+        order = snapshot["orders"][sort]
+        products = snapshot["products"]
+        if fields and products:
+            unknown = [f for f in fields if f not in products[0].PUBLIC_FIELDS]
+            if unknown:
+                raise ValueError(f"fields inválidos: {', '.join(unknown)}")
+
+        start = 0
+        if cursor:
+            position, last_id = self.decode_cursor(cursor)
+            if position < len(order) and products[order[position]].id == last_id:
+                start = position + 1
+            else:
+                # Catálogo mudou entre páginas: retoma a partir do último id visto, se ainda existir
+                ids = [products[i].id for i in order]
+                start = ids.index(last_id) + 1 if last_id in ids else min(position + 1, len(order))
+
+        limit = min(limit, self.MAX_PAGE_SIZE) if limit is not None else len(order)
+        selected, next_cursor = [], None
+        for pos in range(start, len(order)):
+            idx = order[pos]
+            if predicate and not predicate(products[idx]): continue
+            if len(selected) == limit:
+                last_pos, last_idx = selected[-1]
+                next_cursor = self.encode_cursor(last_pos, products[last_idx].id)
+                break
+            selected.append((pos, idx))
+
+        if fields:
+            rows = [self.encode(products[idx].to_public(fields)) for _, idx in selected]
+        else:
+            rows = [self.chunk(snapshot, idx) for _, idx in selected]
+        return b"[" + b",".join(rows) + b"]", next_cursor
+
+    def invalidate(self):
+        """Marca o snapshot como antigo (continua servível até o hard_ttl)."""
+        with self._lock:
+            self._stale = True
+            self._generation += 1
+        if self.backend:
+            # Estado compartilhado também deixa de valer: o próximo reload vai ao Supabase
+            try:
+                self.backend.delete(self.STATE_KEY)
+            except Exception: pass
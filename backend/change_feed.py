@@ -0,0 +1,84 @@
+import json
+import threading
+from http_client import http_client
+
+class PostgresChangeFeedConsumer:
+    """
+    CHANGE FEED CONSUMER v1.0:
+    Consome eventos de mudança da tabela `products` no formato postgres_changes do Supabase Realtime
+    ({"table", "eventType"/"type", "new"/"record", "old"/"old_record"}) e os aplica como deltas
+    no ProductCatalogCache.
+
+    Transporte: stream NDJSON (um evento por linha) via HTTP. Qualquer ponte Realtime -> NDJSON,
+    ou um stand-in local que escreva linhas JSON, pode ser apontado por CATALOG_CHANGE_FEED_URL.
+    A conexão sai pelo http_client compartilhado (pool keep-alive, retry de conexão, UpstreamGuard
+    se o host estiver em UPSTREAM_GUARDED_HOSTS); leitura sem timeout, o stream fica aberto.
+    """
+    def __init__(self, catalog_cache, url=None, table="products", log_callback=None, reconnect_delay=2.0, max_delay=60.0):
+        self.catalog_cache = catalog_cache
+        self.url = url
+        self.table = table
+        self.log_callback = log_callback
+        self.reconnect_delay = reconnect_delay
+        self.max_delay = max_delay
+        self._stop = threading.Event()
+        self.stats = {"events": 0, "ignored": 0, "reconnects": 0}
+
+    def handle_event(self, event):
+        """Traduz um evento postgres_changes em delta do catálogo."""
+        if event.get('table', self.table) != self.table:
+            self.stats["ignored"] += 1
+            return False
+
+        kind = (event.get('eventType') or event.get('type') or '').upper()
+        new = event.get('new') or event.get('record') or {}
+        old = event.get('old') or event.get('old_record') or {}
+
+        if kind in ('INSERT', 'UPDATE') and new.get('id'):
+            self.catalog_cache.apply_changes(upserts=[new], share=False)
+        elif kind == 'DELETE' and (old.get('id') or new.get('id')):
+            self.catalog_cache.apply_changes(deactivate_ids=[old.get('id') or new.get('id')], share=False)
+        else:
+            self.stats["ignored"] += 1
+            return False
+
+        self.stats["events"] += 1
+        return True
+
+    def consume(self, lines):
+        """Aplica um iterável de linhas NDJSON (stream HTTP, arquivo ou stand-in de teste)."""
+        for line in lines:
+            if self._stop.is_set(): break
+            if isinstance(line, bytes): line = line.decode("utf-8")
+            line = line.strip()
+            if not line: continue
+            try:
+                self.handle_event(json.loads(line))
+            except ValueError:
+                self.stats["ignored"] += 1
+
+    def run_forever(self):
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            try:
+                with http_client.get(self.url, stream=True, timeout=(http_client.timeout[0], None)) as response:
+                    response.raise_for_status()
+                    delay = self.reconnect_delay
+                    self.consume(response.iter_lines())
+            except Exception as e:
+                if self.log_callback: self.log_callback(f"Change Feed Error: {e}", "error")
+            if self._stop.is_set(): break
+            # Eventos perdidos durante a queda: força uma revalidação completa do catálogo
+            self.catalog_cache.invalidate()
+            self.stats["reconnects"] += 1
+            self._stop.wait(delay)
+            delay = min(self.max_delay, delay * 2)
+
+    def start(self):
+        if not self.url: return None
+        thread = threading.Thread(target=self.run_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,127 @@
+import time
+import threading
+from collections import OrderedDict
+
+class _InFlight:
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+class CoalescingCache:
+    """
+    COALESCING CACHE v1.0 (LRU + TTL + SINGLE-FLIGHT):
+    Cache em processo, limitado por número de entradas, para resultados caros (estimativas de sourcing).
+    - LRU: acima de `max_entries`, sai o menos recentemente usado.
+    - TTL por entrada; expiradas são descartadas na leitura.
+    - get_or_load(): chamadas concorrentes para a mesma chave esperam um único `loader`
+      (o erro do loader também é repassado para quem esperava, sem cachear).
+    - Com um CacheBackend compartilhado (shm/redis) como segundo nível, workers diferentes
+      reaproveitam o resultado uns dos outros.
+    - stats: hits, misses, loads, coalesced, evictions, expirations, backend_hits.
+    """
+    def __init__(self, max_entries=1024, ttl=3600, backend=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = backend
+        self._data = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "loads": 0, "coalesced": 0, "evictions": 0,
+                      "expirations": 0, "backend_hits": 0, "errors": 0}
+
+    def _get_local(self, key, now):
+        item = self._data.get(key)
+        if item is None: return None
+        expiry, value = item
+        if now >= expiry:
+            del self._data[key]
+            self.stats["expirations"] += 1
+            return None
+        self._data.move_to_end(key)
+        return item
+
+    def _set_local(self, key, value, ttl):
+        self._data[key] = (time.time() + (ttl or self.ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def get(self, key):
+        with self._lock:
+            item = self._get_local(key, time.time())
+            if item is not None:
+                self.stats["hits"] += 1
+                return item[1]
+        if self.backend:
+            value = self.backend.get_json(key)
+            if value is not None:
+                with self._lock:
+                    self.stats["backend_hits"] += 1
+                    self._set_local(key, value, None)
+                return value
+        return None
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._set_local(key, value, ttl)
+        if self.backend:
+            self.backend.set_json(key, value, ttl=ttl or self.ttl)
+
+    def get_or_load(self, key, loader, ttl=None):
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            # Pode ter sido preenchido entre o get() e o lock
+            item = self._get_local(key, time.time())
+            if item is not None:
+                self.stats["hits"] += 1
+                return item[1]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _InFlight()
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+            if flight.value is not None:
+                self.set(key, flight.value, ttl)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self.stats["errors" if flight.error is not None else "loads"] += 1
+            flight.event.set()
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+        if self.backend:
+            self.backend.delete(key)
+
+    def snapshot_stats(self):
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["backend_hits"] + self.stats["misses"] + self.stats["coalesced"]
+            return {
+                **self.stats,
+                "entries": len(self._data),
+                "in_flight": len(self._inflight),
+                "hit_ratio": round((self.stats["hits"] + self.stats["backend_hits"]) / lookups, 3) if lookups else None
+            }
@@ -44,6 +44,41 @@ class ApexHybridEngine:
     Orquestrador Neural de Modelos de Negócio com Foco em Repasse Automático.
     Decide qual motor usar: DROPSHIPPING | MARKETPLACE | AFILIADO | WHITE-LABEL | LOCAL_HUB
     """
+    # Perfis estáticos (compartilhados com o BatchPricingEngine vetorizado)
+    MODEL_PROFILES = {
+        "AFFILIATE": {
+            "model": "AFFILIATE",
+            "tag": "🌐 REDE GLOBAL",
+            "strategy": "Volume de Comissão",
+            "risk": "Zero",
+            "payout_split": "100% External"
+        },
+        "MARKETPLACE": {
+            "model": "MARKETPLACE",
+            "tag": "🤝 PARCEIRO APEX",
+            "strategy": "Comissão de Plataforma",
+            "risk": "Baixo",
+            "payout_split": "85% Seller / 15% Platform"
+        },
+        "WHITE_LABEL": {
+            "model": "WHITE_LABEL",
+            "tag": "💎 EXCLUSIVO APEX",
+            "strategy": "Fidelização e Branding",
+            "risk": "Médio",
+            "payout_split": "100% Internal"
+        },
+        "DROPSHIPPING": {
+            "model": "DROPSHIPPING",
+            "tag": "📦 DESPACHO DIRETO",
+            "strategy": "Giro Rápido",
+            "risk": "Baixo",
+            "payout_split": "Product Cost -> Supplier | Margin -> Platform"
+        }
+    }
+    AFFILIATE_PRESSURE = 0.92
+    AFFILIATE_MAX_RATIO = 1.4
+    WHITE_LABEL_MIN_RATIO = 2.5
+
     @staticmethod
     def select_best_model(product_data, market_pressure, user_region=None):
         price = float(product_data.get('price', 0))
@@ -63,76 +98,51 @@ class ApexHybridEngine:
 
         # 1. AFILIADO: Se a pressão for absurda e a margem pequena
         # Lógica corrigida: Evitar prejuízo com taxas
-        if market_pressure > 0.92 and (price / base) < 1.4:
-            return {
-                "model": "AFFILIATE",
-                "tag": "🌐 REDE GLOBAL",
-                "strategy": "Volume de Comissão",
-                "risk": "Zero",
-                "payout_split": "100% External"
-            }
+        if market_pressure > ApexHybridEngine.AFFILIATE_PRESSURE and (price / base) < ApexHybridEngine.AFFILIATE_MAX_RATIO:
+            return dict(ApexHybridEngine.MODEL_PROFILES["AFFILIATE"])
             
         # 2. MARKETPLACE: Se o produto for de nicho
         if "Special" in product_data.get('name', ''):
-            return {
-                "model": "MARKETPLACE",
-                "tag": "🤝 PARCEIRO APEX",
-                "strategy": "Comissão de Plataforma",
-                "risk": "Baixo",
-                "payout_split": "85% Seller / 15% Platform"
-            }
+            return dict(ApexHybridEngine.MODEL_PROFILES["MARKETPLACE"])
             
         # 3. WHITE-LABEL: Se a margem for alta (>2.5x)
-        if (price / base) > 2.5:
-            return {
-                "model": "WHITE_LABEL",
-                "tag": "💎 EXCLUSIVO APEX",
-                "strategy": "Fidelização e Branding",
-                "risk": "Médio",
-                "payout_split": "100% Internal"
-            }
+        if (price / base) > ApexHybridEngine.WHITE_LABEL_MIN_RATIO:
+            return dict(ApexHybridEngine.MODEL_PROFILES["WHITE_LABEL"])
             
         # 4. DROPSHIPPING: Padrão
-        return {
-            "model": "DROPSHIPPING",
-            "tag": "📦 DESPACHO DIRETO",
-            "strategy": "Giro Rápido",
-            "risk": "Baixo",
-            "payout_split": "Product Cost -> Supplier | Margin -> Platform"
-        }
+        return dict(ApexHybridEngine.MODEL_PROFILES["DROPSHIPPING"])
 
 class ApexLegendGenerator:
     """
     NEURAL COPYWRITING v14.0: 
     Adaptativo e Focado em Conversão Local.
     """
+    MODEL_HOOKS = {
+        "LOCAL_HUB": "🚀 ENTREGA RELÂMPAGO: Identificamos estoque próximo a você. Envio prioritário ativado.",
+        "AFFILIATE": "🌐 ACESSO DIRETO: Conectamos você à maior rede de suprimentos global com preço de atacado.",
+        "MARKETPLACE": "🤝 CURADORIA PARCEIRA: Item selecionado de nossos vendedores certificados com garantia Apex.",
+        "WHITE_LABEL": "💎 LINHA ELITE: Produto premium com especificações exclusivas da marca DropMasters.",
+        "DROPSHIPPING": "⚡ HUB PRIORITÁRIO: Logística Apex otimizada para despacho imediato."
+    }
+    
+    GENERAL_SOLUTIONS = [
+        "🛡️ CONTROLE DE QUALIDADE: Cada unidade passa por triagem em nosso Hub Regional.",
+        "💰 PREÇO DIRETO: Intermediação otimizada para garantir o custo real de fornecedor.",
+        "🔄 GARANTIA TOTAL: Nós assumimos o risco. Satisfação ou retorno imediato.",
+        "🛰️ ESTOQUE INTEGRADO: Sincronizado em tempo real com fornecedores nacionais."
+    ]
+
+    @staticmethod
+    def compose(product_name, tag, hook, solutions):
+        return f"🚀 {product_name} [{tag}]. Oferta Otimizada: " + " | ".join([hook, *solutions])
+
     @staticmethod
     def generate_aggressive_copy(product_name, model_info):
         model = model_info.get('model', 'DROPSHIPPING')
-        
-        model_hooks = {
-            "LOCAL_HUB": "🚀 ENTREGA RELÂMPAGO: Identificamos estoque próximo a você. Envio prioritário ativado.",
-            "AFFILIATE": "🌐 ACESSO DIRETO: Conectamos você à maior rede de suprimentos global com preço de atacado.",
-            "MARKETPLACE": "🤝 CURADORIA PARCEIRA: Item selecionado de nossos vendedores certificados com garantia Apex.",
-            "WHITE_LABEL": "💎 LINHA ELITE: Produto premium com especificações exclusivas da marca DropMasters.",
-            "DROPSHIPPING": "⚡ HUB PRIORITÁRIO: Logística Apex otimizada para despacho imediato."
-        }
-        
-        general_solutions = [
-            "🛡️ CONTROLE DE QUALIDADE: Cada unidade passa por triagem em nosso Hub Regional.",
-            "💰 PREÇO DIRETO: Intermediação otimizada para garantir o custo real de fornecedor.",
-            "🔄 GARANTIA TOTAL: Nós assumimos o risco. Satisfação ou retorno imediato.",
-            "🛰️ ESTOQUE INTEGRADO: Sincronizado em tempo real com fornecedores nacionais."
-        ]
-        
-        selected_hook = model_hooks.get(model, model_hooks["DROPSHIPPING"])
-        selected = [selected_hook] + random.sample(general_solutions, 2)
-        
-        main_legend = f"🚀 {product_name} [{model_info.get('tag')}]. "
-        main_legend += "Oferta Otimizada: "
-        main_legend += " | ".join(selected)
-        
-        return main_legend
+        hooks = ApexLegendGenerator.MODEL_HOOKS
+        selected_hook = hooks.get(model, hooks["DROPSHIPPING"])
+        solutions = random.sample(ApexLegendGenerator.GENERAL_SOLUTIONS, 2)
+        return ApexLegendGenerator.compose(product_name, model_info.get('tag'), selected_hook, solutions)
 
 def analyze_competitive_pressure():
     pressure = random.uniform(0.6, 0.95)
@@ -0,0 +1,119 @@
+import time
+import zlib
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+class _Shard:
+    __slots__ = ("lock", "sessions", "bytes")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = OrderedDict() # session_id -> estado, do menos para o mais recente
+        self.bytes = 0
+
+class ConversationStore:
+    """
+    CONVERSATION STORE v1.0 (SHARDED LRU + TTL):
+    Estado de conversa por sessão do chat de suporte: humor e as últimas `history` mensagens.
+    - `shards` partições, cada uma com seu lock e seu OrderedDict: sessões diferentes raramente
+      disputam o mesmo lock; mensagens da mesma sessão são serializadas.
+    - TTL por inatividade: sessões paradas há mais de `ttl` segundos expiram (na leitura e no
+      início da LRU a cada escrita).
+    - Limite global dividido entre as partições: no máximo `max_sessions` sessões e ~`max_bytes`
+      de texto guardado; acima disso sai a sessão menos recentemente usada.
+    - Mensagens cortadas em `max_message_chars` (o histórico tem tamanho fixo por sessão).
+    Estado por worker: com vários workers, o balanceador precisa de afinidade por sessão.
+    """
+    def __init__(self, shards=16, max_sessions=10000, ttl=1800, history=10, max_bytes=16 * 1024 * 1024,
+                 max_message_chars=500, initial_mood="PROACTIVE"):
+        self.ttl = ttl
+        self.history = history
+        self.max_message_chars = max_message_chars
+        self.initial_mood = initial_mood
+        self._shards = [_Shard() for _ in range(shards)]
+        self._shard_sessions = max(1, max_sessions // shards)
+        self._shard_bytes = max(1, max_bytes // shards)
+        self.stats = {"created": 0, "resumed": 0, "expired": 0, "evicted": 0}
+
+    def _shard(self, session_id):
+        return self._shards[zlib.crc32(session_id.encode("utf-8")) % len(self._shards)]
+
+    @staticmethod
+    def _size(state):
+        return 64 + sum(len(message["text"]) for message in state["history"])
+
+    def _drop(self, shard, session_id, counter):
+        state = shard.sessions.pop(session_id)
+        shard.bytes -= state["size"]
+        self.stats[counter] += 1
+
+    def _expire(self, shard, now):
+        # Ordem LRU = ordem de atividade: as expiradas estão todas no início
+        while shard.sessions:
+            session_id, state = next(iter(shard.sessions.items()))
+            if now - state["updated_at"] <= self.ttl: break
+            self._drop(shard, session_id, "expired")
+
+    @contextmanager
+    def session(self, session_id):
+        """
+        Estado mutável da sessão (criado se não existir), com o lock da partição seguro até o fim do bloco:
+        {"mood", "history": deque de {"role", "text", "intent", "at"}, "turns", "created_at", "updated_at"}.
+        """
+        shard = self._shard(session_id)
+        with shard.lock:
+            now = time.time()
+            state = shard.sessions.get(session_id)
+            if state is not None and now - state["updated_at"] > self.ttl:
+                self._drop(shard, session_id, "expired")
+                state = None
+            if state is None:
+                state = {"mood": self.initial_mood, "history": deque(maxlen=self.history), "turns": 0,
+                         "created_at": now, "updated_at": now, "size": 0}
+                shard.sessions[session_id] = state
+                self.stats["created"] += 1
+            else:
+                shard.sessions.move_to_end(session_id)
+                self.stats["resumed"] += 1
+            try:
+                yield state
+            finally:
+                state["updated_at"] = time.time()
+                size = self._size(state)
+                shard.bytes += size - state["size"]
+                state["size"] = size
+                self._expire(shard, now)
+                while shard.sessions and (len(shard.sessions) > self._shard_sessions or shard.bytes > self._shard_bytes):
+                    oldest = next(iter(shard.sessions))
+                    if oldest == session_id and len(shard.sessions) == 1: break
+                    self._drop(shard, oldest, "evicted")
+
+    def remember(self, state, role, text, intent=None):
+        """Acrescenta uma mensagem ao histórico da sessão (chamar dentro de session())."""
+        state["history"].append({"role": role, "text": (text or "")[:self.max_message_chars], "intent": intent, "at": time.time()})
+        if role == "user": state["turns"] += 1
+
+    def get(self, session_id):
+        """Cópia do estado (sem criar a sessão), ou None se não existe / expirou."""
+        shard = self._shard(session_id)
+        with shard.lock:
+            state = shard.sessions.get(session_id)
+            if state is None or time.time() - state["updated_at"] > self.ttl:
+                return None
+            return {**state, "history": list(state["history"])}
+
+    def delete(self, session_id):
+        shard = self._shard(session_id)
+        with shard.lock:
+            if session_id in shard.sessions:
+                state = shard.sessions.pop(session_id)
+                shard.bytes -= state["size"]
+
+    def snapshot_stats(self):
+        sessions = total_bytes = 0
+        for shard in self._shards:
+            with shard.lock:
+                sessions += len(shard.sessions)
+                total_bytes += shard.bytes
+        return {**self.stats, "sessions": sessions, "bytes": total_bytes, "shards": len(self._shards)}
@@ -0,0 +1,140 @@
+import os
+import threading
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from upstream_guard import UpstreamGuard
+
+class PooledHttpClient:
+    """
+    POOLED HTTP CLIENT v1.0 (KEEP-ALIVE):
+    Camada única para chamadas HTTP de saída (scraping, webhooks).
+    - Um HTTPAdapter (pool urllib3 com keep-alive) por host, compartilhado entre threads;
+      tamanho do pool por host via `host_pool_sizes`.
+    - Uma requests.Session por thread (cookies/headers de Session não são thread-safe),
+      todas montadas sobre os mesmos adapters: a conexão TCP+TLS é reaproveitada.
+    - Retry com backoff exponencial em falhas de conexão e 429/5xx; POST só é repetido
+      quando a conexão nem chegou a ser aberta.
+    - Timeout separado em conexão e leitura.
+    - `guard` opcional (UpstreamGuard): rate limit + circuit breaker antes de abrir conexão, só para
+      os hosts que ele cobre (guard.hosts).
+    """
+    STATUS_FORCELIST = (429, 500, 502, 503, 504)
+
+    def __init__(self, pool_maxsize=10, host_pool_sizes=None, connect_timeout=3.05, read_timeout=10.0,
+                 max_retries=2, backoff_factor=0.3, guard=None):
+        self.pool_maxsize = pool_maxsize
+        self.host_pool_sizes = host_pool_sizes or {}
+        self.timeout = (connect_timeout, read_timeout)
+        self.retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=self.STATUS_FORCELIST,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            raise_on_status=False,
+            respect_retry_after_header=True
+        )
+        self.guard = guard
+        self._adapters = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {"requests": 0, "errors": 0, "pools": 0}
+
+    def _adapter(self, prefix, host):
+        with self._lock:
+            adapter = self._adapters.get(prefix)
+            if adapter is None:
+                size = self.host_pool_sizes.get(host, self.pool_maxsize)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=self.retry)
+                self._adapters[prefix] = adapter
+                self.stats["pools"] += 1
+            return adapter
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+        return session
+
+    def request(self, method, url, timeout=None, **kwargs):
+        parsed = urlparse(url)
+        prefix = f"{parsed.scheme}://{parsed.netloc}/"
+        session = self._session()
+        if prefix not in session.adapters:
+            session.mount(prefix, self._adapter(prefix, parsed.hostname))
+        guard = self.guard if self.guard and self.guard.covers(parsed.hostname) else None
+        if guard:
+            guard.before(parsed.hostname)
+        self.stats["requests"] += 1
+        try:
+            response = session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+        except requests.RequestException:
+            self.stats["errors"] += 1
+            if guard: guard.record(parsed.hostname, False)
+            raise
+        if guard:
+            guard.record(parsed.hostname, not guard.is_failure_status(response.status_code))
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            for adapter in self._adapters.values():
+                adapter.close()
+            self._adapters.clear()
+
+def _host_limits(spec):
+    """UPSTREAM_HOST_LIMITS=lista.mercadolivre.com.br:2/5 (taxa/s e burst por host)"""
+    limits = {}
+    for part in (spec or "").split(","):
+        host, _, limit = part.strip().rpartition(":")
+        rate, _, burst = limit.partition("/")
+        try:
+            limits[host] = {"rate": float(rate), "burst": int(burst or max(1, float(rate)))}
+        except ValueError:
+            continue
+    return limits
+
+def _hosts(spec):
+    """UPSTREAM_GUARDED_HOSTS=lista.mercadolivre.com.br,api.mercadolibre.com"""
+    return [host.strip() for host in (spec or "").split(",") if host.strip()]
+
+def _host_pool_sizes(spec):
+    """HTTP_HOST_POOL_SIZES=lista.mercadolivre.com.br:16,api.dropi.co:4"""
+    sizes = {}
+    for part in (spec or "").split(","):
+        host, _, size = part.strip().rpartition(":")
+        if host and size.isdigit():
+            sizes[host] = int(size)
+    return sizes
+
+# Cliente compartilhado pelo processo (sourcing_engine, app)
+http_client = PooledHttpClient(
+    pool_maxsize=int(os.environ.get("HTTP_POOL_MAXSIZE", 10)),
+    host_pool_sizes=_host_pool_sizes(os.environ.get("HTTP_HOST_POOL_SIZES", "lista.mercadolivre.com.br:16")),
+    connect_timeout=float(os.environ.get("HTTP_CONNECT_TIMEOUT", 3.05)),
+    read_timeout=float(os.environ.get("HTTP_READ_TIMEOUT", 10)),
+    max_retries=int(os.environ.get("HTTP_MAX_RETRIES", 2)),
+    backoff_factor=float(os.environ.get("HTTP_BACKOFF_FACTOR", 0.3)),
+    guard=UpstreamGuard(
+        rate=float(os.environ.get("UPSTREAM_RATE", 5)),
+        burst=int(os.environ.get("UPSTREAM_BURST", 10)),
+        max_wait=float(os.environ.get("UPSTREAM_MAX_WAIT", 2)),
+        failure_threshold=int(os.environ.get("UPSTREAM_BREAKER_FAILURES", 5)),
+        reset_timeout=float(os.environ.get("UPSTREAM_BREAKER_RESET", 30)),
+        host_limits=_host_limits(os.environ.get("UPSTREAM_HOST_LIMITS", "")),
+        # Só os upstreams de scraping: o webhook de fulfillment e demais chamadas próprias ficam de fora
+        hosts=_hosts(os.environ.get("UPSTREAM_GUARDED_HOSTS") or urlparse(
+            os.environ.get("SOURCING_LISTING_URL", "https://lista.mercadolivre.com.br")).hostname)
+    )
+)
@@ -0,0 +1,100 @@
+import re
+from collections import namedtuple
+
+# Palavras-chave por rótulo, em ordem de prioridade: o primeiro rótulo com ocorrência vence.
+# Casamento por substring do texto em minúsculas (como o `any(w in text ...)` original).
+INTENT_KEYWORDS = (
+    ("ZERO_COST", ("estoque", "zero", "dropshipping", "funciona", "modelo")),
+    ("SOURCING", ("tem", "acha", "busca", "encontrar", "procura")),
+    ("LOGISTICS", ("prazo", "entrega", "chega", "rastreio")),
+    ("SALES", ("compra", "preço", "valor", "desconto", "custa")),
+)
+SENTIMENT_KEYWORDS = (
+    ("FRUSTRATED", ("atraso", "não recebi", "lento", "ruim", "erro", "problema", "demora")),
+    ("WANT_TO_BUY", ("quero", "comprar", "desconto", "valor", "preço", "custa")),
+    ("CURIOSITY", ("funciona", "como", "estoque", "zero", "dropshipping")),
+)
+
+Classification = namedtuple("Classification", ["intent", "sentiment"])
+
+class MessageClassifier:
+    """
+    MESSAGE CLASSIFIER v1.0 (COMPILED SINGLE-PASS):
+    Intenção e sentimento do chat de suporte numa única varredura da mensagem (um findall em C).
+    - Todas as palavras-chave numa regex só, fatorada como trie ("c(?:om(?:o|pra(?:r)?)|usta)"):
+      em cada posição o motor testa um ramo por letra inicial em vez de cada palavra, e casa o trecho
+      mais longo; um trecho marca todas as palavras-chave contidas nele ("comprar" marca também "compra").
+    - Um findall comum não enxerga palavras que começam dentro de um match e terminam depois dele
+      ("estoquero" = "estoque" + "quero"). Essas sobreposições entram na trie como trechos compostos,
+      gerados até o fecho (poucas dezenas para o vocabulário atual): mesmos rótulos do `in` por substring.
+    - Cada trecho vira uma máscara de bits (um bit por rótulo); o OR das máscaras indexa uma tabela
+      pré-calculada com o rótulo de maior prioridade por eixo (mesma ordem dos `any()` antigos).
+    """
+    def __init__(self, intents=INTENT_KEYWORDS, sentiments=SENTIMENT_KEYWORDS,
+                 default_intent="UNKNOWN", default_sentiment="NEUTRAL"):
+        # palavra -> {(eixo, prioridade)}; eixo 0 = intenção, 1 = sentimento
+        owners = {}
+        for axis, table in enumerate((intents, sentiments)):
+            for rank, (_, words) in enumerate(table):
+                for word in words:
+                    owners.setdefault(word, set()).add((axis, rank))
+        # Um bit por rótulo (intenções nos bits baixos): o resultado de cada combinação de bits vem pronto
+        intent_labels = [label for label, _ in intents]
+        sentiment_labels = [label for label, _ in sentiments]
+        offset = len(intent_labels)
+        self._masks = {
+            chunk: sum({1 << (rank if axis == 0 else offset + rank)
+                        for word, found in owners.items() if word in chunk for axis, rank in found})
+            for chunk in self._overlap_closure(owners)
+        }
+        self._results = [
+            Classification(
+                next((label for i, label in enumerate(intent_labels) if mask >> i & 1), default_intent),
+                next((label for i, label in enumerate(sentiment_labels) if mask >> (offset + i) & 1), default_sentiment)
+            )
+            for mask in range(1 << (offset + len(sentiment_labels)))
+        ]
+        self._findall = re.compile(self._trie_pattern(self._masks)).findall
+
+    @staticmethod
+    def _overlap_closure(words):
+        """Palavras + trechos compostos W+K onde K começa dentro de W e termina depois dele, até o fecho."""
+        chunks, layer = set(words), set(words)
+        while layer:
+            composed = set()
+            for head in layer:
+                for word in words:
+                    if word in head: continue
+                    for size in range(1, min(len(head), len(word))):
+                        if head.endswith(word[:size]): composed.add(head + word[size:])
+            layer = composed - chunks
+            chunks |= layer
+        return chunks
+
+    @classmethod
+    def _trie_pattern(cls, words):
+        trie = {}
+        for word in words:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[""] = {}
+        return cls._emit(trie)
+
+    @classmethod
+    def _emit(cls, node):
+        """Nó da trie -> regex; ramos mais longos primeiro (quantificador guloso), fim de palavra vira `?`."""
+        branches = [re.escape(char) + cls._emit(child) for char, child in sorted(node.items()) if char]
+        if not branches: return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if "" in node else body
+
+    def classify(self, message):
+        """Classification(intent, sentiment) de `message`."""
+        masks = self._masks
+        mask = 0
+        for chunk in self._findall((message or "").lower()):
+            mask |= masks[chunk]
+        return self._results[mask]
+
+classifier = MessageClassifier()
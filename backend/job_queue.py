@@ -0,0 +1,91 @@
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class QueueFullError(Exception):
+    """Fila de jobs no limite de `max_pending`."""
+
+class BackgroundJobQueue:
+    """
+    BACKGROUND JOB QUEUE v1.0:
+    Executa trabalhos longos (scrape + registro no catálogo) fora da thread da requisição.
+    - submit() devolve um job id na hora; `max_workers` jobs rodam ao mesmo tempo e no máximo
+      `max_pending` ficam aguardando/rodando (acima disso, QueueFullError -> HTTP 429).
+    - Jobs com a mesma `dedupe_key` ainda não concluídos são reaproveitados.
+    - Estado do job (queued | running | done | failed) em memória e, com um CacheBackend
+      compartilhado, publicado nele: o polling pode cair em qualquer worker do gunicorn.
+    - Jobs concluídos expiram após `result_ttl` segundos.
+    """
+    KEY_PREFIX = "job:"
+
+    def __init__(self, max_workers=2, max_pending=16, result_ttl=600, backend=None, name="jobs"):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.backend = backend
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._jobs = {}
+        self._by_key = {}
+        self._lock = threading.Lock()
+        self.stats = {"submitted": 0, "deduplicated": 0, "rejected": 0, "done": 0, "failed": 0}
+
+    def _publish(self, job):
+        if self.backend:
+            self.backend.set_json(self.KEY_PREFIX + job["id"], job, ttl=self.result_ttl)
+
+    def _prune(self, now):
+        expired = [jid for jid, job in self._jobs.items()
+                   if job["finished_at"] and now - job["finished_at"] > self.result_ttl]
+        for jid in expired:
+            job = self._jobs.pop(jid)
+            if self._by_key.get(job.get("key")) == jid:
+                del self._by_key[job["key"]]
+
+    def pending(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job["status"] in ("queued", "running"))
+
+    def submit(self, fn, *args, dedupe_key=None):
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            existing = self._jobs.get(self._by_key.get(dedupe_key)) if dedupe_key else None
+            if existing and existing["status"] in ("queued", "running"):
+                self.stats["deduplicated"] += 1
+                return dict(existing)
+            if sum(1 for job in self._jobs.values() if job["status"] in ("queued", "running")) >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise QueueFullError(f"fila cheia ({self.max_pending} jobs pendentes)")
+            job = {"id": uuid.uuid4().hex, "key": dedupe_key, "status": "queued", "result": None, "error": None,
+                   "created_at": now, "started_at": None, "finished_at": None}
+            self._jobs[job["id"]] = job
+            if dedupe_key: self._by_key[dedupe_key] = job["id"]
+            self.stats["submitted"] += 1
+            snapshot = dict(job)
+        self._publish(snapshot)
+        self._executor.submit(self._run, job["id"], fn, args)
+        return snapshot
+
+    def _run(self, job_id, fn, args):
+        with self._lock:
+            job = self._jobs[job_id]
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            snapshot = dict(job)
+        self._publish(snapshot)
+        try:
+            result, status, error = fn(*args), "done", None
+        except Exception as e:
+            result, status, error = None, "failed", str(e)
+        with self._lock:
+            job.update(status=status, result=result, error=error, finished_at=time.time())
+            self.stats[status] += 1
+            snapshot = dict(job)
+        self._publish(snapshot)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job: return dict(job)
+        return self.backend.get_json(self.KEY_PREFIX + job_id) if self.backend else None
@@ -0,0 +1,178 @@
+import os
+import time
+import uuid
+import socket
+import threading
+from urllib.parse import urlparse, parse_qs
+
+class LeaderElector:
+    """
+    LEADER ELECTION v1.0 (Interface):
+    Garante que apenas um processo (entre os workers do gunicorn) execute tarefas singleton
+    como o neural_maintainer.
+    - try_acquire(): tenta assumir/renovar a liderança; retorna True se este processo é o líder.
+    - release(): devolve a liderança (shutdown limpo).
+    - start(): heartbeat em background a cada `renew_interval`; `is_leader` reflete o último resultado.
+    Failover: se o líder morre, o lock/lease expira e o próximo heartbeat de um seguidor assume.
+    """
+    def __init__(self, renew_interval=10.0, log_callback=None):
+        self.holder_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.renew_interval = renew_interval
+        self.log_callback = log_callback
+        self.is_leader = False
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"acquired": 0, "lost": 0}
+
+    def _log(self, message, log_type='system'):
+        if self.log_callback:
+            self.log_callback(message, log_type)
+
+    def try_acquire(self):
+        raise NotImplementedError
+
+    def release(self):
+        raise NotImplementedError
+
+    def heartbeat(self):
+        was_leader = self.is_leader
+        try:
+            self.is_leader = bool(self.try_acquire())
+        except Exception as e:
+            self._log(f"⚠️ LEADER ELECTION: falha no heartbeat ({e})", "error")
+            self.is_leader = False
+        if self.is_leader and not was_leader:
+            self.stats["acquired"] += 1
+            self._log(f"👑 LEADER ELECTION: {self.holder_id} assumiu o neural_maintainer", "system")
+        elif was_leader and not self.is_leader:
+            self.stats["lost"] += 1
+            self._log(f"🔻 LEADER ELECTION: {self.holder_id} perdeu a liderança", "system")
+        return self.is_leader
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.heartbeat()
+            self._stop.wait(self.renew_interval)
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="leader-election")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.is_leader:
+            self.release()
+            self.is_leader = False
+
+class FileLockElector(LeaderElector):
+    """
+    Lock exclusivo (flock) em um arquivo local: um líder por host.
+    O kernel solta o lock quando o processo morre, então o failover não depende de TTL.
+    O arquivo guarda o id do líder atual apenas para diagnóstico.
+    """
+    def __init__(self, path="/tmp/dropmasters-maintainer.lock", **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._fd = None
+
+    def try_acquire(self):
+        import fcntl
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, self.holder_id.encode("utf-8"))
+        self._fd = fd
+        return True
+
+    def release(self):
+        import fcntl
+        if self._fd is None: return
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def current_holder(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+class LeaseElector(LeaderElector):
+    """
+    Lease com TTL em um CacheBackend compartilhado (shm:// ou redis://): um líder entre hosts.
+    - Aquisição via add() (só grava se a chave não existir).
+    - Renovação a cada heartbeat via compare_and_set atômico: só estende o lease se a chave ainda
+      aponta para este processo (sem janela get/set em que outro líder poderia ser sobrescrito).
+    - Se o líder para de renovar, a chave expira em `lease_ttl` e um seguidor assume.
+    """
+    def __init__(self, backend, key="leader:neural-maintainer", lease_ttl=30.0, **kwargs):
+        kwargs.setdefault("renew_interval", lease_ttl / 3)
+        super().__init__(**kwargs)
+        self.backend = backend
+        self.key = key
+        self.lease_ttl = lease_ttl
+
+    def try_acquire(self):
+        me = self.holder_id.encode("utf-8")
+        if self.backend.add(self.key, me, ttl=self.lease_ttl):
+            return True
+        return self.backend.compare_and_set(self.key, me, me, ttl=self.lease_ttl)
+
+    def release(self):
+        self.backend.compare_and_delete(self.key, self.holder_id.encode("utf-8"))
+
+    def current_holder(self):
+        raw = self.backend.get(self.key)
+        return raw.decode("utf-8") if raw else None
+
+class SoloElector(LeaderElector):
+    """
+    Sem eleição: todo processo é líder do próprio estado.
+    Para CACHE_BACKEND_URL por processo (memory://), onde seguidores nunca veriam o humor nem as
+    escritas do pivot de outro worker: cada worker roda o neural_maintainer (comportamento anterior à eleição).
+    """
+    def try_acquire(self):
+        return True
+
+    def release(self):
+        pass
+
+    def current_holder(self):
+        return self.holder_id
+
+def create_leader_elector(url=None, backend=None, log_callback=None):
+    """
+    Seleciona o mecanismo pela URL:
+    - file:///tmp/dropmasters-maintainer.lock  (padrão, flock: workers do mesmo host)
+    - lease://?ttl=30                           (lease no CACHE_BACKEND_URL compartilhado)
+    - solo://                                   (sem eleição: cada worker é líder)
+    O líder publica humor e catálogo pelo backend: com um backend não compartilhado, file:// cai
+    para solo:// (com aviso) e lease:// é recusado.
+    """
+    parsed = urlparse(url or "file:///tmp/dropmasters-maintainer.lock")
+    params = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+    if parsed.scheme == "solo" or (parsed.scheme == "file" and backend is not None and not backend.shared):
+        if parsed.scheme == "file" and log_callback:
+            log_callback("⚠️ LEADER ELECTION: CACHE_BACKEND_URL não é compartilhado (memory://); "
+                         "cada worker roda o neural_maintainer. Use shm:// ou redis:// para eleger um líder.", "error")
+        return SoloElector(renew_interval=float(params.get("interval", 10)), log_callback=log_callback)
+    if parsed.scheme == "file":
+        return FileLockElector(path=parsed.path or "/tmp/dropmasters-maintainer.lock",
+                               renew_interval=float(params.get("interval", 10)), log_callback=log_callback)
+    if parsed.scheme == "lease":
+        if backend is None or not backend.shared:
+            raise ValueError("lease:// exige um CACHE_BACKEND_URL compartilhado (shm:// ou redis://)")
+        return LeaseElector(backend, key=params.get("key", "leader:neural-maintainer"),
+                            lease_ttl=float(params.get("ttl", 30)), log_callback=log_callback)
+    raise ValueError(f"LEADER_ELECTION_URL não suportada: {url}")
@@ -0,0 +1,164 @@
+import os
+import threading
+
+class ListingParser:
+    """
+    LISTING PARSER v1.0 (Interface):
+    Extrai os campos crus de cada resultado de uma página de listagem do Mercado Livre
+    (layouts ui-search-* e poly-component__*):
+    {"title", "price", "link", "seller", "image", "location"} — price como texto da fração,
+    seller/image/location None quando ausentes. Conversão de preço e score ficam no LiveSourcingEngine.
+    """
+    name = None
+
+    # Seletores em ordem de preferência: layout ui-search-* primeiro, poly-component__* como fallback
+    RESULT_SELECTORS = ("li.ui-search-layout__item", "div.ui-search-result__wrapper")
+    FIELD_SELECTORS = {
+        "title": (".ui-search-item__title", ".poly-component__title"),
+        "price": (".ui-search-price__part .andes-money-amount__fraction", ".poly-price__current .andes-money-amount__fraction"),
+        "link": ("a.ui-search-link", "a.poly-component__title"),
+        "seller": (".ui-search-item__group__element--seller", ".poly-component__seller"),
+        "image": ("img.ui-search-result-image__element", ".poly-component__picture img"),
+        "location": (".ui-search-item__location", ".poly-component__location"),
+    }
+
+    def parse(self, html, limit=None):
+        raise NotImplementedError
+
+class SoupListingParser(ListingParser):
+    """Fallback puro Python (BeautifulSoup): constrói só as subárvores dos resultados (SoupStrainer)."""
+    name = "bs4"
+
+    def __init__(self):
+        from bs4 import BeautifulSoup, SoupStrainer
+        self._soup = BeautifulSoup
+        self._strainer = SoupStrainer(class_=["ui-search-layout__item", "ui-search-result__wrapper"])
+
+    def parse(self, html, limit=None):
+        soup = self._soup(html, 'html.parser', parse_only=self._strainer)
+        results = soup.select(self.RESULT_SELECTORS[0]) or soup.select(self.RESULT_SELECTORS[1])
+        items = []
+        for node in results[:limit]:
+            found = {field: node.select_one(sel[0]) or node.select_one(sel[1]) for field, sel in self.FIELD_SELECTORS.items()}
+            image = found["image"]
+            items.append({
+                "title": found["title"].get_text().strip() if found["title"] else None,
+                "price": found["price"].get_text().strip() if found["price"] else None,
+                "link": found["link"].get('href') if found["link"] else None,
+                "seller": found["seller"].get_text().strip() if found["seller"] else None,
+                "image": (image.get('src') or image.get('data-src')) if image else None,
+                "location": found["location"].get_text().strip() if found["location"] else None,
+            })
+        return items
+
+class SelectolaxListingParser(ListingParser):
+    """Backend Lexbor (C) via selectolax: mesmos seletores CSS, parse e busca nativos."""
+    name = "selectolax"
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parser = LexborHTMLParser
+
+    @staticmethod
+    def _first(node, selectors):
+        return node.css_first(selectors[0]) or node.css_first(selectors[1])
+
+    def parse(self, html, limit=None):
+        tree = self._parser(html)
+        results = tree.css(self.RESULT_SELECTORS[0]) or tree.css(self.RESULT_SELECTORS[1])
+        items = []
+        for node in results[:limit]:
+            found = {field: self._first(node, sel) for field, sel in self.FIELD_SELECTORS.items()}
+            image = found["image"]
+            items.append({
+                "title": found["title"].text().strip() if found["title"] else None,
+                "price": found["price"].text().strip() if found["price"] else None,
+                "link": found["link"].attributes.get('href') if found["link"] else None,
+                "seller": found["seller"].text().strip() if found["seller"] else None,
+                "image": (image.attributes.get('src') or image.attributes.get('data-src')) if image else None,
+                "location": found["location"].text().strip() if found["location"] else None,
+            })
+        return items
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+class LxmlListingParser(ListingParser):
+    """Backend libxml2 via lxml: seletores traduzidos para XPath pré-compilado (sem cssselect)."""
+    name = "lxml"
+
+    XPATHS = {
+        "results": (f"//li[{_has_class('ui-search-layout__item')}]", f"//div[{_has_class('ui-search-result__wrapper')}]"),
+        "title": (f".//*[{_has_class('ui-search-item__title')}]", f".//*[{_has_class('poly-component__title')}]"),
+        "price": (f".//*[{_has_class('ui-search-price__part')}]//*[{_has_class('andes-money-amount__fraction')}]",
+                  f".//*[{_has_class('poly-price__current')}]//*[{_has_class('andes-money-amount__fraction')}]"),
+        "link": (f".//a[{_has_class('ui-search-link')}]", f".//a[{_has_class('poly-component__title')}]"),
+        "seller": (f".//*[{_has_class('ui-search-item__group__element--seller')}]", f".//*[{_has_class('poly-component__seller')}]"),
+        "image": (f".//img[{_has_class('ui-search-result-image__element')}]", f".//*[{_has_class('poly-component__picture')}]//img"),
+        "location": (f".//*[{_has_class('ui-search-item__location')}]", f".//*[{_has_class('poly-component__location')}]"),
+    }
+
+    def __init__(self):
+        import lxml.html
+        from lxml import etree
+        self._document = lxml.html.document_fromstring
+        # Sempre bytes + encoding explícito: str com declaração <?xml encoding?> é rejeitada pelo lxml
+        self._html_parser = lxml.html.HTMLParser(encoding="utf-8")
+        self._compile = etree.XPath
+        self._local = threading.local()
+
+    @property
+    def _xpaths(self):
+        # XPath compilado por thread: o fan-out do sourcing chama parse() em paralelo
+        xpaths = getattr(self._local, "xpaths", None)
+        if xpaths is None:
+            xpaths = {key: tuple(self._compile(x) for x in pair) for key, pair in self.XPATHS.items()}
+            self._local.xpaths = xpaths
+        return xpaths
+
+    def _first(self, node, field):
+        primary, fallback = self._xpaths[field]
+        found = primary(node) or fallback(node)
+        return found[0] if found else None
+
+    def parse(self, html, limit=None):
+        if not html or not html.strip(): return []
+        if isinstance(html, str): html = html.encode("utf-8")
+        tree = self._document(html, parser=self._html_parser)
+        primary, fallback = self._xpaths["results"]
+        results = primary(tree) or fallback(tree)
+        items = []
+        for node in results[:limit]:
+            found = {field: self._first(node, field) for field in self.FIELD_SELECTORS}
+            image = found["image"]
+            items.append({
+                "title": found["title"].text_content().strip() if found["title"] is not None else None,
+                "price": found["price"].text_content().strip() if found["price"] is not None else None,
+                "link": found["link"].get('href') if found["link"] is not None else None,
+                "seller": found["seller"].text_content().strip() if found["seller"] is not None else None,
+                "image": (image.get('src') or image.get('data-src')) if image is not None else None,
+                "location": found["location"].text_content().strip() if found["location"] is not None else None,
+            })
+        return items
+
+PARSER_BACKENDS = {
+    "selectolax": SelectolaxListingParser,
+    "lxml": LxmlListingParser,
+    "bs4": SoupListingParser,
+}
+
+def create_listing_parser(name=None):
+    """
+    Seleciona o backend (LISTING_PARSER=auto|selectolax|lxml|bs4).
+    auto: o primeiro disponível entre selectolax -> lxml -> bs4.
+    """
+    name = (name or os.environ.get("LISTING_PARSER", "auto")).lower()
+    candidates = list(PARSER_BACKENDS) if name == "auto" else [name, "bs4"]
+    for candidate in candidates:
+        if candidate not in PARSER_BACKENDS:
+            raise ValueError(f"LISTING_PARSER não suportado: {name}")
+        try:
+            return PARSER_BACKENDS[candidate]()
+        except ImportError:
+            continue
+    raise ImportError("Nenhum parser HTML disponível (instale selectolax, lxml ou beautifulsoup4)")
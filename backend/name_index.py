@@ -0,0 +1,123 @@
+import re
+import math
+from array import array
+from page_cache import normalize_query
+
+_NUMBER = re.compile(r"\d+")
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class ProductNameIndex:
+    """
+    PRODUCT NAME INDEX v1.1 (NORMALIZED + TRIGRAM, COMPACT):
+    Índice em memória para decidir insert vs update de títulos raspados.
+    - Chave normalizada (sem acento/caixa/pontuação, espaços únicos): match exato em O(1).
+    - Índice invertido de trigramas com prefix filtering: Jaccard >= t exige compartilhar ao menos
+      ceil(t * |A|) trigramas, então basta olhar as listas dos |A| - ceil(t * |A|) + 1 trigramas
+      mais raros do título para achar todos os candidatos; cada um é verificado com a interseção exata.
+      Similaridade >= `threshold` conta como o mesmo produto.
+    - Números do título (modelo, capacidade, voltagem) precisam coincidir:
+      "iPhone 14" e "iPhone 15" nunca são fundidos.
+    Memória: cada título ocupa uma posição inteira; as listas de trigramas são array('I') dessas
+    posições (cada trigrama existe uma vez, como chave do dict) e por título ficam só a chave e a
+    contagem de trigramas. Trigramas e números dos candidatos são recalculados da chave no match.
+    """
+    def __init__(self, threshold=0.85):
+        self.threshold = threshold
+        self._exact = {}          # chave normalizada -> id
+        self._slots = {}          # id -> posição
+        self._ids = []            # posição -> id (None = posição livre)
+        self._names = []          # posição -> nome original
+        self._keys = []           # posição -> chave normalizada
+        self._sizes = array('H')  # posição -> quantidade de trigramas (filtro de tamanho)
+        self._free = []
+        self._postings = {}       # trigrama -> array('I') de posições
+
+    def __len__(self):
+        return len(self._slots)
+
+    @classmethod
+    def from_rows(cls, rows, threshold=0.85):
+        index = cls(threshold)
+        for row in rows:
+            index.add(row['id'], row['name'])
+        return index
+
+    def add(self, item_id, name):
+        if item_id in self._slots:
+            self.remove(item_id)
+        key = normalize_query(name)
+        grams = trigrams(key)
+        if self._free:
+            slot = self._free.pop()
+            self._ids[slot], self._names[slot], self._keys[slot], self._sizes[slot] = item_id, name, key, len(grams)
+        else:
+            slot = len(self._ids)
+            self._ids.append(item_id)
+            self._names.append(name)
+            self._keys.append(key)
+            self._sizes.append(len(grams))
+        self._slots[item_id] = slot
+        self._exact.setdefault(key, item_id)
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = array('I')
+            posting.append(slot)
+
+    def remove(self, item_id):
+        slot = self._slots.pop(item_id, None)
+        if slot is None: return
+        key = self._keys[slot]
+        grams = trigrams(key)
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None: continue
+            posting.remove(slot)
+            if not posting: del self._postings[gram]
+        self._ids[slot] = self._names[slot] = self._keys[slot] = None
+        self._sizes[slot] = 0
+        self._free.append(slot)
+        if self._exact.get(key) == item_id:
+            del self._exact[key]
+            # Outro produto com a mesma chave assume o match exato (candidatos: lista do trigrama mais raro)
+            rarest = min((self._postings.get(gram, ()) for gram in grams), key=len)
+            for other in rarest:
+                if self._keys[other] == key:
+                    self._exact[key] = self._ids[other]
+                    break
+
+    def match(self, name):
+        """(id, score) do produto equivalente, ou None. score 1.0 = mesma chave normalizada."""
+        key = normalize_query(name)
+        item_id = self._exact.get(key)
+        if item_id is not None:
+            return item_id, 1.0
+
+        grams = trigrams(key)
+        numbers = _NUMBER.findall(key)
+        size = len(grams)
+        by_rarity = sorted(grams, key=lambda g: len(self._postings.get(g, ())))
+        prefix = size - math.ceil(self.threshold * size) + 1
+        candidates = set()
+        for gram in by_rarity[:prefix]:
+            candidates.update(self._postings.get(gram, ()))
+
+        best, best_score = None, self.threshold
+        min_size, max_size = self.threshold * size, size / self.threshold
+        for candidate in candidates:
+            candidate_size = self._sizes[candidate]
+            if not min_size <= candidate_size <= max_size: continue
+            candidate_key = self._keys[candidate]
+            if _NUMBER.findall(candidate_key) != numbers: continue
+            shared = len(grams & trigrams(candidate_key))
+            score = shared / (size + candidate_size - shared)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return (self._ids[best], round(best_score, 3)) if best is not None else None
+
+    def name_of(self, item_id):
+        slot = self._slots.get(item_id)
+        return self._names[slot] if slot is not None else None
@@ -0,0 +1,122 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+import unicodedata
+
+def normalize_query(query):
+    """'  Fone  Bluetooth ÁUDIO ' -> 'fone bluetooth audio' (sem acento, minúsculo, espaços únicos)."""
+    text = unicodedata.normalize("NFKD", query or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", text.lower())).strip()
+
+class SqlitePageCache:
+    """
+    SOURCING PAGE CACHE v1.0 (SQLite WAL):
+    Cache em disco das páginas de listagem já parseadas, chave = (query normalizada, página).
+    - WAL: leitores de vários workers não bloqueiam o escritor; sobrevive a restart/deploy.
+    - Guarda os itens parseados (JSON), não o HTML: ~50x menor e sem re-parse no hit.
+    - TTL por entrada + eviction por tamanho (expirados primeiro, depois menos acessados).
+    Uma conexão por thread (sqlite3 não compartilha conexões entre threads).
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pages (
+            key TEXT PRIMARY KEY,
+            items BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            expires_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )
+    """
+    ACCESS_RESOLUTION = 60 # segundos: evita uma escrita por hit só para atualizar last_access
+
+    def __init__(self, path="/tmp/dropmasters-sourcing.sqlite3", ttl=3600, max_bytes=64 * 1024 * 1024, evict_every=32):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self._local = threading.local()
+        self._writes = 0
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evicted": 0}
+        with self._connect() as conn:
+            conn.execute(self.SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS pages_last_access ON pages(last_access)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL") # WAL + NORMAL: durável o suficiente para um cache
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def key(query, page):
+        return f"{normalize_query(query)}|{page}"
+
+    def get(self, query, page=1, allow_stale=False):
+        """allow_stale: devolve a entrada mesmo expirada (fallback com o upstream indisponível)."""
+        key = self.key(query, page)
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT items, expires_at, last_access FROM pages WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[1] <= now and not allow_stale):
+                self.stats["misses"] += 1
+                return None
+            if now - row[2] > self.ACCESS_RESOLUTION:
+                conn.execute("UPDATE pages SET last_access = ? WHERE key = ?", (now, key))
+        except sqlite3.Error:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return json.loads(row[0])
+
+    def set(self, query, page, items, ttl=None):
+        blob = json.dumps(items, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        now = time.time()
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO pages (key, items, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (self.key(query, page), blob, len(blob), now + (ttl or self.ttl), now)
+            )
+        except sqlite3.Error:
+            return False
+        self.stats["writes"] += 1
+        self._writes += 1
+        if self._writes % self.evict_every == 0:
+            self.evict()
+        return True
+
+    def evict(self):
+        """Remove expirados e, se ainda acima de max_bytes, os menos acessados."""
+        conn = self._connect()
+        try:
+            removed = conn.execute("DELETE FROM pages WHERE expires_at <= ?", (time.time(),)).rowcount
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                freed = 0
+                victims = []
+                for key, size in conn.execute("SELECT key, size FROM pages ORDER BY last_access"):
+                    victims.append((key,))
+                    freed += size
+                    if freed >= excess: break
+                conn.executemany("DELETE FROM pages WHERE key = ?", victims)
+                removed += len(victims)
+        except sqlite3.Error:
+            return 0
+        self.stats["evicted"] += removed
+        return removed
+
+    def clear(self):
+        self._connect().execute("DELETE FROM pages")
+
+def create_page_cache(path=None, ttl=3600, max_mb=64):
+    """Sem path (SOURCING_PAGE_CACHE_PATH vazio) o cache em disco fica desligado."""
+    if not path: return None
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return SqlitePageCache(path, ttl=ttl, max_bytes=int(max_mb * 1024 * 1024))
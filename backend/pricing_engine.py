@@ -0,0 +1,231 @@
+import itertools
+import numpy as np
+from competitive_engine import ApexHybridEngine, ApexLegendGenerator
+
+class BatchPricingEngine:
+    """
+    BATCH PRICING ENGINE v1.1 (VECTORIZED APEX YIELD):
+    Reprecifica o catálogo inteiro de uma vez com NumPy em vez de produto a produto.
+    Mesmas regras do ciclo living_ai_pivot:
+    - loc_adj 0.95 para hubs SP/SC, preço final = round(base * multiplier * loc_adj, 2) + 0.90
+    - modelo de negócio do ApexHybridEngine (AFFILIATE | MARKETPLACE | WHITE_LABEL | DROPSHIPPING),
+      a partir de nome, base e pressão: como no loop original, que não lia `price` (razão preço/base 0).
+      O preço gravado não entra: com o multiplicador sorteado a cada ciclo a razão cruzaria
+      WHITE_LABEL_MIN_RATIO e reescreveria descrição/metadata do catálogo inteiro.
+    - demand_score 85-98 sob pressão de suprimento (> 0.6), senão 40-79; viral acima de 90
+    - estoque 2-5 para virais, 10-20 para os demais
+    Valores gravados que já estão na faixa do ciclo (demand_score, e estoque na faixa do viral)
+    são mantidos; só os fora da faixa são sorteados de novo.
+
+    Sinais estáveis: margem e pressão de mercado são sorteadas a cada ciclo (margem em dois regimes,
+    ~1.9-2.2x e ~2.6-3.2x; pressão acima de AFFILIATE_PRESSURE vira o modelo do catálogo inteiro),
+    o que levava ~85% das linhas além do limiar do diff em todo ciclo. smooth() guarda médias móveis
+    exponenciais (`smoothing`) das duas e são elas que precificam e escolhem o modelo; o processo que
+    assume o pivot (novo líder) começa pela margem implícita nos preços gravados.
+
+    Delta-only: diff() compara o estado calculado com a última linha gravada e marca apenas
+    colunas com mudança material (variação de preço acima do limiar, troca de faixa de estoque,
+    flip de viral/destaque, troca de modelo, demand_score além do limiar).
+    """
+    HUB_LOCATIONS = ("SP", "SC")
+    MODEL_ORDER = ("AFFILIATE", "MARKETPLACE", "WHITE_LABEL", "DROPSHIPPING")
+    # Todos os pares ordenados de soluções gerais (equivalente a random.sample(GENERAL_SOLUTIONS, 2))
+    SOLUTION_PAIRS = list(itertools.permutations(ApexLegendGenerator.GENERAL_SOLUTIONS, 2))
+    VIRAL_STOCK = (2, 5)
+    REGULAR_STOCK = (10, 20)
+    DELTA_COLUMNS = ("price", "description", "stock", "is_featured", "metadata")
+
+    def __init__(self, seed=None, smoothing=1.0):
+        self.rng = np.random.default_rng(seed)
+        self.smoothing = smoothing
+        self.margin = None   # margem de referência (EMA das margens sorteadas)
+        self.pressure = None # pressão de mercado de referência (EMA)
+
+    def implied_margin(self, products, price_adj=1.0):
+        """Mediana de (preço - 0.90) / (base * loc_adj) / price_adj nas linhas gravadas, ou None."""
+        rows = [p for p in products or [] if float(p.get('base_price') or 0) > 0 and float(p.get('price') or 0) > 0.9]
+        if not rows: return None
+        bases = np.fromiter((float(p['base_price']) for p in rows), dtype=np.float64, count=len(rows))
+        prices = np.fromiter((float(p['price']) for p in rows), dtype=np.float64, count=len(rows))
+        is_hub = np.isin(np.array([(p.get('metadata') or {}).get('location', 'Global') for p in rows], dtype=object), self.HUB_LOCATIONS)
+        return float(np.median((prices - 0.90) / (bases * np.where(is_hub, 0.95, 1.0)))) / price_adj
+
+    def smooth(self, margin, market_pressure, products=None, price_adj=1.0):
+        """
+        (margem, pressão) do ciclo após a EMA. Na primeira chamada a margem parte da implícita em
+        `products` e a pressão do valor sorteado.
+        """
+        if self.margin is None:
+            self.margin = self.implied_margin(products, price_adj) or margin
+        if self.pressure is None:
+            self.pressure = market_pressure
+        self.margin += self.smoothing * (margin - self.margin)
+        self.pressure += self.smoothing * (market_pressure - self.pressure)
+        return self.margin, self.pressure
+
+    def select_models(self, names, prices, bases, market_pressure):
+        """Versão vetorizada de ApexHybridEngine.select_best_model (sem região do usuário)."""
+        # Mesmo fallback do motor escalar: base ausente -> metade do preço
+        model_base = np.where(bases > 0, bases, prices * 0.5)
+        ratio = np.divide(prices, model_base, out=np.zeros_like(prices), where=model_base > 0)
+        is_special = np.fromiter(("Special" in n for n in names), dtype=bool, count=len(names))
+        conditions = [
+            (ratio < ApexHybridEngine.AFFILIATE_MAX_RATIO) & (market_pressure > ApexHybridEngine.AFFILIATE_PRESSURE),
+            is_special,
+            ratio > ApexHybridEngine.WHITE_LABEL_MIN_RATIO,
+        ]
+        return np.select(conditions, [0, 1, 2], default=3)
+
+    def reprice(self, products, multiplier, market_pressure, supply_pressure):
+        """
+        Calcula o novo estado de todos os produtos com base_price > 0.
+        Retorna um dict de arrays alinhados com `products` (lista filtrada).
+        """
+        products = [p for p in products if float(p.get('base_price') or 0) > 0]
+        n = len(products)
+        names = [p['name'] for p in products]
+        bases = np.fromiter((float(p['base_price']) for p in products), dtype=np.float64, count=n)
+        prices = np.fromiter((float(p.get('price') or 0) for p in products), dtype=np.float64, count=n)
+        metas = [p.get('metadata') or {} for p in products]
+        locations = np.array([m.get('location', 'Global') for m in metas], dtype=object)
+        current_stock = np.fromiter((int(p.get('stock') or -1) for p in products), dtype=np.int64, count=n)
+        current_demand = np.fromiter((float(m.get('demand_score') or -1e9) for m in metas), dtype=np.float64, count=n)
+
+        is_hub = np.isin(locations, self.HUB_LOCATIONS)
+        loc_adj = np.where(is_hub, 0.95, 1.0)
+        final_prices = np.round(bases * multiplier * loc_adj, 2) + 0.90
+
+        low, high = (85, 99) if supply_pressure > 0.6 else (40, 80)
+        demand_in_band = (current_demand >= low) & (current_demand < high)
+        demand = np.where(demand_in_band, current_demand, self.rng.integers(low, high, size=n)).astype(np.int64)
+        is_viral = demand > 90
+        stock_in_band = self.stock_in_band(current_stock, is_viral)
+        stock = np.where(
+            stock_in_band,
+            current_stock,
+            np.where(
+                is_viral,
+                self.rng.integers(self.VIRAL_STOCK[0], self.VIRAL_STOCK[1] + 1, size=n),
+                self.rng.integers(self.REGULAR_STOCK[0], self.REGULAR_STOCK[1] + 1, size=n)
+            )
+        )
+
+        models = self.select_models(names, np.zeros(n), bases, market_pressure)
+        solution_pairs = self.rng.integers(0, len(self.SOLUTION_PAIRS), size=n)
+
+        return {
+            "products": products,
+            "current_prices": prices,
+            "current_stock": current_stock,
+            "current_demand": current_demand,
+            "locations": locations,
+            "final_prices": final_prices,
+            "loc_adj": loc_adj,
+            "demand_scores": demand,
+            "is_viral": is_viral,
+            "stock": stock,
+            "models": models,
+            "solution_pairs": solution_pairs,
+        }
+
+    def stock_in_band(self, stock, is_viral):
+        return np.where(
+            is_viral,
+            (stock >= self.VIRAL_STOCK[0]) & (stock <= self.VIRAL_STOCK[1]),
+            (stock >= self.REGULAR_STOCK[0]) & (stock <= self.REGULAR_STOCK[1])
+        )
+
+    def diff(self, result, price_threshold=0.03, demand_threshold=10):
+        """
+        Máscaras booleanas por coluna: True onde o valor calculado difere materialmente
+        da última versão gravada (as linhas lidas do banco no início do ciclo).
+        """
+        products = result["products"]
+        n = len(products)
+        metas = [p.get('metadata') or {} for p in products]
+        current_prices = result["current_prices"]
+        current_featured = np.fromiter((bool(p.get('is_featured')) for p in products), dtype=bool, count=n)
+        current_viral = np.fromiter((bool(m.get('is_viral')) for m in metas), dtype=bool, count=n)
+        current_models = np.array([m.get('business_model') for m in metas], dtype=object)
+        new_models = np.array(self.MODEL_ORDER, dtype=object)[result["models"]]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price_delta = np.abs(result["final_prices"] - current_prices) / current_prices
+        price_changed = (current_prices <= 0) | (price_delta > price_threshold)
+
+        viral = result["is_viral"]
+        in_band = self.stock_in_band(result["current_stock"], viral)
+        model_changed = current_models != new_models
+        has_description = np.fromiter((bool(p.get('description')) for p in products), dtype=bool, count=n)
+
+        return {
+            "price": price_changed,
+            # Copy é atrelada ao modelo: só reescreve quando o modelo muda
+            "description": model_changed | ~has_description,
+            "stock": ~in_band,
+            "is_featured": current_featured != viral,
+            "metadata": (
+                model_changed
+                | (current_viral != viral)
+                | (np.abs(result["demand_scores"] - result["current_demand"]) >= demand_threshold)
+            ),
+        }
+
+    def build_payloads(self, result, updated_at, changes=None):
+        """
+        Monta os payloads de upsert (único passo por item: composição de strings/dicts).
+        Com `changes` (saída de diff), só linhas alteradas e só as colunas alteradas.
+        """
+        n = len(result["products"])
+        if changes is None:
+            changes = {column: np.ones(n, dtype=bool) for column in self.DELTA_COLUMNS}
+        flags_by_row = zip(*(changes[c].tolist() for c in self.DELTA_COLUMNS))
+        profiles = [ApexHybridEngine.MODEL_PROFILES[m] for m in self.MODEL_ORDER]
+        hooks = [ApexLegendGenerator.MODEL_HOOKS[m] for m in self.MODEL_ORDER]
+
+        payloads = []
+        for p, price, d_score, viral, stock, model_idx, pair_idx, flags in zip(
+            result["products"],
+            result["final_prices"].tolist(),
+            result["demand_scores"].tolist(),
+            result["is_viral"].tolist(),
+            result["stock"].tolist(),
+            result["models"].tolist(),
+            result["solution_pairs"].tolist(),
+            flags_by_row,
+        ):
+            if not any(flags): continue
+            price_changed, description_changed, stock_changed, featured_changed, metadata_changed = flags
+            profile = profiles[model_idx]
+            # Só linhas com coluna alterada chegam aqui: id + updated_at + as colunas que mudaram
+            payload = {"id": p['id'], "updated_at": updated_at}
+            if price_changed:
+                payload["price"] = price
+            if description_changed:
+                payload["description"] = ApexLegendGenerator.compose(p['name'], profile['tag'], hooks[model_idx], self.SOLUTION_PAIRS[pair_idx])
+            if stock_changed:
+                payload["stock"] = stock
+            if featured_changed:
+                payload["is_featured"] = viral
+            if metadata_changed:
+                payload["metadata"] = {
+                    **(p.get('metadata') or {}),
+                    "business_model": profile['model'],
+                    "model_tag": profile['tag'],
+                    "strategy": profile['strategy'],
+                    "demand_score": d_score,
+                    "is_viral": viral
+                }
+            payloads.append(payload)
+        return payloads
+
+    @staticmethod
+    def count_changes(changes):
+        """(linhas com alguma coluna alterada, total de colunas alteradas) de uma saída de diff()."""
+        masks = np.vstack([changes[c] for c in BatchPricingEngine.DELTA_COLUMNS])
+        return int(masks.any(axis=0).sum()), int(masks.sum())
+
+    @staticmethod
+    def location_counts(result):
+        locations, counts = np.unique(result["locations"].astype(str), return_counts=True)
+        return dict(zip(locations.tolist(), counts.tolist()))
@@ -0,0 +1,87 @@
+import sys
+import json
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+class ProductRecord:
+    """
+    PRODUCT RECORD v1.0 (COMPACT CATALOG):
+    Representação slotted de um produto do catálogo em memória.
+    - Sem __dict__ por instância (__slots__).
+    - metadata guardado uma única vez; location/is_viral/demand_score/business_model são
+      derivados dele na serialização em vez de copiados.
+    - Strings de baixa cardinalidade (category, location, business_model) internadas.
+    """
+    __slots__ = ("id", "name", "price", "base_price", "description", "image_url", "category",
+                 "stock", "is_featured", "metadata", "ai_mood")
+
+    # Ordem das chaves no JSON público (mesmo formato do endpoint /api/v2/products)
+    PUBLIC_FIELDS = ("id", "name", "price", "base_price", "description", "image_url", "category", "stock",
+                     "original_price", "location", "is_viral", "demand_score", "metadata", "ai_mood",
+                     "is_featured", "business_model")
+    INTERNED_META_KEYS = ("location", "business_model", "model_tag", "strategy", "source", "seller")
+
+    def __init__(self, id, name, price, base_price, description, image_url, category, stock, is_featured, metadata, ai_mood):
+        self.id = id
+        self.name = name
+        self.price = price
+        self.base_price = base_price
+        self.description = description
+        self.image_url = image_url
+        self.category = category
+        self.stock = stock
+        self.is_featured = is_featured
+        self.metadata = metadata
+        self.ai_mood = ai_mood
+
+    @classmethod
+    def from_row(cls, p, ai_mood=None):
+        price = float(p.get('price', 0))
+        # Cópia: internar as chaves não pode alterar o dict de quem chamou (linha do banco, delta)
+        meta = dict(p.get('metadata') or {})
+        for key in cls.INTERNED_META_KEYS:
+            if key in meta: meta[key] = _intern(meta[key])
+        return cls(
+            id=p['id'],
+            name=p['name'],
+            price=price,
+            base_price=float(p.get('base_price') or (price * 0.65)),
+            description=p.get('description', ''),
+            image_url=p.get('image_url'),
+            category=_intern(p.get('category')),
+            stock=p.get('stock', 10),
+            is_featured=p.get('is_featured', False),
+            metadata=meta,
+            ai_mood=_intern(ai_mood)
+        )
+
+    # Campos achatados derivados do metadata (não ocupam slot)
+    @property
+    def original_price(self): return float(self.price * 2.1)
+
+    @property
+    def location(self): return self.metadata.get('location', 'SP')
+
+    @property
+    def is_viral(self): return self.metadata.get('is_viral', False)
+
+    @property
+    def demand_score(self): return self.metadata.get('demand_score', 0)
+
+    @property
+    def business_model(self): return self.metadata.get('business_model', 'DROPSHIPPING')
+
+    def to_row(self):
+        """Colunas de banco suficientes para reconstruir o registro (deltas / cache compartilhado)."""
+        return {
+            "id": self.id, "name": self.name, "price": self.price, "base_price": self.base_price,
+            "description": self.description, "image_url": self.image_url, "category": self.category,
+            "stock": self.stock, "is_featured": self.is_featured, "metadata": self.metadata
+        }
+
+    def to_public(self, fields=None):
+        return {f: getattr(self, f) for f in (self.PUBLIC_FIELDS if fields is None else fields)}
+
+    def to_json_bytes(self):
+        return json.dumps(self.to_public(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
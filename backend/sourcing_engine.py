@@ -1,7 +1,12 @@
-import requests
-from bs4 import BeautifulSoup
+import os
 import random
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from http_client import http_client
+from listing_parser import create_listing_parser
+from page_cache import create_page_cache
+from upstream_guard import UpstreamUnavailableError
 
 class LiveSourcingEngine:
     """
@@ -9,6 +14,21 @@ class LiveSourcingEngine:
     Inteligência Viva para Descoberta de Fornecedores e Análise de Mercado.
     """
     
+    # selectolax/lxml quando instalados, BeautifulSoup como fallback (LISTING_PARSER)
+    parser = create_listing_parser()
+    # Páginas já parseadas em SQLite (WAL), compartilhadas entre workers e restarts
+    page_cache = create_page_cache(
+        os.environ.get("SOURCING_PAGE_CACHE_PATH", "/tmp/dropmasters-sourcing.sqlite3"),
+        ttl=int(os.environ.get("SOURCING_PAGE_CACHE_TTL", 3600)),
+        max_mb=float(os.environ.get("SOURCING_PAGE_CACHE_MAX_MB", 64))
+    )
+    PAGE_SIZE = 50 # Itens por página da listagem do Mercado Livre
+    # Host da listagem; apontar para benchmarks/fixture_server.py mede/testa o scraper offline
+    LISTING_BASE_URL = os.environ.get("SOURCING_LISTING_URL", "https://lista.mercadolivre.com.br").rstrip("/")
+    # Pool compartilhado: o fan-out não cria threads por chamada e uma busca lenta
+    # que passou do deadline termina em background sem segurar a resposta
+    _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="sourcing")
+
     USER_AGENTS = [
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
         "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36"
@@ -32,39 +52,46 @@ class LiveSourcingEngine:
         return min(99, score)
 
     @staticmethod
-    def search_mercadolivre(query, limit=5):
+    def search_mercadolivre(query, limit=5, page=1, raise_errors=False):
+        """
+        Itens da página `page` da listagem, ordenados por vibe_score; None em falha.
+        raise_errors=True propaga a falha (UpstreamUnavailableError sem cache, HTTP != 200, rede/parse)
+        para quem precisa distinguir "sem resultados" de "fornecedor fora" (QuoteAggregator).
+        """
+        cache = LiveSourcingEngine.page_cache
+        cached = cache.get(query, page) if cache else None
+        if cached is not None:
+            return sorted(cached[:limit], key=lambda x: x['vibe_score'], reverse=True)
         try:
             formatted_query = query.replace(" ", "-")
-            url = f"https://lista.mercadolivre.com.br/{formatted_query}#D[A:{formatted_query}]"
+            offset = f"_Desde_{(page - 1) * LiveSourcingEngine.PAGE_SIZE + 1}" if page > 1 else ""
+            url = f"{LiveSourcingEngine.LISTING_BASE_URL}/{formatted_query}{offset}#D[A:{formatted_query}]"
             
-            response = requests.get(url, headers=LiveSourcingEngine._get_headers(), timeout=12)
-            if response.status_code != 200: return None
-
-            soup = BeautifulSoup(response.text, 'html.parser')
-            results = soup.select('li.ui-search-layout__item') or soup.select('div.ui-search-result__wrapper')
+            try:
+                response = http_client.get(url, headers=LiveSourcingEngine._get_headers())
+            except UpstreamUnavailableError as e:
+                # Circuito aberto / limite de taxa: falha rápido com a última página conhecida (mesmo expirada)
+                stale = cache.get(query, page, allow_stale=True) if cache else None
+                print(f"Apex Sourcing Guard: {e} ({'stale cache' if stale else 'sem fallback'})")
+                if stale: return sorted(stale[:limit], key=lambda x: x['vibe_score'], reverse=True)
+                if raise_errors: raise
+                return None
+            if response.status_code != 200:
+                if raise_errors: raise RuntimeError(f"HTTP {response.status_code}")
+                return None
 
+            # Página inteira parseada (na ordem da listagem) para o cache servir qualquer `limit`
             products = []
-            for item in results[:limit]:
+            for raw in LiveSourcingEngine.parser.parse(response.text):
                 try:
-                    title_elem = item.select_one('.ui-search-item__title') or item.select_one('.poly-component__title')
-                    price_elem = item.select_one('.ui-search-price__part .andes-money-amount__fraction') or item.select_one('.poly-price__current .andes-money-amount__fraction')
-                    link_elem = item.select_one('a.ui-search-link') or item.select_one('a.poly-component__title')
-                    
-                    if not (title_elem and price_elem and link_elem): continue
-                    
-                    title = title_elem.get_text().strip()
-                    price = float(price_elem.get_text().replace('.', '').replace(',', '.'))
-                    link = link_elem.get('href')
-                    
-                    # Seller/Reputation info
-                    seller_elem = item.select_one('.ui-search-item__group__element--seller') or item.select_one('.poly-component__seller')
-                    seller = seller_elem.get_text().strip() if seller_elem else "Fornecedor Validado"
+                    if not (raw['title'] and raw['price'] and raw['link']): continue
 
-                    img_elem = item.select_one('img.ui-search-result-image__element') or item.select_one('.poly-component__picture img')
-                    image = img_elem.get('src') or img_elem.get('data-src') if img_elem else None
-                    
-                    loc_elem = item.select_one('.ui-search-item__location') or item.select_one('.poly-component__location')
-                    location = loc_elem.get_text().strip() if loc_elem else "SP"
+                    title = raw['title']
+                    price = float(raw['price'].replace('.', '').replace(',', '.'))
+                    link = raw['link']
+                    seller = raw['seller'] or "Fornecedor Validado"
+                    image = raw['image']
+                    location = raw['location'] or "SP"
 
                     # Neural Score Simulation
                     vibe_score = LiveSourcingEngine.analyze_market_vibe(title, price, seller)
@@ -80,13 +107,49 @@ class LiveSourcingEngine:
                         "source": "MercadoLivre"
                     })
                 except: continue
+
+            if cache and products:
+                cache.set(query, page, products)
+            return sorted(products[:limit], key=lambda x: x['vibe_score'], reverse=True)
             
-            return sorted(products, key=lambda x: x['vibe_score'], reverse=True)
-            
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
             print(f"Apex Sourcing Error: {e}")
+            if raise_errors: raise
             return None
 
+    @staticmethod
+    def search_many(queries, limit=5, pages=1, deadline=8.0):
+        """
+        Fan-out concorrente de search_mercadolivre por (query, página).
+        Retorna o que chegou até `deadline` segundos: resultados deduplicados por nome
+        normalizado (fica o de maior vibe_score), cada item marcado com a `query` de origem, ordenados por vibe_score.
+        Buscas que estouram o prazo são descartadas (continuam em background até o timeout HTTP).
+        """
+        started = time.monotonic()
+        queries = list(dict.fromkeys(q.strip() for q in queries if q and q.strip()))
+        futures = {
+            LiveSourcingEngine._executor.submit(LiveSourcingEngine.search_mercadolivre, q, limit, page): q
+            for q in queries for page in range(1, pages + 1)
+        }
+
+        merged = {}
+        pending = set(futures)
+        while pending:
+            remaining = deadline - (time.monotonic() - started)
+            if remaining <= 0: break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                for item in future.result() or []:
+                    key = re.sub(r"\W+", " ", item['name'].lower()).strip()
+                    if key in merged and merged[key]['vibe_score'] >= item['vibe_score']: continue
+                    merged[key] = {**item, "query": futures[future]}
+        for future in pending:
+            future.cancel() # Só tem efeito nas que ainda não começaram
+
+        return sorted(merged.values(), key=lambda x: x['vibe_score'], reverse=True)
+
     @staticmethod
     def get_trending_keywords():
         """Retorna palavras em ascensão baseada em sazonalidade simulada."""
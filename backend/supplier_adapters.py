@@ -0,0 +1,242 @@
+import os
+import time
+import zlib
+import random
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from name_index import ProductNameIndex
+from page_cache import normalize_query
+from upstream_guard import UpstreamUnavailableError
+
+# UF das localizações que as listagens trazem por extenso ("São Paulo" -> "SP")
+STATE_CODES = {
+    "sao paulo": "SP", "santa catarina": "SC", "parana": "PR", "minas gerais": "MG",
+    "rio de janeiro": "RJ", "rio grande do sul": "RS", "espirito santo": "ES", "goias": "GO",
+    "distrito federal": "DF", "capital federal": "DF", "bahia": "BA", "pernambuco": "PE", "ceara": "CE"
+}
+# Frete estimado (R$) por proximidade entre origem e destino
+SHIPPING_RATES = {"same_state": 12.9, "same_region": 19.9, "national": 29.9, "global": 0.0}
+REGIONS = {
+    "SP": "SE", "RJ": "SE", "MG": "SE", "ES": "SE",
+    "PR": "S", "SC": "S", "RS": "S",
+    "GO": "CO", "DF": "CO", "BA": "NE", "PE": "NE", "CE": "NE"
+}
+LEAD_DAYS = {"same_state": 2, "same_region": 4, "national": 7, "global": 20}
+GLOBAL_IMPORT_RATE = float(os.environ.get("SUPPLIER_IMPORT_RATE", 0.44)) # II 20% + ICMS sobre compras internacionais
+
+def location_code(location):
+    """'São Paulo' / 'SP' / 'China' -> 'SP' / 'SP' / 'GLOBAL' (None para localização desconhecida)."""
+    if not location: return None
+    key = normalize_query(location)
+    if key.upper() in REGIONS: return key.upper()
+    if key in ("global", "china", "internacional"): return "GLOBAL"
+    return STATE_CODES.get(key)
+
+def shipping_lane(origin, destination):
+    if origin == "GLOBAL": return "global"
+    if origin and origin == destination: return "same_state"
+    if origin and REGIONS.get(origin) and REGIONS.get(origin) == REGIONS.get(destination): return "same_region"
+    return "national"
+
+class SupplierAdapter:
+    """
+    SUPPLIER ADAPTER v1.0 (INTERFACE):
+    Contrato comum dos fornecedores consultados pelo QuoteAggregator.
+    - search(query, limit): ofertas {"supplier", "sku", "name", "price", "location", "url", "image"}.
+    - quote(offer, destination): {"shipping", "taxes", "landed_cost", "lead_days"} para entregar no destino (UF).
+    - availability(offer): estoque disponível, ou None quando o fornecedor não informa.
+    quote() padrão usa a tabela de frete por proximidade; adapters com API de cotação sobrescrevem.
+    """
+    name = "base"
+
+    def search(self, query, limit=5):
+        raise NotImplementedError
+
+    def quote(self, offer, destination):
+        lane = shipping_lane(offer.get('location'), destination)
+        shipping = SHIPPING_RATES[lane]
+        taxes = round(offer['price'] * GLOBAL_IMPORT_RATE, 2) if lane == "global" else 0.0
+        return {
+            "shipping": shipping,
+            "taxes": taxes,
+            "landed_cost": round(offer['price'] + shipping + taxes, 2),
+            "lead_days": LEAD_DAYS[lane]
+        }
+
+    def availability(self, offer):
+        return offer.get('stock')
+
+class MercadoLivreAdapter(SupplierAdapter):
+    """
+    Listagem pública do Mercado Livre via LiveSourcingEngine (page cache, guard e parser compartilhados).
+    Falhas propagam (raise_errors): o agregador reporta "unavailable"/"error" em vez de "ok" sem ofertas.
+    """
+    name = "mercadolivre"
+
+    def search(self, query, limit=5):
+        from sourcing_engine import LiveSourcingEngine
+        return [{
+            "supplier": self.name,
+            "sku": item['url'],
+            "name": item['name'],
+            "price": item['price'],
+            "location": location_code(item['location']) or "SP",
+            "url": item['url'],
+            "image": item['image'],
+            "seller": item['seller']
+        } for item in LiveSourcingEngine.search_mercadolivre(query, limit=limit, raise_errors=True) or []]
+
+class StubSupplierAdapter(SupplierAdapter):
+    """
+    Fornecedor simulado e determinístico para testes de carga offline do agregador.
+    Gera as mesmas variantes de produto para uma query em todos os stubs (para exercitar a fusão por
+    identidade), com preço/estoque por fornecedor, latência `latency_ms` (+/- 50%) e `failure_rate`.
+    """
+    VARIANTS = ("Original", "Pro", "Max", "Lite", "Plus", "Ultra", "Premium", "Mini")
+
+    def __init__(self, name, origins, price_factor=1.0, latency_ms=0, failure_rate=0.0):
+        self.name = name
+        self.origins = origins
+        self.price_factor = price_factor
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+
+    def _seed(self, *parts):
+        return zlib.crc32("|".join(map(str, parts)).encode("utf-8"))
+
+    def search(self, query, limit=5):
+        if self.latency_ms:
+            time.sleep(self.latency_ms * random.uniform(0.5, 1.5) / 1000)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise RuntimeError(f"{self.name}: falha simulada")
+        key = normalize_query(query)
+        offers = []
+        for variant in self.VARIANTS[:limit]:
+            base = random.Random(self._seed(key, variant)).uniform(49, 1200) # mesmo produto, mesma base em todos os stubs
+            rng = random.Random(self._seed(self.name, key, variant))
+            sku = f"{self.name.upper()}-{self._seed(key, variant) % 10 ** 8:08d}"
+            offers.append({
+                "supplier": self.name,
+                "sku": sku,
+                "name": f"{query.strip().title()} {variant}",
+                "price": round(base * self.price_factor * rng.uniform(0.9, 1.1), 2),
+                "location": rng.choice(self.origins),
+                "url": f"https://{self.name}.example/p/{sku}",
+                "image": None,
+                "stock": rng.choice((0, 3, 12, 40, 150))
+            })
+        return offers
+
+STUB_ADAPTERS = {
+    # Dropi: estoque nacional, preço de atacado
+    "dropi-stub": lambda: StubSupplierAdapter("dropi", ["SP", "SC", "PR", "MG"], price_factor=0.85, latency_ms=120),
+    # AliExpress: mais barato na origem, frete internacional + impostos de importação
+    "aliexpress-stub": lambda: StubSupplierAdapter("aliexpress", ["GLOBAL"], price_factor=0.55, latency_ms=350, failure_rate=0.05)
+}
+ADAPTER_TYPES = {"mercadolivre": MercadoLivreAdapter, **STUB_ADAPTERS}
+
+class SupplierRegistry:
+    """Adapters ativos por nome; o agregador consulta todos os registrados."""
+    def __init__(self, adapters=()):
+        self._adapters = {}
+        for adapter in adapters:
+            self.register(adapter)
+
+    def register(self, adapter):
+        self._adapters[adapter.name] = adapter
+        return adapter
+
+    def unregister(self, name):
+        return self._adapters.pop(name, None)
+
+    def get(self, name):
+        return self._adapters.get(name)
+
+    def names(self):
+        return list(self._adapters)
+
+    def adapters(self):
+        return list(self._adapters.values())
+
+def create_supplier_registry(spec="mercadolivre"):
+    """SUPPLIER_ADAPTERS=mercadolivre,dropi-stub,aliexpress-stub (nomes desconhecidos são ignorados)."""
+    registry = SupplierRegistry()
+    for name in (part.strip() for part in (spec or "").split(",")):
+        factory = ADAPTER_TYPES.get(name)
+        if factory: registry.register(factory())
+    return registry
+
+class QuoteAggregator:
+    """
+    QUOTE AGGREGATOR v1.0 (FAN-OUT MULTI-FORNECEDOR):
+    - Consulta todos os adapters do registry em paralelo (search + quote + availability por adapter)
+      sob um único `deadline`; quem não responde a tempo fica de fora ("timeout").
+    - Ofertas sem estoque são descartadas; as demais são fundidas por identidade de produto
+      (ProductNameIndex: título normalizado / trigramas, números do modelo precisam coincidir).
+    - Por produto: a melhor oferta geral e a de menor custo posto (preço + frete + impostos) por origem.
+    """
+    def __init__(self, registry, deadline=8.0, max_workers=8, match_threshold=0.85):
+        self.registry = registry
+        self.deadline = deadline
+        self.match_threshold = match_threshold
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="quotes")
+
+    @staticmethod
+    def _collect(adapter, query, limit, destination):
+        offers = []
+        for offer in adapter.search(query, limit=limit) or []:
+            stock = adapter.availability(offer)
+            if stock == 0: continue
+            offers.append({**offer, **adapter.quote(offer, destination), "stock": stock, "destination": destination})
+        return offers
+
+    def aggregate(self, query, destination="SP", limit=5, deadline=None):
+        started = time.monotonic()
+        deadline = self.deadline if deadline is None else deadline
+        futures = {
+            self._executor.submit(self._collect, adapter, query, limit, destination): adapter.name
+            for adapter in self.registry.adapters()
+        }
+
+        status = {name: "timeout" for name in futures.values()}
+        offers = []
+        pending = set(futures)
+        while pending:
+            remaining = deadline - (time.monotonic() - started)
+            if remaining <= 0: break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures[future]
+                try:
+                    offers.extend(future.result())
+                    status[name] = "ok"
+                except UpstreamUnavailableError as e:
+                    status[name] = f"unavailable: {e.reason}"
+                except Exception as e:
+                    status[name] = f"error: {e}"
+        for future in pending:
+            future.cancel()
+
+        return {
+            "query": query,
+            "destination": destination,
+            "products": self.merge(offers),
+            "suppliers": status,
+            "elapsed_ms": round((time.monotonic() - started) * 1000, 1)
+        }
+
+    def merge(self, offers):
+        """Agrupa ofertas do mesmo produto; mais baratas primeiro, então o primeiro título vira o nome do grupo."""
+        index = ProductNameIndex(self.match_threshold)
+        groups = []
+        for offer in sorted(offers, key=lambda o: o['landed_cost']):
+            match = index.match(offer['name'])
+            if match:
+                group = groups[match[0]]
+            else:
+                index.add(len(groups), offer['name'])
+                group = {"name": offer['name'], "best": offer, "by_location": {}, "offers": 0, "suppliers": []}
+                groups.append(group)
+            group["offers"] += 1
+            if offer['supplier'] not in group["suppliers"]: group["suppliers"].append(offer['supplier'])
+            group["by_location"].setdefault(offer['location'] or "?", offer)
+        return sorted(groups, key=lambda g: g["best"]['landed_cost'])
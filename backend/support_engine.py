@@ -1,5 +1,6 @@
 import random
 import datetime
+from intent_classifier import classifier
 
 class GenerativeQuantumBrain:
     """
@@ -8,23 +9,32 @@ class GenerativeQuantumBrain:
     and adaptive mood states. Mimics LLM behavior without improved costs.
     """
     def __init__(self):
-        self.memory_buffer = [] # Stores last 5 interactions for context
+        # Humor sem sessão (uso direto do brain); com sessão, humor e contexto vivem no ConversationStore
         self.mood_state = "PROACTIVE" # PROACTIVE, ANALYTICAL, EMPATHETIC, URGENT
-        
-    def _update_mood(self, sentiment):
-        if sentiment == "FRUSTRATED": self.mood_state = "EMPATHETIC"
-        elif sentiment == "WANT_TO_BUY": self.mood_state = "URGENT"
-        elif sentiment == "CURIOSITY": self.mood_state = "ANALYTICAL"
-        else: self.mood_state = "PROACTIVE"
 
-    def _generate_opener(self):
+    @staticmethod
+    def _mood_for(sentiment):
+        if sentiment == "FRUSTRATED": return "EMPATHETIC"
+        elif sentiment == "WANT_TO_BUY": return "URGENT"
+        elif sentiment == "CURIOSITY": return "ANALYTICAL"
+        return "PROACTIVE"
+
+    @staticmethod
+    def _last_topic(session):
+        """Último assunto identificado na conversa (context retention para perguntas de seguimento)."""
+        for message in reversed(session["history"]):
+            if message["role"] == "user" and message["intent"] not in (None, "UNKNOWN"):
+                return message["intent"]
+        return None
+
+    def _generate_opener(self, mood=None):
         openers = {
             "PROACTIVE": ["⚡ Quantum Core processando...", "Conectei aos nodos neurais.", "Analisando fluxo de dados..."],
             "ANALYTICAL": ["🔍 Deixe-me verificar a base de conhecimento.", "Calculando variáveis...", "Acessando logs do sistema..."],
             "EMPATHETIC": ["🛡️ Entendo sua preocupação.", "Priorizando seu atendimento.", "Sincronizando com suporte humano..."],
             "URGENT": ["🔥 Oportunidade detectada!", "Sinal de alta demanda ativo.", "Reservando slot de processamento..."]
         }
-        return random.choice(openers[self.mood_state])
+        return random.choice(openers[mood or self.mood_state])
 
     def _generate_core_message(self, topic, context=None):
         templates = {
@@ -69,38 +79,44 @@ class GenerativeQuantumBrain:
         }
         return actions.get(topic, "Como posso auxiliar na sua próxima venda?")
 
-    def synthesize_response(self, message, product_context=None, logistics_signals=None):
+    def compose_response(self, message, product_context=None, logistics_signals=None, classification=None, session=None):
         """
-        Synthesizes a complete, organic-feeling response based on intent analysis.
+        Gera a resposta em partes ("opener", "core", "action"), cada uma assim que é construída
+        (o endpoint SSE repassa cada parte ao cliente sem esperar a resposta inteira).
+        `classification` (intent, sentiment) reaproveita a classificação já feita pelo chamador.
+        `session` (estado do ConversationStore) isola humor e contexto por cliente.
         """
-        # 1. Intent Analysis
-        intent = "UNKNOWN"
-        message_low = message.lower()
-        if any(w in message_low for w in ['estoque', 'zero', 'dropshipping', 'funciona', 'modelo']): intent = "ZERO_COST"
-        elif any(w in message_low for w in ['tem', 'acha', 'busca', 'encontrar', 'procura']): intent = "SOURCING"
-        elif any(w in message_low for w in ['prazo', 'entrega', 'chega', 'rastreio']): intent = "LOGISTICS"
-        elif any(w in message_low for w in ['compra', 'preço', 'valor', 'desconto', 'custa']): intent = "SALES"
+        # 1. Intent Analysis (single pass: intent + sentiment)
+        intent, sentiment = classification or classifier.classify(message)
         
         # Check if we have a successful sourcing context
         if isinstance(product_context, dict) and product_context.get('estimated_price'):
             price = product_context['estimated_price']
             name = product_context['name']
-            return f"🔎 Encontrei o produto que você buscava! O '{name}' está disponível para intermediação regional imediata por R$ {price:.2f}. Já cadastrei ele no nosso catálogo para você. Deseja que eu gere o link de compra agora?"
+            yield "core", f"🔎 Encontrei o produto que você buscava! O '{name}' está disponível para intermediação regional imediata por R$ {price:.2f}. Já cadastrei ele no nosso catálogo para você. Deseja que eu gere o link de compra agora?"
+            return
 
-        # 2. Emotional State Update
-        self._update_mood(NeuralClientBackend().analyze_sentiment(message))
+        # 2. Emotional State Update + contexto da sessão
+        mood = self._mood_for(sentiment)
+        if session is not None:
+            session["mood"] = mood
+            if intent == "UNKNOWN": intent = self._last_topic(session) or intent
+        else:
+            self.mood_state = mood
         
         # 3. Construction
-        opener = self._generate_opener()
-        core = self._generate_core_message(intent, product_context or message)
-        action = self._generate_action(intent)
+        yield "opener", self._generate_opener(mood)
+        yield "core", self._generate_core_message(intent, product_context or message)
         
         # 4. Neural Flavor
         flavors = ["", " 🤖", " ✨", " 🚀"]
-        
-        full_response = f"{opener} {core} {action}{random.choice(flavors)}"
-        
-        return full_response
+        yield "action", f"{self._generate_action(intent)}{random.choice(flavors)}"
+
+    def synthesize_response(self, message, product_context=None, logistics_signals=None, classification=None, session=None):
+        """
+        Synthesizes a complete, organic-feeling response based on intent analysis.
+        """
+        return " ".join(text for _, text in self.compose_response(message, product_context, logistics_signals, classification, session))
 
 # Bridge for backward compatibility
 def get_brain():
@@ -111,38 +127,61 @@ def get_brain():
 class NeuralClientBackend:
     # Wrapper adapter to keep interface clean
     def analyze_sentiment(self, text):
-        # Legacy sentiment logic kept for utility
-        text = text.lower()
-        if any(word in text for word in ['atraso', 'não recebi', 'lento', 'ruim', 'erro', 'problema', 'demora']): return "FRUSTRATED"
-        if any(word in text for word in ['quero', 'comprar', 'desconto', 'valor', 'preço', 'custa']): return "WANT_TO_BUY"
-        if any(word in text for word in ['funciona', 'como', 'estoque', 'zero', 'dropshipping']): return "CURIOSITY"
-        return "NEUTRAL"
-
-    def get_contextual_response(self, message, product_context=None, logistics_signals=None):
+        # Mesmos rótulos do filtro por palavras-chave antigo, via classificador compilado
+        return classifier.classify(text).sentiment
+
+    def get_contextual_response(self, message, product_context=None, logistics_signals=None, classification=None, session=None):
+        brain = get_brain()
+        return brain.synthesize_response(message, product_context, logistics_signals, classification, session)
+
+    def get_contextual_parts(self, message, product_context=None, logistics_signals=None, classification=None, session=None):
         brain = get_brain()
-        return brain.synthesize_response(message, product_context, logistics_signals)
+        return brain.compose_response(message, product_context, logistics_signals, classification, session)
 
-def simulate_chat_interaction(customer_query, product_context=None, logistics_signals=None):
+GREETING = "Quantum Core online. 🧠 Detectando oportunidades de escala com Custo Zero. O que você precisa?"
+
+def simulate_chat_interaction(customer_query, product_context=None, logistics_signals=None, session=None):
+    """`session`: estado mutável da conversa (ConversationStore.session) usado para humor e contexto."""
     engine = NeuralClientBackend()
     
     # Se for o 'greeting' inicial (query vazia)
     if not customer_query:
         return {
-            "response": "Quantum Core online. 🧠 Detectando oportunidades de escala com Custo Zero. O que você precisa?",
+            "response": GREETING,
             "sentiment": "NEUTRAL",
             "ai_confidence": 1.0,
             "logistics_aware": True
         }
 
-    response = engine.get_contextual_response(customer_query, product_context, logistics_signals)
-    sentiment = engine.analyze_sentiment(customer_query)
+    classification = classifier.classify(customer_query)
+    response = engine.get_contextual_response(customer_query, product_context, logistics_signals, classification, session)
+    sentiment = classification.sentiment
     
     return {
         "response": response,
         "sentiment": sentiment,
+        "intent": classification.intent,
+        "ai_confidence": round(random.uniform(0.95, 0.99), 2),
+        "logistics_aware": True
+    }
+
+def stream_chat_interaction(customer_query, product_context=None, logistics_signals=None, session=None):
+    """
+    Variante em partes de simulate_chat_interaction para o endpoint SSE:
+    (metadados, gerador de (parte, texto)). O gerador atualiza humor/contexto da sessão ao ser consumido.
+    """
+    if not customer_query:
+        meta = {"sentiment": "NEUTRAL", "intent": None, "ai_confidence": 1.0, "logistics_aware": True}
+        return meta, iter([("core", GREETING)])
+
+    classification = classifier.classify(customer_query)
+    meta = {
+        "sentiment": classification.sentiment,
+        "intent": classification.intent,
         "ai_confidence": round(random.uniform(0.95, 0.99), 2),
         "logistics_aware": True
     }
+    return meta, NeuralClientBackend().get_contextual_parts(customer_query, product_context, logistics_signals, classification, session)
 
 class CustomSourcingEngine:
     """
@@ -156,7 +195,8 @@ class CustomSourcingEngine:
         
         # 1. TENTA BUSCA REAL NA WEB (LIVING SYSTEM)
         print(f"🔎 LIVE SOURCING: Buscando '{query}' na rede...")
-        real_product = LiveSourcingEngine.search_mercadolivre(query)
+        # search_mercadolivre devolve a lista ordenada por vibe_score: usa o melhor resultado
+        real_product = (LiveSourcingEngine.search_mercadolivre(query) or [None])[0]
         
         if real_product:
             base_estimation = real_product['price']
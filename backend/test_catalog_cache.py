@@ -0,0 +1,171 @@
+"""
+ProductCatalogCache: SWR (soft/hard TTL, single-flight), estado compartilhado entre workers
+(adoção, log de deltas, compactação), reencode e paginação por cursor (pytest).
+Uso: cd backend && python -m pytest -q test_catalog_cache.py
+"""
+import json
+import threading
+import time
+
+import pytest
+
+from cache_backends import SharedMemoryBackend
+from catalog_cache import ProductCatalogCache
+from product_record import ProductRecord
+
+def row(i, price=100.0, featured=False):
+    return {"id": f"p{i}", "name": f"Produto {i}", "price": price, "base_price": 40.0, "description": f"Desc {i}",
+            "image_url": None, "category": "Casa", "stock": 5, "is_featured": featured, "is_active": True,
+            "metadata": {"location": "SP", "demand_score": i}}
+
+class CountingLoader:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return [dict(r) for r in self.rows]
+
+def make_cache(loader, backend=None, **kwargs):
+    kwargs.setdefault("refresh_mode", "inline")
+    return ProductCatalogCache(loader, ProductRecord.from_row, backend=backend, sync_interval=0, **kwargs)
+
+def ids(cache):
+    body, _ = cache.variant(cache.get(), "full")
+    return [p["id"] for p in json.loads(body)]
+
+@pytest.fixture
+def shm(tmp_path):
+    return SharedMemoryBackend(str(tmp_path / "shm"))
+
+def test_two_workers_converge_on_rows_and_etag(shm):
+    loader = CountingLoader([row(i, featured=i < 2) for i in range(5)])
+    a, b = make_cache(loader, shm), make_cache(loader, shm)
+    a.get()
+    b.get()
+    # Só um worker vai ao banco; o outro adota o estado publicado
+    assert loader.calls == 1 and b.stats["shared_adoptions"] == 1
+
+    a.apply_changes(upserts=[{"id": "p2", "price": 7.5}], deactivate_ids=["p3"])
+    b.apply_changes(upserts=[row(9)])
+    snap_a, snap_b = a.get(), b.get()
+    assert a.variant(snap_a, "full") == b.variant(snap_b, "full")
+    assert a.variant(snap_a, "recommend") == b.variant(snap_b, "recommend")
+    assert "p3" not in ids(a) and "p9" in ids(a)
+    assert json.loads(a.variant(snap_a, "full")[0])[ids(a).index("p2")]["price"] == 7.5
+    assert loader.calls == 1
+
+def test_deltas_written_during_reload_are_carried_over(shm):
+    rows = [row(i) for i in range(3)]
+    b = make_cache(CountingLoader(rows), shm)
+
+    def loader():
+        # Outro worker grava enquanto esta carga lê o banco (leitura anterior à escrita)
+        snapshot = [dict(r) for r in rows]
+        b.apply_changes(upserts=[{"id": "p1", "price": 555.0}])
+        return snapshot
+
+    a = make_cache(CountingLoader(rows), shm)
+    a.get()
+    b.get()
+    a.loader = loader
+    a.invalidate()
+    a.get()
+    version = a._shared_version
+    assert a._records["p1"].price == 555.0
+    # A versão nova já nasce com o delta reaplicado: quem adota também o vê
+    b.get()
+    assert b._shared_version == version and b._records["p1"].price == 555.0
+    assert a.variant(a.get(), "full") == b.variant(b.get(), "full")
+
+def test_delta_log_compaction_forces_full_reload(shm):
+    loader = CountingLoader([row(i) for i in range(3)])
+    a, b = make_cache(loader, shm), make_cache(loader, shm)
+    a.MAX_SHARED_DELTAS = 3
+    a.get()
+    b.get()
+    first_version = a._shared_version
+    for n in range(3):
+        a.apply_changes(upserts=[{"id": "p0", "price": 10.0 + n}])
+    assert shm.get(ProductCatalogCache.STATE_KEY) is None
+
+    # O log cheio invalida: a próxima leitura recarrega do banco e publica uma versão com log vazio
+    a.get()
+    assert loader.calls == 2 and a._shared_version != first_version and a._shared_seq == 0
+    b.get()
+    assert b._shared_version == a._shared_version
+    assert a.variant(a.get(), "full") == b.variant(b.get(), "full")
+
+def test_soft_ttl_serves_stale_and_hard_ttl_blocks():
+    loader = CountingLoader([row(0)])
+    cache = make_cache(loader, soft_ttl=10, hard_ttl=100)
+    first = cache.get()
+    loaded = first["loaded_at"]
+    assert cache.get(now=loaded + 5) is first and loader.calls == 1
+
+    # Entre soft e hard: devolve o snapshot antigo e revalida (inline: no próprio chamador)
+    assert cache.get(now=loaded + 50) is first
+    assert loader.calls == 2
+    second = cache.get()
+    assert second is not first
+
+    # Depois do hard_ttl ninguém recebe o snapshot vencido
+    third = cache.get(now=second["loaded_at"] + 500)
+    assert third is not second and loader.calls == 3
+
+def test_stale_while_revalidate_is_single_flight():
+    release = threading.Event()
+    loader = CountingLoader([row(0)])
+    cache = make_cache(loader, refresh_mode="background", soft_ttl=10, hard_ttl=100)
+    first = cache.get()
+
+    def slow_loader():
+        release.wait(5)
+        return loader()
+    cache.loader = slow_loader
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(now=first["loaded_at"] + 50))) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert all(r is first for r in results)
+    release.set()
+    deadline = time.time() + 5
+    while cache.get() is first and time.time() < deadline:
+        time.sleep(0.01)
+    assert loader.calls == 2
+
+def test_reencode_rewrites_every_item():
+    mood = {"value": "Apex"}
+    cache = ProductCatalogCache(CountingLoader([row(i) for i in range(3)]),
+                                lambda r: ProductRecord.from_row(r, ai_mood=mood["value"]))
+    before = cache.variant(cache.get(), "full")
+    mood["value"] = "Safety"
+    cache.reencode()
+    body, etag = cache.variant(cache.get(), "full")
+    assert etag != before[1]
+    assert {p["ai_mood"] for p in json.loads(body)} == {"Safety"}
+
+def test_cursor_pagination_walks_every_item_once():
+    cache = make_cache(CountingLoader([row(i, price=10.0 * i, featured=i % 3 == 0) for i in range(7)]))
+    snapshot = cache.get()
+    seen, cursor = [], None
+    while True:
+        items, cursor = cache.page(snapshot, sort="price_desc", limit=3, cursor=cursor)
+        seen += [p["id"] for p in json.loads(items)]
+        if cursor is None: break
+    assert seen == [f"p{i}" for i in range(6, -1, -1)]
+
+    items, _ = cache.page(snapshot, fields=["id", "price"], limit=2)
+    assert [set(p) for p in json.loads(items)] == [{"id", "price"}] * 2
+    for bad in ({"limit": 0}, {"limit": -1}, {"fields": ["nope"]}, {"sort": "nope"}, {"cursor": "%%%"}):
+        with pytest.raises(ValueError):
+            cache.page(snapshot, **bad)
+
+def test_lazy_and_materialized_variants_match():
+    rows = [row(i, price=50.0 * i, featured=i == 1) for i in range(6)]
+    lazy = make_cache(CountingLoader(rows))
+    eager = make_cache(CountingLoader(rows), materialized_variants=("full", "recommend"))
+    for name in ProductCatalogCache.VARIANTS:
+        assert lazy.variant(lazy.get(), name) == eager.variant(eager.get(), name)
@@ -0,0 +1,56 @@
+"""
+Paridade do MessageClassifier com os loops `any(w in message ...)` antigos (pytest).
+Uso: cd backend && python -m pytest -q test_intent_classifier.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+
+from intent_classifier import MessageClassifier, classifier
+from bench_classifier import EDGE_CASES, KEYWORDS, corpus, legacy_intent, legacy_sentiment
+
+# Palavras-chave que começam dentro de outra e terminam depois dela: um findall simples perderia a segunda
+OVERLAPS = [
+    "estoquero",          # estoque + quero
+    "dropshippingzero",   # dropshipping + zero (sem sobreposição, colados)
+    "encontrarquero",     # encontrar + quero
+    "temodelo",           # tem + modelo
+    "compraro",           # compra e comprar (prefixos um do outro)
+    "prazerro",           # erro dentro de "prazerro"
+    "acustaacha",         # custa + acha
+    "zerodemora",         # zero + demora
+    "ruimodelo",          # ruim + modelo
+    "entregatemprocura",  # entrega + tem + procura
+]
+
+@pytest.mark.parametrize("message", EDGE_CASES + OVERLAPS)
+def test_edge_cases_match_legacy(message):
+    assert tuple(classifier.classify(message)) == (legacy_intent(message), legacy_sentiment(message))
+
+@pytest.mark.parametrize("message, expected", [
+    ("estoquero", ("ZERO_COST", "WANT_TO_BUY")),
+    ("Não recebi meu pedido", ("UNKNOWN", "FRUSTRATED")),
+    ("Qual o preço e o prazo de entrega?", ("LOGISTICS", "WANT_TO_BUY")),
+    ("temporada", ("SOURCING", "NEUTRAL")),
+    ("", ("UNKNOWN", "NEUTRAL")),
+])
+def test_known_labels(message, expected):
+    assert tuple(classifier.classify(message)) == expected
+
+def test_keyword_pairs_glued_match_legacy():
+    # Todo par de palavras-chave colado (e repetido): cobre as sobreposições geradas pelo fecho
+    for first in KEYWORDS:
+        for second in KEYWORDS:
+            message = first + second
+            assert tuple(classifier.classify(message)) == (legacy_intent(message), legacy_sentiment(message)), message
+
+def test_random_corpus_matches_legacy():
+    for message in corpus(3000, seed=11, keyword_share=0.8):
+        assert tuple(classifier.classify(message)) == (legacy_intent(message), legacy_sentiment(message)), message
+
+def test_overlap_closure_contains_composed_chunks():
+    chunks = MessageClassifier._overlap_closure({"estoque", "quero"})
+    assert {"estoque", "quero", "estoquero"} <= chunks
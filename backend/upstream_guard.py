@@ -0,0 +1,160 @@
+import time
+import threading
+
+class UpstreamUnavailableError(Exception):
+    """Chamada recusada localmente (circuito aberto ou limite de taxa) sem tocar a rede."""
+    def __init__(self, host, reason, retry_after=None):
+        super().__init__(f"{host}: {reason}")
+        self.host = host
+        self.reason = reason
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Token bucket clássico: `rate` tokens/s, no máximo `burst` acumulados."""
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now):
+        """Consome um token; devolve 0 em caso de sucesso ou os segundos até o próximo token."""
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class CircuitBreaker:
+    """
+    closed -> open após `failure_threshold` falhas consecutivas;
+    open -> half_open depois de `reset_timeout` segundos, liberando `half_open_probes` chamadas de teste;
+    half_open -> closed no primeiro sucesso, ou de volta a open na primeira falha.
+    """
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, half_open_probes=1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.probes = 0
+
+    def allow(self, now):
+        if self.state == "open":
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+            self.probes = 0
+        if self.state == "half_open":
+            if self.probes >= self.half_open_probes:
+                return False
+            self.probes += 1
+        return True
+
+    def record(self, success, now):
+        if success:
+            self.state = "closed"
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = now
+
+    def retry_after(self, now):
+        return max(0.0, self.reset_timeout - (now - self.opened_at)) if self.state == "open" else 0.0
+
+class UpstreamGuard:
+    """
+    UPSTREAM GUARD v1.0 (RATE LIMIT + CIRCUIT BREAKER POR HOST):
+    - Token bucket por host: acima da taxa, espera até `max_wait` pelo próximo token ou falha rápido.
+    - Circuit breaker por host: falhas consecutivas (erro de rede, timeout, 403/429/5xx) abrem o
+      circuito e as chamadas seguintes falham na hora (UpstreamUnavailableError) até o half-open.
+    - snapshot() expõe o estado de cada host (endpoint admin).
+    Overrides por host em `host_limits`: {"api.host.com": {"rate": 2, "burst": 4}}.
+    `hosts`: quando informado, só esses hosts passam pelo guard; os demais (webhooks de pedido,
+    APIs próprias) seguem direto, sem limite local nem circuito.
+    """
+    FAILURE_STATUS = {403, 429, 500, 502, 503, 504}
+
+    def __init__(self, rate=5.0, burst=10, max_wait=2.0, failure_threshold=5, reset_timeout=30.0, host_limits=None,
+                 hosts=None):
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.host_limits = host_limits or {}
+        self.hosts = set(hosts) if hosts else None
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            limits = self.host_limits.get(host, {})
+            state = self._hosts[host] = {
+                "bucket": TokenBucket(limits.get("rate", self.rate), limits.get("burst", self.burst)),
+                "breaker": CircuitBreaker(self.failure_threshold, self.reset_timeout),
+                "stats": {"allowed": 0, "rejected_open": 0, "rejected_rate": 0, "successes": 0, "failures": 0}
+            }
+        return state
+
+    def covers(self, host):
+        return self.hosts is None or host in self.hosts
+
+    def before(self, host):
+        """Chamado antes da requisição: bloqueia até `max_wait` pelo token ou levanta UpstreamUnavailableError."""
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            with self._lock:
+                state = self._host(host)
+                now = time.monotonic()
+                breaker = state["breaker"]
+                if breaker.state == "open" and now - breaker.opened_at < breaker.reset_timeout:
+                    state["stats"]["rejected_open"] += 1
+                    raise UpstreamUnavailableError(host, "circuit open", breaker.retry_after(now))
+                wait = state["bucket"].take(now)
+                if wait == 0:
+                    if not breaker.allow(now):
+                        # Half-open com a sonda já em andamento: devolve o token e falha rápido
+                        state["bucket"].tokens += 1
+                        state["stats"]["rejected_open"] += 1
+                        raise UpstreamUnavailableError(host, "circuit half-open (probe in flight)", breaker.reset_timeout)
+                    state["stats"]["allowed"] += 1
+                    return
+                if now + wait > deadline:
+                    state["stats"]["rejected_rate"] += 1
+                    raise UpstreamUnavailableError(host, "rate limited", wait)
+            time.sleep(wait)
+
+    def record(self, host, success):
+        with self._lock:
+            state = self._host(host)
+            state["breaker"].record(success, time.monotonic())
+            state["stats"]["successes" if success else "failures"] += 1
+
+    def is_failure_status(self, status_code):
+        return status_code in self.FAILURE_STATUS
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                host: {
+                    "state": state["breaker"].state,
+                    "consecutive_failures": state["breaker"].failures,
+                    "retry_after": round(state["breaker"].retry_after(now), 1),
+                    "tokens": round(min(state["bucket"].burst, state["bucket"].tokens + (now - state["bucket"].updated) * state["bucket"].rate), 2),
+                    "rate": state["bucket"].rate,
+                    "burst": state["bucket"].burst,
+                    **state["stats"]
+                }
+                for host, state in self._hosts.items()
+            }
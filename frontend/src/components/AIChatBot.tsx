@@ -2,7 +2,13 @@
 
 import React, { useState, useEffect, useRef } from 'react';
 import { MessageCircle, X, Send, Bot, Sparkles } from 'lucide-react';
-import { fetchApi } from '@/lib/api';
+import { fetchApi, streamApi } from '@/lib/api';
+
+// O backend devolve a resposta na hora com `deliver_after_ms`: o atraso "humano" roda aqui, não no worker
+const holdUntilDelivery = (startedAt: number, deliverAfterMs?: number) => {
+    const remaining = (deliverAfterMs || 0) - (Date.now() - startedAt);
+    return remaining > 0 ? new Promise(resolve => setTimeout(resolve, remaining)) : Promise.resolve();
+};
 
 export default function AIChatBot() {
     const [isOpen, setIsOpen] = useState(false);
@@ -10,6 +16,8 @@ export default function AIChatBot() {
     const [input, setInput] = useState('');
     const [isTyping, setIsTyping] = useState(false);
     const scrollRef = useRef<HTMLDivElement>(null);
+    // Sessão da conversa no backend (humor + contexto por cliente); criada na primeira resposta
+    const sessionRef = useRef<string | null>(null);
 
     // Auto-scroll to bottom
     useEffect(() => {
@@ -24,10 +32,13 @@ export default function AIChatBot() {
             const fetchGreeting = async () => {
                 setIsTyping(true);
                 try {
+                    const startedAt = Date.now();
                     const res = await fetchApi('/api/v2/support/chat', {
                         method: 'POST',
-                        body: JSON.stringify({ query: '', isFirstToken: true })
+                        body: JSON.stringify({ query: '', isFirstToken: true, session_id: sessionRef.current })
                     });
+                    if (res.session_id) sessionRef.current = res.session_id;
+                    await holdUntilDelivery(startedAt, res.deliver_after_ms);
                     setMessages([{ role: 'bot', text: res.response }]);
                 } catch (e) {
                     setMessages([{ role: 'bot', text: "Quantum Core Alpha online. Como posso acelerar seu rendimento hoje?" }]);
@@ -47,11 +58,39 @@ export default function AIChatBot() {
         setInput('');
         setIsTyping(true);
 
+        const startedAt = Date.now();
+        // Streaming (SSE): o opener aparece na hora e o resto da resposta chega em partes
+        let received = 0;
+        try {
+            let pacing = 0;
+            await streamApi('/api/v2/support/chat/stream', { query: userMsg, session_id: sessionRef.current }, async (event, data) => {
+                if (event === 'meta') {
+                    if (data.session_id) sessionRef.current = data.session_id;
+                    // Servidor sem ritmo próprio (worker síncrono): espaça as partes aqui
+                    pacing = (data.deliver_after_ms || 0) / Math.max(1, (data.parts || 1) - 1);
+                } else if (event === 'chunk') {
+                    if (received > 0) await holdUntilDelivery(startedAt, pacing * received);
+                    const first = received++ === 0;
+                    setMessages(prev => first
+                        ? [...prev, { role: 'bot', text: data.text }]
+                        : [...prev.slice(0, -1), { role: 'bot', text: `${prev[prev.length - 1].text} ${data.text}` }]);
+                }
+            });
+        } catch (e) {
+            // Sem stream (proxy, navegador antigo): cai para a resposta JSON abaixo
+        }
+        if (received > 0) {
+            setIsTyping(false);
+            return;
+        }
+
         try {
             const res = await fetchApi('/api/v2/support/chat', {
                 method: 'POST',
-                body: JSON.stringify({ query: userMsg })
+                body: JSON.stringify({ query: userMsg, session_id: sessionRef.current })
             });
+            if (res.session_id) sessionRef.current = res.session_id;
+            await holdUntilDelivery(startedAt, res.deliver_after_ms);
 
             setMessages(prev => [...prev, { role: 'bot', text: res.response }]);
         } catch (e) {
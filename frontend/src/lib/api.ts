@@ -79,3 +79,55 @@ export async function fetchApi<T = any>(
 
     throw new Error(`[API] Failed after ${MAX_RETRIES} attempts`);
 }
+
+/**
+ * Lê um endpoint SSE via fetch (POST com corpo JSON) e entrega cada evento, em ordem, a `onEvent`.
+ * `onEvent` pode devolver uma Promise (ex.: ritmo de digitação) antes do próximo evento.
+ */
+export async function streamApi(
+    endpoint: string,
+    body: unknown,
+    onEvent: (event: string, data: any) => void | Promise<void>,
+    timeout: number = 30000
+): Promise<void> {
+    const baseUrl = process.env.NEXT_PUBLIC_API_URL || '';
+    const controller = new AbortController();
+    const timeoutId = setTimeout(() => controller.abort(), timeout);
+
+    try {
+        const response = await fetch(`${baseUrl}${endpoint}`, {
+            method: 'POST',
+            body: JSON.stringify(body),
+            signal: controller.signal,
+            headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+        });
+        if (!response.ok || !response.body) {
+            throw new Error(`API error: ${response.status} ${response.statusText}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            // Eventos SSE terminam em linha em branco
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const raw = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                let event = 'message';
+                let data = '';
+                for (const line of raw.split('\n')) {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                }
+                if (data) await onEvent(event, JSON.parse(data));
+            }
+        }
+    } finally {
+        clearTimeout(timeoutId);
+    }
+}